@@ -0,0 +1,79 @@
+"""
+Benchmark GET /auctions/{auction_id}/all-bids: the old per-item query loop
+vs the batched select_in() version, at 10/100/1000 items.
+
+Run from backend/:  python -m benchmarks.bench_auction_bids [--latency 0.02]
+"""
+import argparse
+import asyncio
+import os
+import time
+
+os.environ.setdefault("SUPABASE_URL", "https://bench.supabase.co")
+os.environ.setdefault("SUPABASE_KEY", "bench.bench.bench")
+
+import main
+from benchmarks.fake_supabase import FakeSupabase
+
+AUCTION_ID = "auction-1"
+BIDS_PER_ITEM = 5
+
+
+async def legacy_get_auction_bids(auction_id):
+    """The pre-batching implementation: one bids query per item"""
+    supabase = main.supabase
+    auction = await supabase.table("auctions").select("auction_id, auction_name, status").eq("auction_id", auction_id).execute()
+    items = await supabase.table("items").select("item_id, title, starting_bid, min_increment, is_sold, buy_now_price, is_listed").eq("auction_id", auction_id).execute()
+    items_with_bids = []
+    for item in items.data:
+        bids = await supabase.table("bids").select("*").eq("item_id", item["item_id"]).order("amount", desc=True).execute()
+        items_with_bids.append({
+            **item,
+            "name": item.get("title", "Untitled"),
+            "bids": bids.data if bids.data else [],
+            "bid_count": len(bids.data) if bids.data else 0,
+            "highest_bid": bids.data[0]["amount"] if bids.data else None
+        })
+    return {"auction": auction.data[0], "items_with_bids": items_with_bids}
+
+
+def build_client(item_count, latency):
+    client = FakeSupabase(latency=latency)
+    client.tables["auctions"] = [{"auction_id": AUCTION_ID, "auction_name": "Bench", "status": "published"}]
+    client.tables["items"] = [
+        {"item_id": f"item-{i}", "auction_id": AUCTION_ID, "title": f"Lot {i}", "starting_bid": 10,
+         "min_increment": 1, "is_sold": False, "buy_now_price": None, "is_listed": True}
+        for i in range(item_count)
+    ]
+    client.tables["bids"] = [
+        {"bid_id": f"bid-{i}-{b}", "item_id": f"item-{i}", "amount": 10 + b,
+         "created_at": f"2025-12-01T00:00:{b:02d}+00:00"}
+        for i in range(item_count) for b in range(BIDS_PER_ITEM)
+    ]
+    return client
+
+
+def timed(fn, client):
+    main.supabase = client
+    client.calls = 0
+    start = time.perf_counter()
+    result = asyncio.run(fn(AUCTION_ID))
+    return time.perf_counter() - start, client.calls, result
+
+
+def main_cli():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latency", type=float, default=0.02, help="simulated seconds per DB round trip")
+    args = parser.parse_args()
+
+    print(f"{'items':>6} {'legacy ms':>10} {'calls':>6} {'batched ms':>11} {'calls':>6} {'speedup':>8}")
+    for item_count in (10, 100, 1000):
+        client = build_client(item_count, args.latency)
+        legacy_s, legacy_calls, legacy = timed(legacy_get_auction_bids, client)
+        batched_s, batched_calls, batched = timed(main.get_auction_bids, client)
+        assert [i["bid_count"] for i in legacy["items_with_bids"]] == [i["bid_count"] for i in batched["items_with_bids"]]
+        print(f"{item_count:>6} {legacy_s * 1000:>10.1f} {legacy_calls:>6} {batched_s * 1000:>11.1f} {batched_calls:>6} {legacy_s / batched_s:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,95 @@
+"""
+Stress test POST /items/{item_id}/buy-now: N buyers hit the same item at once.
+Checks that exactly one order is created, through both the buy_now_atomic RPC
+and the conditional-update fallback, and shows the old read-then-write flow
+double-selling under the same load.
+
+Run from backend/:  python -m benchmarks.bench_buy_now [--buyers 100] [--latency 0.01]
+"""
+import argparse
+import asyncio
+import os
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+os.environ.setdefault("SUPABASE_URL", "https://bench.supabase.co")
+os.environ.setdefault("SUPABASE_KEY", "bench.bench.bench")
+
+import httpx
+
+import main
+from benchmarks.fake_supabase import FUNCTIONS, FakeSupabase
+
+AUCTION_ID = "auction-1"
+ITEM_ID = "item-1"
+
+
+async def legacy_buy_now(item_id, purchase):
+    """The pre-RPC implementation: read, insert the order, then mark sold"""
+    supabase = main.supabase
+    item = await supabase.table("items").select("*, auctions(*)").eq("item_id", item_id).execute()
+    item_data = item.data[0]
+    if item_data["auctions"]["status"] != "published" or item_data.get("is_sold"):
+        raise main.HTTPException(400, "Item has already been sold")
+    order = await supabase.table("orders").insert({
+        "item_id": item_id,
+        "auction_id": item_data["auction_id"],
+        "buyer_id": main.GUEST_BUYER_ID,
+        "buyer_email": purchase.buyer_email,
+        "buyer_name": purchase.buyer_name,
+        "amount": item_data["buy_now_price"],
+        "order_type": "buy_now"
+    }).execute()
+    await supabase.table("items").update({"is_sold": True}).eq("item_id", item_id).execute()
+    return {"message": "Purchase successful", "order": order.data[0]}
+
+
+def build_client(latency, functions):
+    client = FakeSupabase(latency=latency, functions=functions)
+    now = datetime.now(timezone.utc)
+    client.tables["auctions"] = [{"auction_id": AUCTION_ID, "status": "published", "end_time": (now + timedelta(hours=1)).isoformat()}]
+    client.tables["items"] = [{"item_id": ITEM_ID, "auction_id": AUCTION_ID, "buy_now_price": 250, "is_sold": False, "is_listed": True}]
+    client.tables["bids"] = [{"bid_id": "bid-1", "item_id": ITEM_ID, "amount": 100}]
+    return client
+
+
+async def stampede(buyers, submit):
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+        start = time.perf_counter()
+        responses = await asyncio.gather(*(
+            http.post(f"/items/{ITEM_ID}/buy-now", json={"buyer_email": f"buyer{n}@example.com", "buyer_name": f"Buyer {n}"})
+            for n in range(buyers)
+        ))
+        elapsed = time.perf_counter() - start
+    return Counter(r.status_code for r in responses), elapsed
+
+
+async def run(args):
+    modes = [
+        ("rpc", FUNCTIONS, main.submit_buy_now),
+        ("conditional update", {}, main.submit_buy_now),
+        ("legacy", {}, legacy_buy_now),
+    ]
+    print(f"{'mode':<20} {'orders':>6} {'db calls':>9} {'ms':>8}  statuses")
+    for name, functions, submit in modes:
+        client = build_client(args.latency, functions)
+        main.supabase = client
+        main.submit_buy_now = submit
+        statuses, elapsed = await stampede(args.buyers, submit)
+        orders = len(client.tables.get("orders", []))
+        print(f"{name:<20} {orders:>6} {client.calls:>9} {elapsed * 1000:>8.1f}  {dict(statuses)}")
+        if name != "legacy":
+            assert orders == 1 and statuses[200] == 1, f"{name}: expected exactly one order, got {orders}"
+
+
+def main_cli():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--buyers", type=int, default=100, help="concurrent buy-now requests")
+    parser.add_argument("--latency", type=float, default=0.01, help="simulated seconds per DB round trip")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,182 @@
+"""
+Load benchmark for the hot paths, run in-process against the in-memory
+Supabase and fake OpenAI clients (no network, no keys).
+
+Scenarios:
+  place_bid           POST /items/{item_id}/bid, rising amounts over random items
+  get_public_auction  GET /auctions/{auction_id}/public
+  list_items          GET /items?auction_id=...&limit=50
+  comps_batch         POST /comps/batch, then poll until the batch finishes
+
+Reports p50/p95/p99 latency, throughput and DB round trips per request.
+
+Run from backend/:
+  python -m benchmarks.bench_load [--concurrency 50] [--requests 1000] [--latency 0.005]
+  python -m benchmarks.bench_load --scenario place_bid --scenario list_items
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import random
+import statistics
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+os.environ.setdefault("SUPABASE_URL", "https://bench.supabase.co")
+os.environ.setdefault("SUPABASE_KEY", "bench.bench.bench")
+os.environ.setdefault("OPENAI_COMPS_KEY", "bench")
+os.environ.setdefault("COMPS_JOBS_DB_PATH", os.path.join(tempfile.mkdtemp(), "comps_jobs.sqlite3"))
+# the fake agent has no rate limit - don't let the real budget throttle the benchmark
+os.environ.setdefault("COMPS_REQUESTS_PER_MINUTE", "1000000")
+os.environ.setdefault("COMPS_TOKENS_PER_MINUTE", "1000000000")
+
+import httpx
+
+import main
+from benchmarks.fake_openai import FakeRunner, FakeVisionClient
+from benchmarks.fake_supabase import FakeSupabase
+
+AUCTION_ID = "auction-1"
+PROFILE_ID = "profile-1"
+BIDS_PER_ITEM = 3
+COMPS_BATCH_SIZE = 10
+POLL_SECONDS = 0.05
+
+
+def build_client(item_count: int, latency: float) -> FakeSupabase:
+    client = FakeSupabase(latency=latency)
+    now = datetime.now(timezone.utc)
+    client.tables["auctions"] = [{
+        "auction_id": AUCTION_ID, "profile_id": PROFILE_ID, "auction_name": "Bench", "status": "published",
+        "start_time": now.isoformat(), "end_time": (now + timedelta(days=1)).isoformat(),
+        "created_at": now.isoformat()
+    }]
+    client.tables["items"] = [
+        {"item_id": f"item-{i}", "auction_id": AUCTION_ID, "title": f"Lot {i}", "brand": "Bench",
+         "model": f"Model {i}", "year": "2020", "starting_bid": 10, "min_increment": 1,
+         "is_sold": False, "is_listed": True, "buy_now_price": None,
+         "created_at": (now - timedelta(seconds=i)).isoformat()}
+        for i in range(item_count)
+    ]
+    client.tables["item_images"] = [
+        {"image_id": i, "item_id": f"item-{i}", "url": f"https://img.example/{i}.jpg", "position": 1}
+        for i in range(item_count)
+    ]
+    client.tables["bids"] = [
+        {"bid_id": f"bid-{i}-{b}", "item_id": f"item-{i}", "bidder_id": "b", "bidder_email": "seed@example.com",
+         "bidder_name": "Seed", "amount": 10 + b, "created_at": (now - timedelta(minutes=b)).isoformat()}
+        for i in range(item_count) for b in range(BIDS_PER_ITEM)
+    ]
+    return client
+
+
+def scenarios(item_count: int) -> dict:
+    amounts = itertools.count(1000)
+    models = itertools.count()
+
+    async def place_bid(http):
+        item_id = f"item-{random.randrange(item_count)}"
+        return await http.post(f"/items/{item_id}/bid", json={
+            "bidder_email": "bench@example.com", "bidder_name": "Bench", "bid_amount": next(amounts)
+        })
+
+    async def get_public_auction(http):
+        return await http.get(f"/auctions/{AUCTION_ID}/public")
+
+    async def list_items(http):
+        return await http.get("/items", params={"auction_id": AUCTION_ID, "limit": 50})
+
+    async def comps_batch(http):
+        # unique models so every run misses the comps cache
+        items = [
+            {"item_id": f"item-{random.randrange(item_count)}", "brand": "Bench", "model": f"Run {next(models)}", "year": "2020", "notes": ""}
+            for _ in range(COMPS_BATCH_SIZE)
+        ]
+        response = await http.post("/comps/batch", json={"items": items})
+        if response.status_code != 200:
+            return response
+        batch_id = response.json()["batch_id"]
+        while True:
+            await asyncio.sleep(POLL_SECONDS)
+            response = await http.get(f"/comps/batch/{batch_id}")
+            if response.status_code != 200 or response.json()["status"] in ("completed", "cancelled"):
+                return response
+
+    return {
+        "place_bid": place_bid,
+        "get_public_auction": get_public_auction,
+        "list_items": list_items,
+        "comps_batch": comps_batch,
+    }
+
+
+async def drive(http, fn, total: int, concurrency: int):
+    """Run fn total times with at most concurrency in flight; returns (latencies, statuses, wall seconds)"""
+    latencies, statuses = [], Counter()
+    remaining = iter(range(total))
+
+    async def worker():
+        for _ in remaining:
+            start = time.perf_counter()
+            try:
+                response = await fn(http)
+                statuses[response.status_code] += 1
+            except Exception as e:
+                statuses[type(e).__name__] += 1
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, statuses, time.perf_counter() - start
+
+
+def percentiles(latencies: list) -> tuple:
+    if len(latencies) < 2:
+        value = latencies[0] if latencies else 0.0
+        return value, value, value
+    cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+    return cuts[49], cuts[94], cuts[98]
+
+
+async def run(args):
+    client = build_client(args.items, args.latency)
+    main.supabase = main.InstrumentedSupabase(client)
+    main.openai_description_client = FakeVisionClient(latency=args.vision_latency)
+    main.Runner = FakeRunner(latency=args.agent_latency)
+
+    chosen = scenarios(args.items)
+    names = args.scenario or list(chosen)
+
+    print(f"items={args.items} concurrency={args.concurrency} db_latency={args.latency * 1000:.0f}ms agent_latency={args.agent_latency * 1000:.0f}ms")
+    print(f"{'scenario':<20} {'reqs':>6} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'db/req':>7}  statuses")
+    async with main.lifespan(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as http:
+            for name in names:
+                total = args.comps_requests if name == "comps_batch" else args.requests
+                client.calls = 0
+                latencies, statuses, wall = await drive(http, chosen[name], total, args.concurrency)
+                p50, p95, p99 = percentiles(latencies)
+                status_text = " ".join(f"{code}:{count}" for code, count in sorted(statuses.items(), key=str))
+                print(f"{name:<20} {total:>6} {total / wall:>8.1f} {p50 * 1000:>8.1f} {p95 * 1000:>8.1f} {p99 * 1000:>8.1f} {client.calls / total:>7.1f}  {status_text}")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scenario", action="append", choices=["place_bid", "get_public_auction", "list_items", "comps_batch"],
+                        help="scenario to run (repeatable; default all)")
+    parser.add_argument("--concurrency", type=int, default=50, help="requests in flight")
+    parser.add_argument("--requests", type=int, default=1000, help="requests per scenario")
+    parser.add_argument("--comps-requests", type=int, default=20, help=f"batches for comps_batch ({COMPS_BATCH_SIZE} items each)")
+    parser.add_argument("--items", type=int, default=200, help="items in the seeded auction")
+    parser.add_argument("--latency", type=float, default=0.005, help="simulated seconds per DB round trip")
+    parser.add_argument("--agent-latency", type=float, default=0.5, help="simulated seconds per comps agent run")
+    parser.add_argument("--vision-latency", type=float, default=0.5, help="simulated seconds per vision call")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,81 @@
+"""
+Stand-ins for the OpenAI clients used by main.py, with a fixed latency per call.
+
+    main.openai_description_client = FakeVisionClient(latency=0.8)
+    main.Runner = FakeRunner(latency=2.0)
+"""
+import asyncio
+import itertools
+from types import SimpleNamespace
+
+DESCRIPTION_TEXT = (
+    "Solid walnut mid-century sideboard with four sliding doors and original brass pulls. "
+    "Light surface wear to the top consistent with age; interior shelves clean and intact."
+)
+
+
+class FakeVisionClient:
+    """AsyncOpenAI subset used for descriptions: chat.completions.create(), streamed or not"""
+
+    def __init__(self, latency: float = 0.0, text: str = DESCRIPTION_TEXT):
+        self.latency = latency
+        self.text = text
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    async def _create(self, stream: bool = False, **kwargs):
+        self.calls += 1
+        if stream:
+            return FakeStream(self.text, self.latency)
+        await asyncio.sleep(self.latency)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=self.text))],
+            usage=SimpleNamespace(prompt_tokens=800, completion_tokens=len(self.text) // 4, total_tokens=800 + len(self.text) // 4)
+        )
+
+
+
+class FakeStream:
+    """openai.AsyncStream subset: async iteration over word deltas plus close()"""
+
+    def __init__(self, text: str, latency: float):
+        self._chunks = self._generate(text, latency)
+
+    @staticmethod
+    async def _generate(text: str, latency: float):
+        words = text.split(" ")
+        for word in words:
+            await asyncio.sleep(latency / len(words))
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=word + " "))], usage=None)
+
+    def __aiter__(self):
+        return self._chunks
+
+    async def close(self):
+        await self._chunks.aclose()
+
+
+class FakeRunner:
+    """Replaces agents.Runner: run() returns three 2025 comps in the agent's output_type"""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls = 0
+        self._prices = itertools.count(100, 7)
+
+    async def run(self, agent, input=None, run_config=None, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        output = {}
+        for n in (1, 2, 3):
+            output[f"comp_{n}"] = {
+                f"source_{n}": "eBay",
+                f"url_{n}": f"https://www.ebay.com/itm/{self.calls}{n}",
+                f"sale_date_{n}": f"2025-0{n}-15",
+                f"price_{n}": str(next(self._prices)),
+                f"notes_{n}": "fake comp",
+            }
+        return SimpleNamespace(
+            final_output=agent.output_type.model_validate(output),
+            context_wrapper=SimpleNamespace(usage=SimpleNamespace(requests=1, total_tokens=15000))
+        )
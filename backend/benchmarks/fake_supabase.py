@@ -0,0 +1,460 @@
+"""
+In-memory stand-in for the Supabase client used by main.py.
+Covers the query subset the backend uses (filters incl. or_(), order/limit/range,
+embedded selects like "*, auctions(*)", insert/upsert/update/delete with
+count=, and rpc() for the functions in backend/sql/) and sleeps for a fixed
+latency on every awaited execute() to simulate a PostgREST round trip.
+
+Swap it in by assigning the module-level client: main.supabase = FakeSupabase()
+"""
+import asyncio
+import itertools
+import operator
+import re
+import uuid
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+from postgrest.exceptions import APIError
+
+# primary key per table; embeds resolve through these (many-to-one when the
+# row carries the embedded table's key, one-to-many otherwise)
+PRIMARY_KEYS = {
+    "organizations": "org_id",
+    "profiles": "profile_id",
+    "auctions": "auction_id",
+    "items": "item_id",
+    "item_images": "image_id",
+    "comps": "comp_id",
+    "bids": "bid_id",
+    "orders": "order_id",
+}
+
+# bigserial keys; everything else gets a uuid
+SERIAL_KEYS = {"image_id", "comp_id"}
+
+COMPARATORS = {
+    "eq": operator.eq,
+    "neq": operator.ne,
+    "gt": operator.gt,
+    "gte": operator.ge,
+    "lt": operator.lt,
+    "lte": operator.le,
+}
+
+
+def now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def parse_timestamp(value: str) -> datetime:
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def coerce(actual, value):
+    """Cast a filter value to the stored column's type, as Postgres would"""
+    if isinstance(value, str) and actual is not None:
+        if isinstance(actual, bool):
+            return value.lower() == "true"
+        if isinstance(actual, (int, float)):
+            return float(value)
+    return value
+
+
+def compare(op: str, actual, value) -> bool:
+    if op == "is":
+        return actual is None if value in (None, "null") else actual == coerce(actual, value)
+    if actual is None:
+        return op == "neq" and value is not None
+    return COMPARATORS[op](actual, coerce(actual, value))
+
+
+def split_top_level(expr: str) -> list:
+    """Split on commas outside parentheses and double quotes"""
+    parts, depth, quoted, current = [], 0, False, []
+    for ch in expr:
+        if ch == '"':
+            quoted = not quoted
+        elif not quoted and ch == "(":
+            depth += 1
+        elif not quoted and ch == ")":
+            depth -= 1
+        elif not quoted and depth == 0 and ch == ",":
+            parts.append("".join(current).strip())
+            current = []
+            continue
+        current.append(ch)
+    if current:
+        parts.append("".join(current).strip())
+    return parts
+
+
+def parse_logic(term: str):
+    """PostgREST logic tree (as passed to or_()) -> row predicate"""
+    match = re.fullmatch(r"(and|or)\((.*)\)", term)
+    if match:
+        predicates = [parse_logic(part) for part in split_top_level(match.group(2))]
+        combine = all if match.group(1) == "and" else any
+        return lambda row: combine(p(row) for p in predicates)
+    column, op, value = term.split(".", 2)
+    if value.startswith('"') and value.endswith('"'):
+        value = value[1:-1]
+    if op == "in":
+        values = {v.strip('"') for v in split_top_level(value.strip("()"))}
+        return lambda row: str(row.get(column)) in values
+    return lambda row: compare(op, row.get(column), value)
+
+
+def parse_columns(columns: str):
+    """'a, b, items(*)' -> (plain column names, [(embedded table, inner columns)])"""
+    plain, embeds = [], []
+    for part in split_top_level(columns or "*"):
+        match = re.fullmatch(r"(?:\w+:)?(\w+)(?:!\w+)?\((.*)\)", part)
+        if match:
+            embeds.append((match.group(1), match.group(2)))
+        elif part:
+            plain.append(part)
+    return plain, embeds
+
+
+class FakeQuery:
+    def __init__(self, client, table):
+        self._client = client
+        self._table = table
+        self._filters = []
+        self._order = []
+        self._range = None
+        self._columns = "*"
+        self._action = "select"
+        self._payload = None
+        self._count = None
+        self._returning = "representation"
+        self._on_conflict = None
+
+    # ---- actions ----
+
+    def select(self, columns="*", count=None):
+        self._columns = columns
+        self._count = count
+        return self
+
+    def insert(self, rows, count=None, returning="representation", **kwargs):
+        return self._write("insert", rows, count, returning)
+
+    def upsert(self, rows, on_conflict="", ignore_duplicates=False, count=None, returning="representation", **kwargs):
+        self._on_conflict = [c.strip() for c in on_conflict.split(",") if c.strip()] or None
+        return self._write("upsert", rows, count, returning)
+
+    def update(self, values, count=None, returning="representation"):
+        return self._write("update", values, count, returning)
+
+    def delete(self, count=None, returning="representation"):
+        return self._write("delete", None, count, returning)
+
+    def _write(self, action, payload, count, returning):
+        self._action = action
+        self._payload = payload
+        self._count = count
+        self._returning = returning
+        return self
+
+    # ---- filters ----
+
+    def _filter(self, op, column, value):
+        self._filters.append(lambda row: compare(op, row.get(column), value))
+        return self
+
+    def eq(self, column, value):
+        return self._filter("eq", column, value)
+
+    def neq(self, column, value):
+        return self._filter("neq", column, value)
+
+    def gt(self, column, value):
+        return self._filter("gt", column, value)
+
+    def gte(self, column, value):
+        return self._filter("gte", column, value)
+
+    def lt(self, column, value):
+        return self._filter("lt", column, value)
+
+    def lte(self, column, value):
+        return self._filter("lte", column, value)
+
+    def is_(self, column, value):
+        return self._filter("is", column, value)
+
+    def in_(self, column, values):
+        values = set(values)
+        self._filters.append(lambda row: row.get(column) in values)
+        return self
+
+    def match(self, query: dict):
+        for column, value in query.items():
+            self.eq(column, value)
+        return self
+
+    def or_(self, filters: str):
+        self._filters.append(parse_logic(f"or({filters})"))
+        return self
+
+    # ---- modifiers ----
+
+    def order(self, column, desc=False, nullsfirst=None):
+        self._order.append((column, desc))
+        return self
+
+    def limit(self, count):
+        self._range = (0, count - 1)
+        return self
+
+    def range(self, start, end):
+        self._range = (start, end)
+        return self
+
+    # ---- execution ----
+
+    async def execute(self):
+        self._client.calls += 1
+        await asyncio.sleep(self._client.latency)
+        rows = getattr(self, f"_run_{self._action}")()
+        count = len(rows) if self._count else None
+        if self._returning == "minimal":
+            rows = []
+        return SimpleNamespace(data=rows, count=count)
+
+    def _matching(self) -> list:
+        return [row for row in self._client.tables.get(self._table, []) if all(f(row) for f in self._filters)]
+
+    def _run_select(self) -> list:
+        rows = self._matching()
+        # apply sort keys last-to-first so the first order() wins
+        for column, desc in reversed(self._order):
+            rows.sort(key=lambda r: (r.get(column) is None, r.get(column)), reverse=desc)
+        if self._range:
+            start, end = self._range
+            rows = rows[start:end + 1]
+        return [self._client.project(self._table, row, self._columns) for row in rows]
+
+    def _run_insert(self) -> list:
+        rows = self._payload if isinstance(self._payload, list) else [self._payload]
+        return [dict(self._client.insert_row(self._table, row)) for row in rows]
+
+    def _run_upsert(self) -> list:
+        rows = self._payload if isinstance(self._payload, list) else [self._payload]
+        keys = self._on_conflict or [PRIMARY_KEYS.get(self._table, "id")]
+        table = self._client.tables.setdefault(self._table, [])
+        out = []
+        for row in rows:
+            existing = next((r for r in table if all(r.get(k) == row.get(k) for k in keys)), None)
+            if existing is None:
+                out.append(dict(self._client.insert_row(self._table, row)))
+            else:
+                existing.update(row)
+                out.append(dict(existing))
+        return out
+
+    def _run_update(self) -> list:
+        rows = self._matching()
+        for row in rows:
+            row.update(self._payload)
+        return [dict(row) for row in rows]
+
+    def _run_delete(self) -> list:
+        table = self._client.tables.get(self._table, [])
+        gone = self._matching()
+        gone_ids = {id(row) for row in gone}
+        self._client.tables[self._table] = [row for row in table if id(row) not in gone_ids]
+        return [dict(row) for row in gone]
+
+
+class FakeRpc:
+    def __init__(self, client, name, params):
+        self._client = client
+        self._name = name
+        self._params = params
+
+    async def execute(self):
+        self._client.calls += 1
+        await asyncio.sleep(self._client.latency)
+        function = self._client.functions.get(self._name)
+        if function is None:
+            # what PostgREST answers for a function that was never installed
+            raise APIError({"message": f"Could not find the function public.{self._name}", "code": "PGRST202"})
+        # runs without awaiting, so it's atomic like the plpgsql original
+        return SimpleNamespace(data=function(self._client, self._params))
+
+
+class FakePostgrest:
+    async def aclose(self):
+        pass
+
+
+class FakeSupabase:
+    def __init__(self, latency=0.0, functions=None):
+        self.latency = latency
+        self.tables = {}
+        self.calls = 0
+        self.functions = dict(FUNCTIONS if functions is None else functions)
+        self.postgrest = FakePostgrest()
+        self._serial = itertools.count(1)
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+    def rpc(self, name, params=None):
+        return FakeRpc(self, name, params or {})
+
+    def insert_row(self, table: str, row: dict) -> dict:
+        row = dict(row)
+        key = PRIMARY_KEYS.get(table)
+        if key and row.get(key) is None:
+            row[key] = next(self._serial) if key in SERIAL_KEYS else str(uuid.uuid4())
+        row.setdefault("created_at", now_iso())
+        self.tables.setdefault(table, []).append(row)
+        return row
+
+    def project(self, table: str, row: dict, columns: str) -> dict:
+        plain, embeds = parse_columns(columns)
+        out = dict(row) if "*" in plain or not plain else {c: row.get(c) for c in plain}
+        for embedded, inner in embeds:
+            key = PRIMARY_KEYS.get(embedded)
+            if key and key in row:
+                parent = next((r for r in self.tables.get(embedded, []) if r.get(key) == row[key]), None)
+                out[embedded] = self.project(embedded, parent, inner) if parent else None
+            else:
+                parent_key = PRIMARY_KEYS[table]
+                out[embedded] = [
+                    self.project(embedded, child, inner)
+                    for child in self.tables.get(embedded, [])
+                    if child.get(parent_key) == row.get(parent_key)
+                ]
+        return out
+
+
+# ============================================
+# IN-MEMORY PORTS OF backend/sql/ FUNCTIONS
+# ============================================
+
+def find_row(client, table: str, key: str, value):
+    return next((r for r in client.tables.get(table, []) if r.get(key) == value), None)
+
+
+def place_bid_atomic(client, params: dict) -> dict:
+    """Port of sql/place_bid_atomic.sql"""
+    item = find_row(client, "items", "item_id", params["p_item_id"])
+    if item is None:
+        return {"accepted": False, "error": "not_found"}
+    auction = find_row(client, "auctions", "auction_id", item.get("auction_id")) or {}
+    if auction.get("status") != "published":
+        return {"accepted": False, "error": "not_active"}
+    if auction.get("end_time") and datetime.now(timezone.utc) > parse_timestamp(auction["end_time"]):
+        return {"accepted": False, "error": "ended"}
+    if item.get("is_sold"):
+        return {"accepted": False, "error": "sold"}
+
+    starting_bid = item.get("starting_bid") or 0
+    min_increment = item.get("min_increment") or 1
+    amounts = [b["amount"] for b in client.tables.get("bids", []) if b["item_id"] == item["item_id"]]
+    highest = max(amounts) if amounts else None
+    min_required = starting_bid if highest is None else highest + min_increment
+    if params["p_amount"] < min_required:
+        return {
+            "accepted": False,
+            "error": "too_low",
+            "auction_id": item["auction_id"],
+            "current_highest": highest,
+            "starting_bid": starting_bid,
+            "min_increment": min_increment,
+            "min_required": min_required,
+        }
+
+    bid = client.insert_row("bids", {
+        "item_id": item["item_id"],
+        "bidder_id": params["p_bidder_id"],
+        "bidder_email": params["p_bidder_email"],
+        "bidder_name": params["p_bidder_name"],
+        "amount": params["p_amount"],
+    })
+    item["current_bid"] = params["p_amount"]
+    return {
+        "accepted": True,
+        "bid": dict(bid),
+        "auction_id": item["auction_id"],
+        "current_highest": params["p_amount"],
+        "starting_bid": starting_bid,
+        "min_increment": min_increment,
+    }
+
+
+def buy_now_atomic(client, params: dict) -> dict:
+    """Port of sql/buy_now_atomic.sql"""
+    item = find_row(client, "items", "item_id", params["p_item_id"])
+    if item is None:
+        return {"accepted": False, "error": "not_found"}
+    if item.get("is_sold"):
+        existing = next((o for o in client.tables.get("orders", [])
+                         if o["item_id"] == item["item_id"] and o.get("order_type") == "buy_now"
+                         and o.get("buyer_email") == params["p_buyer_email"]), None)
+        if existing is not None:
+            return {"accepted": True, "order": dict(existing), "auction_id": item["auction_id"], "replayed": True}
+    auction = find_row(client, "auctions", "auction_id", item.get("auction_id")) or {}
+    if auction.get("status") != "published":
+        return {"accepted": False, "error": "not_active"}
+    if auction.get("end_time") and datetime.now(timezone.utc) > parse_timestamp(auction["end_time"]):
+        return {"accepted": False, "error": "ended"}
+    if item.get("is_sold"):
+        return {"accepted": False, "error": "sold"}
+    if not item.get("buy_now_price"):
+        return {"accepted": False, "error": "unavailable"}
+
+    order = client.insert_row("orders", {
+        "item_id": item["item_id"],
+        "auction_id": item["auction_id"],
+        "buyer_id": params["p_buyer_id"],
+        "buyer_email": params["p_buyer_email"],
+        "buyer_name": params["p_buyer_name"],
+        "amount": item["buy_now_price"],
+        "order_type": "buy_now",
+    })
+    item["is_sold"] = True
+    item["sold_at"] = now_iso()
+    return {
+        "accepted": True,
+        "order": dict(order),
+        "auction_id": item["auction_id"],
+        "replayed": False,
+    }
+
+
+def reorder_item_images(client, params: dict) -> list:
+    """Port of sql/reorder_item_images.sql"""
+    updated = []
+    for entry in params["p_orders"]:
+        for position, image_id in enumerate(entry["image_ids"], start=1):
+            image = find_row(client, "item_images", "image_id", image_id)
+            if image is not None and image["item_id"] == entry["item_id"]:
+                image["position"] = position
+                updated.append(dict(image))
+    return updated
+
+
+def set_suggested_starting_prices(client, params: dict) -> int:
+    """Port of set_suggested_starting_prices in sql/suggested_starting_price.sql"""
+    updated = 0
+    for item in client.tables.get("items", []):
+        if item["item_id"] in params["p_prices"]:
+            item["suggested_starting_price"] = params["p_prices"][item["item_id"]]
+            updated += 1
+    return updated
+
+
+# rpc name -> fn(client, params); functions left out here make main.py take its fallback path
+FUNCTIONS = {
+    "place_bid_atomic": place_bid_atomic,
+    "buy_now_atomic": buy_now_atomic,
+    "reorder_item_images": reorder_item_images,
+    "set_suggested_starting_prices": set_suggested_starting_prices,
+}
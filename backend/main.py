@@ -1,42 +1,401 @@
-from fastapi import FastAPI, HTTPException, File, UploadFile, Form
+from fastapi import FastAPI, HTTPException, File, UploadFile, Form, Header, Request
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from starlette.datastructures import Headers, MutableHeaders
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
 from dotenv import load_dotenv
-
-# Monkey-patch httpx to disable HTTP/2 before any other imports
-# This fixes WinError 10035 on Windows with HTTP/2 connections
 import httpx
-_original_client_init = httpx.Client.__init__
-def _patched_client_init(self, *args, **kwargs):
-    kwargs['http2'] = False  # Force HTTP/1.1
-    return _original_client_init(self, *args, **kwargs)
-httpx.Client.__init__ = _patched_client_init
-
-from supabase import create_client, Client
-from openai import OpenAI
-from pydantic import BaseModel
+from supabase import AsyncClient, AsyncClientOptions
+from postgrest import AsyncPostgrestClient
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient, NotFoundError, RateLimitError
+from pydantic import BaseModel, ValidationError
+from PIL import Image, ImageOps
+import numpy as np
 import os
+import re
+import sys
 import base64
+import bisect
+import csv
+import functools
+import hashlib
+import io
+import logging
 from typing import Optional, List
-from agents import Agent, Runner, WebSearchTool
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from agents import Agent, OpenAIProvider, RunConfig, Runner, WebSearchTool, set_tracing_export_api_key
 import asyncio
+import heapq
+import itertools
+import json
+import statistics
+import sqlite3
 import time
+import uuid
 
 # load env from root dir
 root_dir = os.path.dirname(os.path.dirname(__file__))
 load_dotenv(os.path.join(root_dir, '.env'))
 
+logger = logging.getLogger(__name__)
+
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 OPENAI_DESCRIPTION_KEY = os.getenv("OPENAI_DESCRIPTION_KEY")
 OPENAI_COMPS_KEY = os.getenv("OPENAI_COMPS_KEY")
 
-# setup supabase client
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+# shared PostgREST connection pool
+# HTTP/2 triggers WinError 10035 on Windows, so it's only on by default elsewhere
+DB_HTTP2 = os.getenv("DB_HTTP2", "false" if sys.platform == "win32" else "true").lower() == "true"
+DB_MAX_CONNECTIONS = int(os.getenv("DB_MAX_CONNECTIONS", "100"))
+DB_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("DB_MAX_KEEPALIVE_CONNECTIONS", "20"))
+DB_TIMEOUT_SECONDS = float(os.getenv("DB_TIMEOUT_SECONDS", "30"))
+
+# shared OpenAI connection pool (descriptions + comps agent)
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "50"))
+OPENAI_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("OPENAI_MAX_KEEPALIVE_CONNECTIONS", "20"))
+
+# PostgREST caps rows per response (Supabase default is 1000) and long in_() lists overflow URL limits
+DB_PAGE_SIZE = int(os.getenv("DB_PAGE_SIZE", "1000"))
+DB_IN_CHUNK_SIZE = int(os.getenv("DB_IN_CHUNK_SIZE", "200"))
+
+# public auction page cache: catalog (auction/items/images) vs hot bid overlay
+PUBLIC_CATALOG_TTL_SECONDS = float(os.getenv("PUBLIC_CATALOG_TTL_SECONDS", "300"))
+PUBLIC_BIDS_TTL_SECONDS = float(os.getenv("PUBLIC_BIDS_TTL_SECONDS", "30"))
+
+# comps agent scheduling: in-flight cap plus per-minute request/token budgets
+COMPS_MAX_IN_FLIGHT = int(os.getenv("COMPS_MAX_IN_FLIGHT", "8"))
+COMPS_REQUESTS_PER_MINUTE = float(os.getenv("COMPS_REQUESTS_PER_MINUTE", "60"))
+COMPS_TOKENS_PER_MINUTE = float(os.getenv("COMPS_TOKENS_PER_MINUTE", "400000"))
+COMPS_EST_TOKENS_PER_RUN = int(os.getenv("COMPS_EST_TOKENS_PER_RUN", "20000"))
+COMPS_RATE_LIMIT_RETRIES = int(os.getenv("COMPS_RATE_LIMIT_RETRIES", "5"))
+
+# comps result cache - COMPS_CACHE_PATH adds an on-disk SQLite tier
+COMPS_CACHE_TTL_SECONDS = float(os.getenv("COMPS_CACHE_TTL_SECONDS", "86400"))
+COMPS_CACHE_MAX_ENTRIES = int(os.getenv("COMPS_CACHE_MAX_ENTRIES", "2000"))
+COMPS_CACHE_PATH = os.getenv("COMPS_CACHE_PATH")
+
+# suggested starting price: strategy (mean, median, recency_weighted, trimmed_mean) and discount off the estimate
+PRICING_STRATEGY = os.getenv("PRICING_STRATEGY", "mean")
+PRICING_START_RATIO = float(os.getenv("PRICING_START_RATIO", "0.8"))
+PRICING_RECENCY_HALF_LIFE_DAYS = float(os.getenv("PRICING_RECENCY_HALF_LIFE_DAYS", "180"))
+
+# auction analytics cache - dropped on bid/comp writes, TTL bounds staleness from other workers
+ANALYTICS_CACHE_TTL_SECONDS = float(os.getenv("ANALYTICS_CACHE_TTL_SECONDS", "300"))
+ANALYTICS_CACHE_MAX_ENTRIES = int(os.getenv("ANALYTICS_CACHE_MAX_ENTRIES", "500"))
+
+# comps batch jobs: durable state in a local SQLite file, worked by a bounded pool.
+# The file is per-instance - production runs one instance with it on a persistent volume.
+COMPS_JOBS_DB_PATH = os.getenv("COMPS_JOBS_DB_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "comps_jobs.sqlite3"))
+COMPS_BATCH_CONCURRENCY = int(os.getenv("COMPS_BATCH_CONCURRENCY", "5"))
+
+# vision image preprocessing: uploads are downscaled and re-encoded before the API call
+VISION_MAX_UPLOAD_BYTES = int(os.getenv("VISION_MAX_UPLOAD_BYTES", str(25 * 1024 * 1024)))
+# all images of one description batch together - the batch is buffered in memory
+VISION_BATCH_MAX_UPLOAD_BYTES = int(os.getenv("VISION_BATCH_MAX_UPLOAD_BYTES", str(200 * 1024 * 1024)))
+VISION_MAX_EDGE = int(os.getenv("VISION_MAX_EDGE", "1536"))
+VISION_IMAGE_FORMAT = os.getenv("VISION_IMAGE_FORMAT", "jpeg").lower()
+VISION_IMAGE_QUALITY = int(os.getenv("VISION_IMAGE_QUALITY", "85"))
+VISION_IMAGE_DETAIL = os.getenv("VISION_IMAGE_DETAIL", "high")
+VISION_IMAGE_CACHE_TTL_SECONDS = float(os.getenv("VISION_IMAGE_CACHE_TTL_SECONDS", "3600"))
+VISION_IMAGE_CACHE_MAX_ENTRIES = int(os.getenv("VISION_IMAGE_CACHE_MAX_ENTRIES", "128"))
+
+# generated description cache - DESCRIPTION_CACHE_PATH adds an on-disk SQLite tier
+DESCRIPTION_CACHE_TTL_SECONDS = float(os.getenv("DESCRIPTION_CACHE_TTL_SECONDS", "604800"))
+DESCRIPTION_CACHE_MAX_ENTRIES = int(os.getenv("DESCRIPTION_CACHE_MAX_ENTRIES", "5000"))
+DESCRIPTION_CACHE_PATH = os.getenv("DESCRIPTION_CACHE_PATH")
+
+# catalog import: rows parsed and inserted per chunk, so memory stays flat for any file size
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "500"))
+
+# batch descriptions: vision calls in flight per streaming batch request
+DESCRIPTION_BATCH_CONCURRENCY = int(os.getenv("DESCRIPTION_BATCH_CONCURRENCY", "5"))
+
+# auction close scheduler; soft close extends end_time when a bid lands in the final window (0 = off)
+AUCTION_CLOSE_RETRY_SECONDS = float(os.getenv("AUCTION_CLOSE_RETRY_SECONDS", "30"))
+AUCTION_SOFT_CLOSE_SECONDS = float(os.getenv("AUCTION_SOFT_CLOSE_SECONDS", "0"))
+AUCTION_SOFT_CLOSE_EXTENSION_SECONDS = float(os.getenv("AUCTION_SOFT_CLOSE_EXTENSION_SECONDS", "60"))
+
+# Idempotency-Key responses for bid/buy-now retries; optional SQLite file keeps them across restarts
+IDEMPOTENCY_TTL_SECONDS = float(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+IDEMPOTENCY_MAX_ENTRIES = int(os.getenv("IDEMPOTENCY_MAX_ENTRIES", "10000"))
+IDEMPOTENCY_CACHE_PATH = os.getenv("IDEMPOTENCY_CACHE_PATH")
+
+# live bid stream tuning
+BID_STREAM_HEARTBEAT_SECONDS = float(os.getenv("BID_STREAM_HEARTBEAT_SECONDS", "15"))
+BID_STREAM_QUEUE_SIZE = int(os.getenv("BID_STREAM_QUEUE_SIZE", "1000"))
+
+# ============================================
+# METRICS (Prometheus text format, per process)
+# ============================================
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+DB_CALL_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100, 250)
+
+
+class Metrics:
+    """
+    Minimal in-process Prometheus registry: counters, gauges and histograms,
+    each with fixed label names. Values are positional label values, so the
+    hot path is a dict lookup and a bisect.
+    """
+
+    def __init__(self):
+        self._meta = {}  # name -> (type, help, label names, buckets)
+        self._values = {}  # name -> {label values: float | [bucket counts..., sum]}
+
+    def register(self, kind: str, name: str, help_text: str, labels: tuple = (), buckets: tuple = None):
+        self._meta[name] = (kind, help_text, labels, buckets)
+        self._values[name] = {}
+
+    def inc(self, name: str, amount: float = 1.0, *labels):
+        values = self._values[name]
+        values[labels] = values.get(labels, 0.0) + amount
+
+    def set(self, name: str, value: float, *labels):
+        self._values[name][labels] = value
+
+    def observe(self, name: str, value: float, *labels):
+        buckets = self._meta[name][3]
+        values = self._values[name]
+        series = values.get(labels)
+        if series is None:
+            series = values[labels] = [0] * (len(buckets) + 1) + [0.0]
+        series[bisect.bisect_left(buckets, value)] += 1
+        series[-1] += value
+
+    def samples(self, name: str) -> dict:
+        """Snapshot of a metric's series: {label values: value} (histograms: [bucket counts..., sum])"""
+        return dict(self._values[name])
+
+    def render(self) -> str:
+        lines = []
+        for name, (kind, help_text, label_names, buckets) in self._meta.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in self._values[name].items():
+                pairs = [f'{key}="{escape_label(val)}"' for key, val in zip(label_names, labels)]
+                if kind != "histogram":
+                    lines.append(f"{name}{format_labels(pairs)} {value}")
+                    continue
+                cumulative = 0
+                for bound, count in zip(buckets + (float("inf"),), value):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    bucket_labels = format_labels(pairs + [f'le="{le}"'])
+                    lines.append(f"{name}_bucket{bucket_labels} {cumulative}")
+                lines.append(f"{name}_sum{format_labels(pairs)} {value[-1]}")
+                lines.append(f"{name}_count{format_labels(pairs)} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+
+def escape_label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(pairs: list) -> str:
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+metrics = Metrics()
+metrics.register("histogram", "http_request_duration_seconds", "Request latency by route", ("method", "route", "status"), LATENCY_BUCKETS)
+metrics.register("histogram", "http_request_db_calls", "PostgREST round trips per request", ("method", "route"), DB_CALL_BUCKETS)
+metrics.register("histogram", "db_query_duration_seconds", "PostgREST call latency by table and operation", ("table", "operation"), LATENCY_BUCKETS)
+metrics.register("counter", "db_query_errors_total", "PostgREST calls that raised", ("table", "operation"))
+metrics.register("histogram", "openai_request_duration_seconds", "OpenAI API call and agent run latency", ("operation",), LATENCY_BUCKETS)
+metrics.register("counter", "openai_tokens_total", "OpenAI tokens used", ("operation", "kind"))
+metrics.register("counter", "cache_requests_total", "Cache lookups by result", ("cache", "result"))
+metrics.register("gauge", "cache_hit_ratio", "Share of cache lookups that hit since start", ("cache",))
+
+# per-request {kind: [calls, seconds]} for the Server-Timing header; None outside a request
+request_timings: ContextVar[Optional[dict]] = ContextVar("request_timings", default=None)
+
+
+def record_timing(kind: str, seconds: float):
+    timings = request_timings.get()
+    if timings is not None:
+        entry = timings.setdefault(kind, [0, 0.0])
+        entry[0] += 1
+        entry[1] += seconds
+
+
+def record_cache_lookup(cache: str, hit: bool):
+    metrics.inc("cache_requests_total", 1, cache, "hit" if hit else "miss")
+
+
+def record_openai_call(operation: str, seconds: float, prompt_tokens: int = None, completion_tokens: int = None):
+    """Latency and token usage for one OpenAI call or agent run"""
+    metrics.observe("openai_request_duration_seconds", seconds, operation)
+    if prompt_tokens:
+        metrics.inc("openai_tokens_total", prompt_tokens, operation, "prompt")
+    if completion_tokens:
+        metrics.inc("openai_tokens_total", completion_tokens, operation, "completion")
+    record_timing("openai", seconds)
+
+
+class InstrumentedQuery:
+    """Proxies a PostgREST request builder through its call chain and times execute()"""
+
+    __slots__ = ("_builder", "_table", "_operation")
+
+    def __init__(self, builder, table: str, operation: str = "select"):
+        self._builder = builder
+        self._table = table
+        self._operation = operation
+
+    def __getattr__(self, name):
+        attr = getattr(self._builder, name)
+        if not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            result = attr(*args, **kwargs)
+            if not hasattr(result, "execute"):
+                return result
+            operation = name if name in ("insert", "upsert", "update", "delete") else self._operation
+            return InstrumentedQuery(result, self._table, operation)
+        return call
+
+    async def execute(self):
+        start = time.perf_counter()
+        try:
+            return await self._builder.execute()
+        except Exception:
+            metrics.inc("db_query_errors_total", 1, self._table, self._operation)
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            metrics.observe("db_query_duration_seconds", elapsed, self._table, self._operation)
+            record_timing("db", elapsed)
+
+
+class InstrumentedSupabase:
+    """Wraps a Supabase client so every table()/rpc() call is counted and timed"""
+
+    def __init__(self, client):
+        self._client = client
+
+    def table(self, name: str) -> InstrumentedQuery:
+        return InstrumentedQuery(self._client.table(name), name)
+
+    def rpc(self, fn: str, *args, **kwargs) -> InstrumentedQuery:
+        return InstrumentedQuery(self._client.rpc(fn, *args, **kwargs), fn, "rpc")
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+def server_timing_header(timings: dict, total: float) -> str:
+    parts = [
+        f'{kind};dur={seconds * 1000:.1f};desc="{calls} call{"s" if calls != 1 else ""}"'
+        for kind, (calls, seconds) in timings.items()
+    ]
+    parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts)
+
+
+class MetricsMiddleware:
+    """ASGI middleware: per-route latency and DB call histograms plus a Server-Timing header"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = {}
+        token = request_timings.set(timings)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", server_timing_header(timings, time.perf_counter() - start))
+                # browsers only expose Server-Timing cross-origin with Timing-Allow-Origin
+                origin = Headers(scope=scope).get("origin")
+                if origin and ("*" in allowed_origins or origin in allowed_origins):
+                    headers.append("Timing-Allow-Origin", origin)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            request_timings.reset(token)
+            # route template, not the raw path, so ids don't explode label cardinality
+            route = getattr(scope.get("route"), "path", "unmatched")
+            metrics.observe("http_request_duration_seconds", time.perf_counter() - start, scope["method"], route, str(status))
+            metrics.observe("http_request_db_calls", timings.get("db", (0,))[0], scope["method"], route)
+
+
+class PooledPostgrestClient(AsyncPostgrestClient):
+    """PostgREST client on one tuned connection pool, HTTP/2 where the platform supports it"""
+
+    def create_session(self, base_url, headers, timeout, verify=True, proxy=None) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            base_url=base_url,
+            headers=headers,
+            timeout=timeout,
+            verify=verify,
+            proxy=proxy,
+            follow_redirects=True,
+            http2=DB_HTTP2,
+            limits=httpx.Limits(
+                max_connections=DB_MAX_CONNECTIONS,
+                max_keepalive_connections=DB_MAX_KEEPALIVE_CONNECTIONS
+            )
+        )
+
+
+class PooledSupabaseClient(AsyncClient):
+    """Async Supabase client whose table()/rpc() calls share the pooled PostgREST session"""
+
+    @staticmethod
+    def _init_postgrest_client(rest_url, headers, schema, timeout=DB_TIMEOUT_SECONDS, verify=True, proxy=None):
+        return PooledPostgrestClient(rest_url, headers=headers, schema=schema, timeout=timeout, verify=verify, proxy=proxy)
+
+
+# setup supabase client (async - every query is awaited on the event loop, and timed for /metrics)
+supabase = InstrumentedSupabase(PooledSupabaseClient(
+    SUPABASE_URL,
+    SUPABASE_KEY,
+    AsyncClientOptions(postgrest_client_timeout=DB_TIMEOUT_SECONDS)
+))
+
+# one pooled HTTP client shared by every OpenAI client in the process
+openai_http_client = DefaultAsyncHttpxClient(
+    limits=httpx.Limits(
+        max_connections=OPENAI_MAX_CONNECTIONS,
+        max_keepalive_connections=OPENAI_MAX_KEEPALIVE_CONNECTIONS
+    )
+)
 
 # setup openai client for descriptions
-openai_description_client = OpenAI(api_key=OPENAI_DESCRIPTION_KEY) if OPENAI_DESCRIPTION_KEY else None
+openai_description_client = AsyncOpenAI(api_key=OPENAI_DESCRIPTION_KEY, http_client=openai_http_client) if OPENAI_DESCRIPTION_KEY else None
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # resume comps batches left unfinished by the last process
+    await comps_batch_runner.start()
+    # close published auctions as their end_time passes
+    auction_closer.start()
+    yield
+    await auction_closer.stop()
+    await comps_batch_runner.stop()
+    # release pooled DB and OpenAI connections on shutdown
+    await supabase.postgrest.aclose()
+    await openai_http_client.aclose()
 
-app = FastAPI()
+
+app = FastAPI(lifespan=lifespan)
 
 # Get allowed origins from environment or use defaults
 # In production, set ALLOWED_ORIGINS env variable to your frontend domain
@@ -60,17 +419,269 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
 
 
 @app.get("/")
-def root():
+async def root():
     return {"message": "all good"}
 
+
+# Prometheus scrape endpoint (numbers are per worker process)
+@app.get("/metrics")
+async def get_metrics():
+    counts = {}
+    for (cache, result), value in metrics.samples("cache_requests_total").items():
+        counts.setdefault(cache, {})[result] = value
+    for cache, results in counts.items():
+        metrics.set("cache_hit_ratio", results.get("hit", 0) / sum(results.values()), cache)
+    return Response(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+def is_missing_function(error: Exception) -> bool:
+    """True when an rpc failed because the SQL function isn't installed (PostgREST PGRST202 / Postgres 42883)"""
+    return getattr(error, "code", None) in ("PGRST202", "42883")
+
+
+def is_missing_conflict_target(error: Exception) -> bool:
+    """True when an upsert failed because no unique index matches its on_conflict columns (Postgres 42P10)"""
+    return getattr(error, "code", None) == "42P10"
+
+
+async def select_in(table: str, column: str, values: list, columns: str = "*", order: list = None, filters=None):
+    """
+    Fetch every row of a table whose column is in values.
+    Splits long value lists into chunks and pages past the PostgREST row cap,
+    so callers get one batched fetch instead of a query per value.
+    order: list of (column, desc) pairs; filters: optional callable(query) -> query
+    """
+    rows = []
+    for start in range(0, len(values), DB_IN_CHUNK_SIZE):
+        chunk = values[start:start + DB_IN_CHUNK_SIZE]
+        offset = 0
+        while True:
+            query = supabase.table(table).select(columns).in_(column, chunk)
+            if filters:
+                query = filters(query)
+            for col, desc in order or []:
+                query = query.order(col, desc=desc)
+            page = await query.range(offset, offset + DB_PAGE_SIZE - 1).execute()
+            page_rows = page.data or []
+            rows.extend(page_rows)
+            if len(page_rows) < DB_PAGE_SIZE:
+                break
+            offset += DB_PAGE_SIZE
+    return rows
+
+
+async def insert_rows(table: str, rows: list, key: str = None, on_conflict: str = None) -> list:
+    """
+    Insert rows in as few requests as possible (DB_PAGE_SIZE rows per insert).
+    Returns the inserted rows in input order. With key set, rows from earlier
+    chunks are deleted again if a later chunk fails. With on_conflict set, rows
+    are upserted on those columns, so re-running the same insert is safe.
+    """
+    inserted = []
+    try:
+        for start in range(0, len(rows), DB_PAGE_SIZE):
+            chunk = rows[start:start + DB_PAGE_SIZE]
+            if on_conflict:
+                query = supabase.table(table).upsert(chunk, on_conflict=on_conflict)
+            else:
+                query = supabase.table(table).insert(chunk)
+            res = await query.execute()
+            if not res.data:
+                raise HTTPException(500, f"Failed to insert into {table}")
+            inserted.extend(res.data)
+    except Exception:
+        if key and inserted:
+            await delete_in(table, key, [row[key] for row in inserted])
+        raise
+    return inserted
+
+
+async def delete_in(table: str, column: str, values: list) -> int:
+    """Delete every row of a table whose column is in values, in DB_IN_CHUNK_SIZE chunks; returns rows deleted"""
+    deleted = 0
+    for start in range(0, len(values), DB_IN_CHUNK_SIZE):
+        chunk = values[start:start + DB_IN_CHUNK_SIZE]
+        res = await supabase.table(table).delete(count="exact", returning="minimal").in_(column, chunk).execute()
+        deleted += res.count or 0
+    return deleted
+
+
+def encode_cursor(row: dict, key: str) -> str:
+    """Opaque keyset cursor for the (created_at, key) position of a row"""
+    raw = json.dumps([row["created_at"], row[key]]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, key_value = json.loads(raw)
+        return str(created_at), str(key_value)
+    except (ValueError, TypeError):
+        raise HTTPException(400, "Invalid cursor")
+
+
+def parse_fields(fields: str, required: tuple) -> str:
+    """select() column list for a fields= projection; required columns are always included"""
+    if not fields:
+        return "*"
+    columns = [f.strip() for f in fields.split(",") if f.strip()]
+    for column in columns:
+        if not re.fullmatch(r"[A-Za-z_][A-Za-z0-9_]*", column):
+            raise HTTPException(400, f"Invalid field name: {column}")
+    return ", ".join(dict.fromkeys(list(required) + columns))
+
+
+def parse_include(include: str, allowed: tuple) -> set:
+    """Set of related collections requested with include= (e.g. "images,comps")"""
+    requested = {i.strip() for i in (include or "").split(",") if i.strip()}
+    unknown = requested - set(allowed)
+    if unknown:
+        raise HTTPException(400, f"Unknown include: {', '.join(sorted(unknown))}. Allowed: {', '.join(allowed)}")
+    return requested
+
+
+async def select_keyset(build_query, key: str, limit: int = None, cursor: str = None) -> tuple:
+    """
+    Newest-first keyset pagination on (created_at, key).
+    build_query() returns a fresh filtered select. With a limit, returns one page
+    and the cursor for the next one (None on the last page); without a limit,
+    walks every page and returns all rows.
+    Returns (rows, next_cursor).
+    """
+    rows = []
+    page_size = min(limit, DB_PAGE_SIZE) if limit else DB_PAGE_SIZE
+    while True:
+        query = build_query()
+        if cursor:
+            created_at, key_value = decode_cursor(cursor)
+            # values are quoted - timestamps contain characters PostgREST treats as syntax
+            query = query.or_(f'created_at.lt."{created_at}",and(created_at.eq."{created_at}",{key}.lt."{key_value}")')
+        page = await query.order("created_at", desc=True).order(key, desc=True).limit(page_size + 1).execute()
+        page_rows = page.data or []
+        has_more = len(page_rows) > page_size
+        page_rows = page_rows[:page_size]
+        rows.extend(page_rows)
+        cursor = encode_cursor(page_rows[-1], key) if has_more else None
+        if limit or not has_more:
+            return rows, cursor
+
+
+# ============================================
+# CACHES
+# ============================================
+
+def on_db_thread(method):
+    """Make a blocking SQLite method awaitable: it runs on the owner's single DB thread (self._db_thread), off the event loop"""
+    @functools.wraps(method)
+    async def run(self, *args, **kwargs):
+        return await asyncio.get_running_loop().run_in_executor(self._db_thread, functools.partial(method, self, *args, **kwargs))
+    return run
+
+
+class TTLCache:
+    """
+    In-memory LRU cache with a per-entry TTL and an optional SQLite tier.
+    With persist_path set, entries are written through to disk (values must
+    be JSON-serializable) and survive restarts; several caches can share
+    one file under different namespaces. Disk writes are queued on a
+    dedicated thread and async callers read through aget(), so a slow disk
+    never stalls the event loop.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float, persist_path: str = None, namespace: str = "default"):
+        self._max_entries = max_entries
+        self._ttl = ttl_seconds
+        self._namespace = namespace
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._db = None
+        self._db_thread = None
+        if persist_path:
+            self._db_thread = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"cache-{namespace}")
+            self._db = sqlite3.connect(persist_path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS cache_entries (
+                    namespace TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    PRIMARY KEY (namespace, key)
+                )
+            """)
+
+    def get(self, key: str):
+        """Lookup that may block on the SQLite tier - async code on a persisted cache should use aget"""
+        found, value = self._memory_get(key)
+        if not found and self._db is not None:
+            found, value = self._remember_row(key, self._disk_row(key))
+        record_cache_lookup(self._namespace, found)
+        return value
+
+    async def aget(self, key: str):
+        """get() with the SQLite lookup on the cache's DB thread"""
+        found, value = self._memory_get(key)
+        if not found and self._db is not None:
+            row = await asyncio.get_running_loop().run_in_executor(self._db_thread, self._disk_row, key)
+            # a set() while the read was in flight is newer than the row
+            found, value = self._memory_get(key)
+            if not found:
+                found, value = self._remember_row(key, row)
+        record_cache_lookup(self._namespace, found)
+        return value
+
+    def set(self, key: str, value):
+        expires_at = time.time() + self._ttl
+        self._remember(key, expires_at, value)
+        if self._db is not None:
+            self._db_thread.submit(
+                self._db.execute,
+                "INSERT OR REPLACE INTO cache_entries VALUES (?, ?, ?, ?)",
+                (self._namespace, key, json.dumps(value), expires_at)
+            )
+
+    def delete(self, key: str):
+        self._entries.pop(key, None)
+        if self._db is not None:
+            self._db_thread.submit(self._db.execute, "DELETE FROM cache_entries WHERE namespace = ? AND key = ?", (self._namespace, key))
+
+    def _memory_get(self, key: str) -> tuple:
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[0] > time.time():
+                self._entries.move_to_end(key)
+                return True, entry[1]
+            del self._entries[key]
+        return False, None
+
+    def _disk_row(self, key: str):
+        return self._db.execute(
+            "SELECT value, expires_at FROM cache_entries WHERE namespace = ? AND key = ?",
+            (self._namespace, key)
+        ).fetchone()
+
+    def _remember_row(self, key: str, row) -> tuple:
+        if row is None or row[1] <= time.time():
+            return False, None
+        value = json.loads(row[0])
+        self._remember(key, row[1], value)
+        return True, value
+
+    def _remember(self, key: str, expires_at: float, value):
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
 # PROFILE ENDPOINTS
 
 # create a new user/profile
 @app.post("/users")
-def create_user(email: str, role: str = "staff"):
+async def create_user(email: str, role: str = "staff"):
     # check inputs
     if not email.strip():
         raise HTTPException(400, "Email cannot be empty")
@@ -79,12 +690,12 @@ def create_user(email: str, role: str = "staff"):
         raise HTTPException(400, "Role must be 'admin' or 'staff'")
 
     # email must be unique
-    existing = supabase.table("profiles").select("profile_id").eq("email", email).execute()
+    existing = await supabase.table("profiles").select("profile_id").eq("email", email).execute()
     if existing.data:
         raise HTTPException(400, "Email already exists")
 
     # save to db
-    result = supabase.table("profiles").insert({
+    result = await supabase.table("profiles").insert({
         "email": email.strip(),
         "role": role
     }).execute()
@@ -95,42 +706,42 @@ def create_user(email: str, role: str = "staff"):
 
 # get one user by id
 @app.get("/users/{profile_id}")
-def get_user(profile_id: str):
+async def get_user(profile_id: str):
     # lookup user
-    user = supabase.table("profiles").select("*").eq("profile_id", profile_id).execute()
+    user = await supabase.table("profiles").select("*").eq("profile_id", profile_id).execute()
     if not user.data:
         raise HTTPException(404, "User not found")
     return user.data[0]
 
 # update user email
 @app.put("/users/{profile_id}/email")
-def update_user_email(profile_id: str, email: str):
+async def update_user_email(profile_id: str, email: str):
     # verify user exists
-    user = supabase.table("profiles").select("profile_id").eq("profile_id", profile_id).execute()
+    user = await supabase.table("profiles").select("profile_id").eq("profile_id", profile_id).execute()
     if not user.data:
         raise HTTPException(404, "User not found")
 
     # email must be available
-    taken = supabase.table("profiles").select("profile_id").eq("email", email).execute()
+    taken = await supabase.table("profiles").select("profile_id").eq("email", email).execute()
     if taken.data and taken.data[0]["profile_id"] != profile_id:
         raise HTTPException(400, "Email already exists")
 
     # save new email
-    res = supabase.table("profiles").update({"email": email.strip()}).eq("profile_id", profile_id).execute()
+    res = await supabase.table("profiles").update({"email": email.strip()}).eq("profile_id", profile_id).execute()
     if not res.data:
         raise HTTPException(500, "Failed to update email")
     return res.data[0]
 
 # activate user account
 @app.post("/payments")
-def make_payment(profile_id: str):
+async def make_payment(profile_id: str):
     # lookup user
-    user = supabase.table("profiles").select("*").eq("profile_id", profile_id).execute()
+    user = await supabase.table("profiles").select("*").eq("profile_id", profile_id).execute()
     if not user.data:
         raise HTTPException(404, "User not found")
 
     # mark as active
-    result = supabase.table("profiles").update({"is_active": True}).eq("profile_id", profile_id).execute()
+    result = await supabase.table("profiles").update({"is_active": True}).eq("profile_id", profile_id).execute()
     if not result.data:
         raise HTTPException(500, "Failed to update payment status")
 
@@ -140,16 +751,16 @@ def make_payment(profile_id: str):
 
 # make new auction
 @app.post("/auctions")
-def create_auction(profile_id: str, auction_name: str):
+async def create_auction(profile_id: str, auction_name: str):
     # check inputs
     if not auction_name.strip():
         raise HTTPException(400, "Auction name cannot be empty")
 
     # Check if profile exists - if not, auto-create it for new Supabase Auth users
-    prof = supabase.table("profiles").select("profile_id, is_active").eq("profile_id", profile_id).execute()
+    prof = await supabase.table("profiles").select("profile_id, is_active").eq("profile_id", profile_id).execute()
     if not prof.data:
         # Auto-create profile for new users (from Supabase Auth)
-        new_profile = supabase.table("profiles").insert({
+        new_profile = await supabase.table("profiles").insert({
             "profile_id": profile_id,
             "email": "",  # Will be updated later if needed
             "is_active": True
@@ -160,7 +771,7 @@ def create_auction(profile_id: str, auction_name: str):
         raise HTTPException(403, "User is not active")
 
     # create auction
-    result = supabase.table("auctions").insert({
+    result = await supabase.table("auctions").insert({
         "profile_id": profile_id,
         "auction_name": auction_name.strip()
     }).execute()
@@ -171,90 +782,214 @@ def create_auction(profile_id: str, auction_name: str):
 
 # GET auction by id
 @app.get("/auctions/{auction_id}")
-def get_auction(auction_id: str):
+async def get_auction(auction_id: str):
     # find auction
-    auction = supabase.table("auctions").select("*").eq("auction_id", auction_id).execute()
+    auction = await supabase.table("auctions").select("*").eq("auction_id", auction_id).execute()
     if not auction.data:
         raise HTTPException(404, "Auction not found")
     return auction.data[0]
 
 # GET all auctions for a user
 @app.get("/auctions")
-def list_auctions_by_user(profile_id: str):
+async def list_auctions_by_user(
+    profile_id: str,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    include: str = ""
+):
+    """
+    Auctions for a user, newest first. Same limit/cursor/fields paging as
+    GET /items; include=item_count adds the number of items in each auction.
+    """
+    if limit is not None and limit < 1:
+        raise HTTPException(400, "limit must be at least 1")
+    columns = parse_fields(fields, ("auction_id", "created_at"))
+    relations = parse_include(include, ("item_count",))
+    
     # Get all auctions for this user (don't require profile to exist in profiles table)
     # New users from Supabase Auth may not have a profiles entry yet
-    auctions = supabase.table("auctions").select("*").eq("profile_id", profile_id).order("created_at", desc=True).execute()
-    if not auctions.data:
-        return {"message": "No auctions found for this user", "auctions": []}
-
-    return {"profile_id": profile_id, "auctions": auctions.data}
+    auctions, next_cursor = await select_keyset(
+        lambda: supabase.table("auctions").select(columns).eq("profile_id", profile_id),
+        "auction_id", limit, cursor
+    )
+    if not auctions and not cursor:
+        return {"message": "No auctions found for this user", "auctions": [], "next_cursor": None}
+
+    if "item_count" in relations and auctions:
+        counts = {}
+        for item in await select_in("items", "auction_id", [a["auction_id"] for a in auctions], columns="auction_id"):
+            counts[item["auction_id"]] = counts.get(item["auction_id"], 0) + 1
+        for auction in auctions:
+            auction["item_count"] = counts.get(auction["auction_id"], 0)
+
+    return {"profile_id": profile_id, "auctions": auctions, "next_cursor": next_cursor}
 
 # UPDATE auction name
 @app.put("/auctions/{auction_id}")
-def update_auction(auction_id: str, auction_name: str):
+async def update_auction(auction_id: str, auction_name: str):
     # check auction exists
-    auction = supabase.table("auctions").select("auction_id").eq("auction_id", auction_id).execute()
+    auction = await supabase.table("auctions").select("auction_id").eq("auction_id", auction_id).execute()
     if not auction.data:
         raise HTTPException(404, "Auction not found")
 
     # update name
-    res = supabase.table("auctions").update({"auction_name": auction_name.strip()}).eq("auction_id", auction_id).execute()
+    res = await supabase.table("auctions").update({"auction_name": auction_name.strip()}).eq("auction_id", auction_id).execute()
     if not res.data:
         raise HTTPException(500, "Failed to update auction")
+    invalidate_auction_caches(auction_id=auction_id)
     return res.data[0]
 
+async def delete_auctions_cascade(auction_ids: list) -> dict:
+    """
+    Delete auctions with their items, images, comps, bids and orders.
+    Uses the delete_auctions_cascade RPC (one transaction), falling back to
+    batched in_() deletes when the function isn't installed.
+    Returns {"auction_ids": [...deleted], "deleted": {table: row count}}.
+    """
+    try:
+        # try rpc function first
+        result = await supabase.rpc("delete_auctions_cascade", {"p_auction_ids": auction_ids}).execute()
+        outcome = result.data
+    except Exception as e:
+        if not is_missing_function(e):
+            raise
+        # function not installed - fall back to batched deletes, children before parents
+        existing = await select_in("auctions", "auction_id", auction_ids, columns="auction_id")
+        found_ids = [a["auction_id"] for a in existing]
+        items = await select_in("items", "auction_id", found_ids, columns="item_id")
+        item_ids = [i["item_id"] for i in items]
+        deleted = {}
+        for table, column, values in (
+            ("comps", "item_id", item_ids),
+            ("item_images", "item_id", item_ids),
+            ("bids", "item_id", item_ids),
+            # like the SQL function: orders of the auctions and of their items
+            ("orders", "auction_id", found_ids),
+            ("orders", "item_id", item_ids),
+            ("items", "item_id", item_ids),
+            ("auctions", "auction_id", found_ids),
+        ):
+            deleted[table] = deleted.get(table, 0) + await delete_in(table, column, values)
+        outcome = {"auction_ids": found_ids, "deleted": deleted}
+    finally:
+        for auction_id in auction_ids:
+            auction_closer.unschedule(auction_id)
+            bid_ledger.invalidate(auction_id=auction_id)
+            invalidate_auction_caches(auction_id=auction_id)
+    return outcome
+
+
 # DELETE auction (with cascade deletion of related data)
 @app.delete("/auctions/{auction_id}")
-def delete_auction(auction_id: str):
-    # Check auction exists
-    auction = supabase.table("auctions").select("auction_id").eq("auction_id", auction_id).execute()
-    if not auction.data:
+async def delete_auction(auction_id: str):
+    try:
+        outcome = await delete_auctions_cascade([auction_id])
+    except Exception as e:
+        raise HTTPException(500, f"Failed to delete auction: {str(e)}")
+    
+    if not outcome["auction_ids"]:
         raise HTTPException(404, "Auction not found")
 
-    # Get all items in this auction
-    items_response = supabase.table("items").select("item_id").eq("auction_id", auction_id).execute()
-    item_ids = [item["item_id"] for item in items_response.data] if items_response.data else []
+    return {
+        "message": "Auction and all related data deleted successfully",
+        "auction_id": auction_id,
+        "deleted_items": outcome["deleted"]["items"],
+        "deleted": outcome["deleted"]
+    }
 
-    if item_ids:
-        # delete all comps for these items
-        try:
-            for item_id in item_ids:
-                supabase.table("comps").delete().eq("item_id", item_id).execute()
-        except Exception:
-            pass
 
-        # delete all item_images for these items
-        try:
-            for item_id in item_ids:
-                supabase.table("item_images").delete().eq("item_id", item_id).execute()
-        except Exception:
-            pass
+class BulkDeleteAuctionsRequest(BaseModel):
+    auction_ids: List[str]
 
-        # delete all items in this auction
-        try:
-            supabase.table("items").delete().eq("auction_id", auction_id).execute()
-        except Exception as e:
-            raise HTTPException(500, f"Failed to delete items: {str(e)}")
 
-    # Step 4: Finally delete the auction itself
+# DELETE many auctions (and their related data) at once
+@app.post("/auctions/bulk-delete")
+async def bulk_delete_auctions(request: BulkDeleteAuctionsRequest):
+    """Cascade-delete several auctions in one transaction; ids that don't exist are reported back"""
+    auction_ids = list(dict.fromkeys(request.auction_ids))
+    if not auction_ids:
+        raise HTTPException(400, "auction_ids cannot be empty")
+    
     try:
-        supabase.table("auctions").delete().eq("auction_id", auction_id).execute()
+        outcome = await delete_auctions_cascade(auction_ids)
     except Exception as e:
-        raise HTTPException(500, f"Failed to delete auction: {str(e)}")
-
+        raise HTTPException(500, f"Failed to delete auctions: {str(e)}")
+    
+    deleted_ids = set(outcome["auction_ids"])
     return {
-        "message": "Auction and all related data deleted successfully",
-        "auction_id": auction_id,
-        "deleted_items": len(item_ids)
+        "message": f"Deleted {len(deleted_ids)} auctions",
+        "auction_ids": outcome["auction_ids"],
+        "not_found": [a for a in auction_ids if a not in deleted_ids],
+        "deleted": outcome["deleted"]
     }
 
 # ============================================
 # ITEM ENDPOINTS
 # ============================================
 
+async def get_active_auction_owner(auction_id: str) -> str:
+    """Check the auction exists and its owner is active; returns the owner's profile_id"""
+    auction = await supabase.table("auctions").select("auction_id, profile_id").eq("auction_id", auction_id).execute()
+    if not auction.data:
+        raise HTTPException(404, "Auction not found")
+    
+    profile_id = auction.data[0]["profile_id"]
+    prof = await supabase.table("profiles").select("is_active").eq("profile_id", profile_id).execute()
+    if not prof.data or not prof.data[0]["is_active"]:
+        raise HTTPException(403, "User is not active")
+    return profile_id
+
+
+def clean_image_urls(urls: list) -> list:
+    """Strip blank image URLs and enforce 1..5 per item"""
+    images = [u.strip() for u in urls if u and u.strip()]
+    if len(images) == 0:
+        raise HTTPException(400, "At least one image URL is required")
+    if len(images) > 5:
+        raise HTTPException(400, "You can provide up to 5 image URLs")
+    return images
+
+
+def build_item_row(auction_id: str, title: str, brand: str = "", model: str = "", year: int = None,
+                   ai_description: str = "") -> dict:
+    """items row with the create defaults (Unknown brand/model, not listed until approved in settings)"""
+    return {
+        "auction_id": auction_id,
+        "title": title.strip(),
+        "brand": brand.strip() if brand and brand.strip() else "Unknown",
+        "model": model.strip() if model and model.strip() else "Unknown",
+        "year": year,
+        "ai_description": ai_description.strip() if ai_description else None,
+        "is_listed": False
+    }
+
+
+async def insert_items_with_images(item_rows: list, image_urls: list) -> tuple:
+    """
+    Insert many items and their images with one bulk insert per table.
+    image_urls[i] holds the URLs for item_rows[i]. If the image insert fails the
+    new items are deleted again so nothing is left half-created.
+    Returns (items, images).
+    """
+    items = await insert_rows("items", item_rows, key="item_id")
+    try:
+        image_rows = [
+            {"item_id": item["item_id"], "url": url, "position": position + 1}
+            for item, urls in zip(items, image_urls)
+            for position, url in enumerate(urls)
+        ]
+        images = await insert_rows("item_images", image_rows, key="image_id")
+    except Exception:
+        # delete items if images failed so we don't leave orphans
+        await delete_in("items", "item_id", [item["item_id"] for item in items])
+        raise
+    return items, images
+
+
 # create item + 1..5 image urls (now uses auction_id)
 @app.post("/items")
-def create_item(
+async def create_item(
     auction_id: str,
     title: str,
     image_url_1: str,
@@ -267,39 +1002,16 @@ def create_item(
     year: int | None = None,
     ai_description: str = ""
 ):
-    # check auction exists
-    auction = supabase.table("auctions").select("auction_id, profile_id").eq("auction_id", auction_id).execute()
-    if not auction.data:
-        raise HTTPException(404, "Auction not found")
-    
-    # verify profile is active
-    profile_id = auction.data[0]["profile_id"]
-    prof = supabase.table("profiles").select("is_active").eq("profile_id", profile_id).execute()
-    if not prof.data or not prof.data[0]["is_active"]:
-        raise HTTPException(403, "User is not active")
+    # check auction exists and its owner is active
+    await get_active_auction_owner(auction_id)
 
     # gather images and basic check 1..5
-    images = [u.strip() for u in [image_url_1, image_url_2, image_url_3, image_url_4, image_url_5] if u and u.strip()]
-    if len(images) == 0:
-        raise HTTPException(400, "At least one image URL is required")
-    if len(images) > 5:
-        raise HTTPException(400, "You can provide up to 5 image URLs")
-
-    # defaults for brand/model/year
-    brand_val = brand.strip() if brand.strip() else "Unknown"
-    model_val = model.strip() if model.strip() else "Unknown"
-    year_val = year if year is not None else None
+    images = clean_image_urls([image_url_1, image_url_2, image_url_3, image_url_4, image_url_5])
 
     # insert item (is_listed defaults to false - must be approved in settings)
-    item_res = supabase.table("items").insert({
-        "auction_id": auction_id,
-        "title": title.strip(),
-        "brand": brand_val,
-        "model": model_val,
-        "year": year_val,
-        "ai_description": ai_description.strip() if ai_description else None,
-        "is_listed": False
-    }).execute()
+    item_res = await supabase.table("items").insert(
+        build_item_row(auction_id, title, brand, model, year, ai_description)
+    ).execute()
     if not item_res.data:
         raise HTTPException(500, "Failed to create item")
 
@@ -308,129 +1020,155 @@ def create_item(
 
     # insert item images with positions
     rows = [{"item_id": item_id, "url": url, "position": i + 1} for i, url in enumerate(images)]
-    imgs_res = supabase.table("item_images").insert(rows).execute()
+    imgs_res = await supabase.table("item_images").insert(rows).execute()
     if not imgs_res.data:
         # delete item if images failed so we don't leave orphans
-        supabase.table("items").delete().eq("item_id", item_id).execute()
+        await supabase.table("items").delete().eq("item_id", item_id).execute()
         raise HTTPException(500, "Failed to add item images")
 
+    invalidate_auction_caches(auction_id=auction_id)
+
     # return both
     return {"item": item, "images": imgs_res.data}
 
+
+class BulkItem(BaseModel):
+    title: str
+    image_urls: List[str]
+    brand: str = ""
+    model: str = ""
+    year: Optional[int] = None
+    ai_description: str = ""
+
+
+# create many items + their images in one request
+@app.post("/items/bulk")
+async def create_items_bulk(auction_id: str, items: List[BulkItem]):
+    """
+    Create many items at once. The body is a JSON array of
+    {"title", "image_urls": [1..5 urls], "brand", "model", "year", "ai_description"}.
+    The auction and owner are checked once, then all items go in one insert and
+    all images in a second. Either every item is created or none are.
+    """
+    if not items:
+        raise HTTPException(400, "Items list cannot be empty")
+    if len(items) > 1000:
+        raise HTTPException(400, "Cannot create more than 1000 items per request")
+    
+    await get_active_auction_owner(auction_id)
+    
+    item_rows = []
+    image_urls = []
+    for index, item in enumerate(items):
+        try:
+            image_urls.append(clean_image_urls(item.image_urls))
+        except HTTPException as e:
+            raise HTTPException(400, f"Item {index}: {e.detail}")
+        item_rows.append(build_item_row(auction_id, item.title, item.brand, item.model, item.year, item.ai_description))
+    
+    try:
+        created, images = await insert_items_with_images(item_rows, image_urls)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(500, f"Failed to create items: {str(e)}")
+    
+    invalidate_auction_caches(auction_id=auction_id)
+    
+    images_by_item = {}
+    for image in images:
+        images_by_item.setdefault(image["item_id"], []).append(image)
+    
+    return {
+        "message": f"Created {len(created)} items",
+        "items": [{"item": item, "images": images_by_item.get(item["item_id"], [])} for item in created]
+    }
+
+async def attach_item_relations(items: list, include: set):
+    """Attach images and/or comps to items with one batched fetch each"""
+    if not items or not include:
+        return
+    item_ids = [i["item_id"] for i in items]
+    
+    if "images" in include:
+        grouped_images = {}
+        for img in await select_in("item_images", "item_id", item_ids):
+            grouped_images.setdefault(img["item_id"], []).append(img)
+        for it in items:
+            it["images"] = grouped_images.get(it["item_id"], [])
+    
+    if "comps" in include:
+        grouped_comps = {}
+        for comp in await select_in("comps", "item_id", item_ids):
+            grouped_comps.setdefault(comp["item_id"], []).append(comp)
+        for it in items:
+            it["comps"] = grouped_comps.get(it["item_id"], [])
+
+
 # GET all items for an auction
 @app.get("/items")
-def list_items(auction_id: str = None, profile_id: str = None):
+async def list_items(
+    auction_id: str = None,
+    profile_id: str = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    include: str = "images"
+):
     """
-    Get items by auction_id OR get all items across all auctions for a profile_id
+    Get items by auction_id OR get all items across all auctions for a profile_id.
+    Newest first. Pass limit for cursor pagination - the response's next_cursor
+    fetches the following page (null on the last one); without limit every item
+    is returned. fields=title,brand,... trims item columns and include picks the
+    related rows to attach (images by default; include=images,comps adds comps).
+    suggested_starting_price is stored on each item, so comps aren't needed for it.
     """
+    if limit is not None and limit < 1:
+        raise HTTPException(400, "limit must be at least 1")
+    columns = parse_fields(fields, ("item_id", "auction_id", "created_at"))
+    relations = parse_include(include, ("images", "comps"))
+    
     if auction_id:
         # get items for specific auction
-        auction = supabase.table("auctions").select("auction_id").eq("auction_id", auction_id).execute()
+        auction = await supabase.table("auctions").select("auction_id").eq("auction_id", auction_id).execute()
         if not auction.data:
             raise HTTPException(404, "Auction not found")
 
-        items = supabase.table("items").select("*").eq("auction_id", auction_id).order("created_at", desc=True).execute()
-        if not items.data:
-            return {"message": "No items found for this auction", "items": []}
-
-        # get images
-        item_ids = [i["item_id"] for i in items.data]
-        imgs = supabase.table("item_images").select("*").in_("item_id", item_ids).execute()
-        images = imgs.data if imgs.data else []
-
-        # get comps for all items
-        comps = supabase.table("comps").select("*").in_("item_id", item_ids).execute()
-        comps_data = comps.data if comps.data else []
-
-        # group images by item_id
-        grouped_images = {}
-        for img in images:
-            iid = img["item_id"]
-            if iid not in grouped_images:
-                grouped_images[iid] = []
-            grouped_images[iid].append(img)
+        items, next_cursor = await select_keyset(
+            lambda: supabase.table("items").select(columns).eq("auction_id", auction_id),
+            "item_id", limit, cursor
+        )
+        if not items and not cursor:
+            return {"message": "No items found for this auction", "items": [], "next_cursor": None}
 
-        # group comps by item_id and calculate suggested starting price
-        grouped_comps = {}
-        for comp in comps_data:
-            iid = comp["item_id"]
-            if iid not in grouped_comps:
-                grouped_comps[iid] = []
-            grouped_comps[iid].append(comp)
-
-        # attach images, comps, and suggested_starting_price to items
-        for it in items.data:
-            it["images"] = grouped_images.get(it["item_id"], [])
-            item_comps = grouped_comps.get(it["item_id"], [])
-            it["comps"] = item_comps
-            
-            # Calculate suggested starting price: average of comps * 0.8, rounded down to nearest 5
-            if item_comps:
-                avg_price = sum(c.get("sold_price", 0) for c in item_comps) / len(item_comps)
-                raw_suggested = avg_price * 0.8
-                it["suggested_starting_price"] = int(raw_suggested // 5) * 5  # Round down to nearest 5
-            else:
-                it["suggested_starting_price"] = None
+        # attach images (and comps if requested) to items
+        await attach_item_relations(items, relations)
 
-        return {"auction_id": auction_id, "items": items.data}
+        return {"auction_id": auction_id, "items": items, "next_cursor": next_cursor}
 
     elif profile_id:
         # get all items across all auctions for this profile
         try:
             # Don't require profile to exist in profiles table - just check auctions directly
             # New users from Supabase Auth may not have a profiles entry yet
-            auctions = supabase.table("auctions").select("auction_id").eq("profile_id", profile_id).execute()
+            auctions = await supabase.table("auctions").select("auction_id").eq("profile_id", profile_id).execute()
             if not auctions.data:
-                return {"message": "No auctions found for this user", "items": []}
+                return {"message": "No auctions found for this user", "items": [], "next_cursor": None}
 
             auction_ids = [a["auction_id"] for a in auctions.data]
 
-            # get all items in these auctions
-            items = supabase.table("items").select("*").in_("auction_id", auction_ids).order("created_at", desc=True).execute()
-            if not items.data:
-                return {"message": "No items found for this user", "items": []}
-
-            # get images
-            item_ids = [i["item_id"] for i in items.data]
-            imgs = supabase.table("item_images").select("*").in_("item_id", item_ids).execute()
-            images = imgs.data if imgs.data else []
-
-            # get comps for all items
-            comps = supabase.table("comps").select("*").in_("item_id", item_ids).execute()
-            comps_data = comps.data if comps.data else []
-
-            # group images by item_id
-            grouped_images = {}
-            for img in images:
-                iid = img["item_id"]
-                if iid not in grouped_images:
-                    grouped_images[iid] = []
-                grouped_images[iid].append(img)
-
-            # group comps by item_id
-            grouped_comps = {}
-            for comp in comps_data:
-                iid = comp["item_id"]
-                if iid not in grouped_comps:
-                    grouped_comps[iid] = []
-                grouped_comps[iid].append(comp)
-
-            # attach images, comps, and suggested_starting_price to items
-            for it in items.data:
-                it["images"] = grouped_images.get(it["item_id"], [])
-                item_comps = grouped_comps.get(it["item_id"], [])
-                it["comps"] = item_comps
-                
-                # Calculate suggested starting price: average of comps * 0.8
-                if item_comps:
-                    # Calculate suggested starting price: average of comps * 0.8, rounded down to nearest 5
-                    avg_price = sum(c.get("sold_price", 0) for c in item_comps) / len(item_comps)
-                    raw_suggested = avg_price * 0.8
-                    it["suggested_starting_price"] = int(raw_suggested // 5) * 5  # Round down to nearest 5
-                else:
-                    it["suggested_starting_price"] = None
-
-            return {"profile_id": profile_id, "items": items.data}
+            # get items in these auctions, one keyset page at a time
+            items, next_cursor = await select_keyset(
+                lambda: supabase.table("items").select(columns).in_("auction_id", auction_ids),
+                "item_id", limit, cursor
+            )
+            if not items and not cursor:
+                return {"message": "No items found for this user", "items": [], "next_cursor": None}
+
+            # attach images (and comps if requested) to items
+            await attach_item_relations(items, relations)
+
+            return {"profile_id": profile_id, "items": items, "next_cursor": next_cursor}
         
         except httpx.ReadError as e:
             raise HTTPException(503, "Database connection timeout. Please try again.")
@@ -444,14 +1182,14 @@ def list_items(auction_id: str = None, profile_id: str = None):
 
 # GET single item by id
 @app.get("/items/{item_id}")
-def get_item(item_id: str):
+async def get_item(item_id: str):
     # find item
-    item = supabase.table("items").select("*").eq("item_id", item_id).execute()
+    item = await supabase.table("items").select("*").eq("item_id", item_id).execute()
     if not item.data:
         raise HTTPException(404, "Item not found")
 
     # get images
-    imgs = supabase.table("item_images").select("*").eq("item_id", item_id).execute()
+    imgs = await supabase.table("item_images").select("*").eq("item_id", item_id).execute()
     item_data = item.data[0]
     item_data["images"] = imgs.data if imgs.data else []
 
@@ -459,7 +1197,7 @@ def get_item(item_id: str):
 
 # UPDATE item
 @app.put("/items/{item_id}")
-def update_item(
+async def update_item(
     item_id: str,
     title: str = None,
     brand: str = None,
@@ -467,7 +1205,7 @@ def update_item(
     year: int = None
 ):
     # check item exists
-    item = supabase.table("items").select("item_id").eq("item_id", item_id).execute()
+    item = await supabase.table("items").select("item_id").eq("item_id", item_id).execute()
     if not item.data:
         raise HTTPException(404, "Item not found")
 
@@ -486,17 +1224,20 @@ def update_item(
         raise HTTPException(400, "No fields to update")
 
     # update
-    res = supabase.table("items").update(updates).eq("item_id", item_id).execute()
+    res = await supabase.table("items").update(updates).eq("item_id", item_id).execute()
     if not res.data:
         raise HTTPException(500, "Failed to update item")
+    invalidate_auction_caches(auction_id=res.data[0].get("auction_id"), item_ids=[item_id])
     return res.data[0]
 
 # delete item and related data
 @app.delete("/items/{item_id}")
-def delete_item(item_id: str):
+async def delete_item(item_id: str):
+    bid_ledger.invalidate(item_ids=[item_id])
+    invalidate_auction_caches(item_ids=[item_id])
     try:
         # try rpc function first
-        result = supabase.rpc('delete_item_cascade', {'p_item_id': item_id}).execute()
+        result = await supabase.rpc('delete_item_cascade', {'p_item_id': item_id}).execute()
         
         if result.data is None or (isinstance(result.data, list) and len(result.data) == 0):
             raise HTTPException(404, "Item not found")
@@ -508,9 +1249,9 @@ def delete_item(item_id: str):
     except Exception as e:
         # fallback to manual deletion
         try:
-            supabase.table("comps").delete().eq("item_id", item_id).execute()
-            supabase.table("item_images").delete().eq("item_id", item_id).execute()
-            item_result = supabase.table("items").delete().eq("item_id", item_id).execute()
+            await supabase.table("comps").delete().eq("item_id", item_id).execute()
+            await supabase.table("item_images").delete().eq("item_id", item_id).execute()
+            item_result = await supabase.table("items").delete().eq("item_id", item_id).execute()
             
             if not item_result.data:
                 raise HTTPException(404, "Item not found")
@@ -519,22 +1260,108 @@ def delete_item(item_id: str):
         except Exception as fallback_error:
             raise HTTPException(500, f"Failed to delete item: {str(fallback_error)}")
 
+async def reorder_images(orders: dict, images: list = None) -> list:
+    """
+    Apply {item_id: [image_id, ...]} orders (list order -> positions 1..n) for any
+    number of items. Each list must name every image of its item exactly once.
+    Written by one reorder_item_images call (see sql/reorder_item_images.sql),
+    falling back to per-position updates when the function isn't installed.
+    images: the items' current image rows, if the caller already has them
+    """
+    if images is None:
+        images = await select_in("item_images", "item_id", list(orders))
+    images_by_item = {}
+    for img in images:
+        images_by_item.setdefault(img["item_id"], {})[img["image_id"]] = img
+    
+    for item_id, image_ids in orders.items():
+        current = images_by_item.get(item_id)
+        if not current:
+            raise HTTPException(404, f"No images found for item {item_id}")
+        if len(image_ids) != len(current) or set(image_ids) != set(current):
+            raise HTTPException(400, f"image_ids for item {item_id} must list each of its {len(current)} images exactly once")
+    
+    try:
+        result = await supabase.rpc("reorder_item_images", {
+            "p_orders": [{"item_id": item_id, "image_ids": image_ids} for item_id, image_ids in orders.items()]
+        }).execute()
+        updated = result.data or []
+    except Exception as e:
+        if not is_missing_function(e):
+            raise
+        # write only position: one update per distinct position, first to its negative
+        # and then back, so a unique (item_id, position) index never sees a duplicate
+        ids_by_position = {}
+        for image_ids in orders.values():
+            for position, image_id in enumerate(image_ids, start=1):
+                ids_by_position.setdefault(position, []).append(image_id)
+        updated = []
+        for sign in (-1, 1):
+            for position, image_ids in ids_by_position.items():
+                for start in range(0, len(image_ids), DB_IN_CHUNK_SIZE):
+                    res = await supabase.table("item_images").update({"position": sign * position}).in_("image_id", image_ids[start:start + DB_IN_CHUNK_SIZE]).execute()
+                    if sign > 0:
+                        updated.extend(res.data or [])
+    invalidate_auction_caches(item_ids=list(orders))
+    
+    return sorted(updated, key=lambda img: (img["item_id"], img["position"]))
+
+
+class ReorderItemImagesRequest(BaseModel):
+    image_ids: List[int]
+
+class ItemImageOrder(BaseModel):
+    item_id: str
+    image_ids: List[int]
+
+class BatchReorderItemImagesRequest(BaseModel):
+    items: List[ItemImageOrder]
+
+# REORDER images for many items at once (declared before the {item_id} routes so "batch" isn't taken as an id)
+@app.put("/items/batch/images/order")
+async def reorder_images_batch(request: BatchReorderItemImagesRequest):
+    """
+    Reorder images across many items in one write.
+    Request body: {"items": [{"item_id": "abc", "image_ids": [12, 10, 11]}, ...]}
+    """
+    if not request.items:
+        raise HTTPException(400, "Items list cannot be empty")
+    orders = {entry.item_id: entry.image_ids for entry in request.items}
+    if len(orders) != len(request.items):
+        raise HTTPException(400, "Each item may only appear once")
+    
+    images = await reorder_images(orders)
+    return {"message": f"Reordered images for {len(orders)} items", "images": images}
+
+
+# REORDER an item's images (declared before /images/{image_id} so "order" isn't taken as an id)
+@app.put("/items/{item_id}/images/order")
+async def reorder_item_images(item_id: str, request: ReorderItemImagesRequest):
+    """
+    Set the full image order for an item - image_ids[0] becomes position 1 (primary).
+    Request body: {"image_ids": [12, 10, 11]}
+    """
+    images = await reorder_images({item_id: request.image_ids})
+    return {"message": "Image order updated", "images": images}
+
+
 # UPDATE item image URL
 @app.put("/items/{item_id}/images/{image_id}")
-def update_item_image(item_id: str, image_id: int, url: str):
+async def update_item_image(item_id: str, image_id: int, url: str):
     """
     Update the URL of a specific image for an item.
     Used after uploading image to Supabase Storage.
     """
     # Verify item exists
-    item = supabase.table("items").select("item_id").eq("item_id", item_id).execute()
+    item = await supabase.table("items").select("item_id").eq("item_id", item_id).execute()
     if not item.data:
         raise HTTPException(404, "Item not found")
     
     # Update the image URL
-    res = supabase.table("item_images").update({"url": url}).eq("image_id", image_id).execute()
+    res = await supabase.table("item_images").update({"url": url}).eq("image_id", image_id).execute()
     if not res.data:
         raise HTTPException(500, "Failed to update image URL")
+    invalidate_auction_caches(item_ids=[item_id])
     
     return {"message": "Image URL updated successfully", "image": res.data[0]}
 
@@ -544,18 +1371,18 @@ class AddItemImagesRequest(BaseModel):
     urls: List[str]
 
 @app.post("/items/{item_id}/images")
-def add_item_images(item_id: str, request: AddItemImagesRequest):
+async def add_item_images(item_id: str, request: AddItemImagesRequest):
     """
     Add additional images to an existing item.
     Used after uploading images to Supabase Storage.
     """
     # Verify item exists
-    item = supabase.table("items").select("item_id").eq("item_id", item_id).execute()
+    item = await supabase.table("items").select("item_id").eq("item_id", item_id).execute()
     if not item.data:
         raise HTTPException(404, "Item not found")
     
     # Get current highest position for this item
-    existing = supabase.table("item_images").select("position").eq("item_id", item_id).order("position", desc=True).limit(1).execute()
+    existing = await supabase.table("item_images").select("position").eq("item_id", item_id).order("position", desc=True).limit(1).execute()
     next_position = (existing.data[0]["position"] + 1) if existing.data else 1
     
     # Insert new images with sequential positions
@@ -568,9 +1395,10 @@ def add_item_images(item_id: str, request: AddItemImagesRequest):
         })
     
     if rows:
-        res = supabase.table("item_images").insert(rows).execute()
+        res = await supabase.table("item_images").insert(rows).execute()
         if not res.data:
             raise HTTPException(500, "Failed to add images")
+        invalidate_auction_caches(item_ids=[item_id])
         return {"message": f"Added {len(rows)} images", "images": res.data}
     
     return {"message": "No images to add", "images": []}
@@ -578,19 +1406,18 @@ def add_item_images(item_id: str, request: AddItemImagesRequest):
 
 # SET an image as primary (position 1)
 @app.put("/items/{item_id}/images/{image_id}/primary")
-def set_image_primary(item_id: str, image_id: int):
+async def set_image_primary(item_id: str, image_id: int):
     """
     Set an image as the primary image for an item.
-    Moves the selected image to position 1 and shifts others accordingly.
+    Moves the selected image to position 1 and shifts others accordingly,
+    in one reorder write.
     """
-    # Verify item exists
-    item = supabase.table("items").select("item_id").eq("item_id", item_id).execute()
-    if not item.data:
-        raise HTTPException(404, "Item not found")
-    
     # Get all images for this item
-    images = supabase.table("item_images").select("*").eq("item_id", item_id).order("position").execute()
+    images = await supabase.table("item_images").select("*").eq("item_id", item_id).order("position").execute()
     if not images.data:
+        item = await supabase.table("items").select("item_id").eq("item_id", item_id).execute()
+        if not item.data:
+            raise HTTPException(404, "Item not found")
         raise HTTPException(404, "No images found for this item")
     
     # Find the target image
@@ -607,38 +1434,30 @@ def set_image_primary(item_id: str, image_id: int):
     if target_image["position"] == 1:
         return {"message": "Image is already primary", "image": target_image}
     
-    # Reorder: set target to position 1, shift others down
-    # First, set target to position 0 (temporary)
-    supabase.table("item_images").update({"position": 0}).eq("image_id", image_id).execute()
-    
-    # Increment positions of all images that were before the target
-    for img in images.data:
-        if img["image_id"] != image_id and img["position"] < target_image["position"]:
-            supabase.table("item_images").update({"position": img["position"] + 1}).eq("image_id", img["image_id"]).execute()
-    
-    # Set target to position 1
-    res = supabase.table("item_images").update({"position": 1}).eq("image_id", image_id).execute()
+    # Target first, the rest keep their relative order
+    image_ids = [image_id] + [img["image_id"] for img in images.data if img["image_id"] != image_id]
+    reordered = await reorder_images({item_id: image_ids}, images.data)
     
-    return {"message": "Image set as primary", "image": res.data[0] if res.data else target_image}
+    return {"message": "Image set as primary", "image": reordered[0] if reordered else target_image}
 
 
 # comps endpoints
 
 # get saved comps for item
 @app.get("/items/{item_id}/comps/saved")
-def get_saved_comps(item_id: str):
+async def get_saved_comps(item_id: str):
     """
     Retrieve previously saved comps from the database for an item.
     This is useful when the scraper is rate-limited or unavailable.
     """
     try:
         # Verify item exists
-        item = supabase.table("items").select("item_id").eq("item_id", item_id).execute()
+        item = await supabase.table("items").select("item_id").eq("item_id", item_id).execute()
         if not item.data:
             raise HTTPException(404, "Item not found")
         
         # Get saved comps from database
-        comps = supabase.table("comps").select("*").eq("item_id", item_id).order("created_at", desc=True).execute()
+        comps = await supabase.table("comps").select("*").eq("item_id", item_id).order("created_at", desc=True).execute()
         
         if not comps.data:
             return {
@@ -670,61 +1489,284 @@ def get_saved_comps(item_id: str):
         raise HTTPException(500, f"Failed to retrieve saved comps: {str(e)}")
 
 # ============================================
-# VISION / AI DESCRIPTION ENDPOINT
+# AUCTION IMPORT / EXPORT
 # ============================================
 
-@app.post("/items/generate-description")
-async def generate_item_description(
-    image: UploadFile = File(...),
-    title: str = Form(...),
-    model: str = Form(None),
-    year: str = Form(None),
-    notes: str = Form(None)
-):
+# NDJSON record types for each exported table
+EXPORT_RECORD_TYPES = {"items": "item", "comps": "comp", "bids": "bid", "orders": "order"}
+
+
+def detect_catalog_format(file_format: str, filename: str, content_type: str = None) -> str:
+    """'csv' or 'ndjson' from an explicit format, the filename, or the content type"""
+    candidates = [(file_format or "").lower(), (filename or "").lower(), (content_type or "").lower()]
+    for value in candidates:
+        if value.endswith("csv"):
+            return "csv"
+        if value.endswith(("ndjson", "jsonl", "json-seq", "x-ndjson")):
+            return "ndjson"
+    raise HTTPException(400, "Unsupported format. Use CSV or NDJSON.")
+
+
+def read_catalog_rows(upload: UploadFile, file_format: str):
     """
-    Generate a concise 3-sentence description for an auction item
-    using OpenAI's vision API to analyze the uploaded image and condition notes.
+    Lazily yield (row_number, row, error) from an uploaded CSV/NDJSON file.
+    Reads the spooled upload directly, so call it from a worker thread.
     """
-    try:
-        # Read and encode the image
-        image_data = await image.read()
-        
-        # Detect image format from content type or filename
-        content_type = image.content_type or ""
-        filename = image.filename or ""
-        
-        # Determine image format
-        if "avif" in content_type.lower() or filename.lower().endswith(".avif"):
-            # AVIF not supported by OpenAI, need to convert or use URL
-            raise HTTPException(400, "AVIF format not supported. Please use PNG, JPEG, GIF, or WEBP format.")
-        elif "png" in content_type.lower() or filename.lower().endswith(".png"):
-            mime_type = "image/png"
-        elif "gif" in content_type.lower() or filename.lower().endswith(".gif"):
-            mime_type = "image/gif"
-        elif "webp" in content_type.lower() or filename.lower().endswith(".webp"):
-            mime_type = "image/webp"
-        else:
-            # Default to jpeg
-            mime_type = "image/jpeg"
-        
-        base64_image = base64.b64encode(image_data).decode('utf-8')
-        
-        # Construct the item details string
-        item_details = f"Title: {title}"
-        if model:
-            item_details += f"\nModel: {model}"
-        if year:
-            item_details += f"\nYear: {year}"
-        if notes:
-            item_details += f"\nCondition Notes: {notes}"
-        
-        # Create the prompt for vision API
-        prompt = f"""You are an expert auction copywriter creating compelling product descriptions for online sales. Analyze this image and write a confident, definitive 3-sentence marketing description.
+    text = io.TextIOWrapper(upload.file, encoding="utf-8-sig", newline="")
+    if file_format == "csv":
+        reader = csv.DictReader(text)
+        for row in reader:
+            yield reader.line_num, row, None
+        return
+    for row_number, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield row_number, json.loads(line), None
+        except ValueError as e:
+            yield row_number, None, f"Invalid JSON: {str(e)}"
 
-Item Details:
-{item_details}
 
-Requirements:
+def catalog_row_to_item(auction_id: str, row: dict) -> tuple:
+    """
+    Import row -> (items row, image urls). Accepts flat rows with image_urls
+    (list or '|'-separated) and/or image_url_1..5 columns, plus the
+    {"type": "item", "data": {...}} records written by the NDJSON export.
+    Raises ValueError for rows that can't be imported.
+    """
+    if not isinstance(row, dict):
+        raise ValueError("Row must be an object")
+    if "type" in row and "data" in row:
+        row = row["data"]
+    
+    title = str(row.get("title") or "").strip()
+    if not title:
+        raise ValueError("title is required")
+    
+    urls = row.get("image_urls") or []
+    if isinstance(urls, str):
+        urls = urls.split("|")
+    urls = list(urls) + [row.get(f"image_url_{n}") or "" for n in range(1, 6)]
+    try:
+        urls = clean_image_urls(urls)
+    except HTTPException as e:
+        raise ValueError(e.detail)
+    
+    year = row.get("year")
+    if year in (None, ""):
+        year = None
+    else:
+        try:
+            year = int(year)
+        except (TypeError, ValueError):
+            raise ValueError(f"year must be a number, got {year!r}")
+    
+    item_row = build_item_row(
+        auction_id, title,
+        brand=str(row.get("brand") or ""),
+        model=str(row.get("model") or ""),
+        year=year,
+        ai_description=str(row.get("ai_description") or "")
+    )
+    return item_row, urls
+
+
+# POST import items into an auction from a CSV or NDJSON file
+@app.post("/auctions/{auction_id}/import")
+async def import_auction_items(auction_id: str, file: UploadFile = File(...), format: str = Form(None)):
+    """
+    Bulk-import items from CSV or NDJSON. Columns/keys: title, brand, model,
+    year, ai_description and image_url_1..image_url_5 (or image_urls).
+    The file is parsed as a stream and inserted IMPORT_CHUNK_SIZE rows at a
+    time. Bad rows are skipped and reported; good rows are kept.
+    Export records other than items (comps, bids, orders) are ignored.
+    """
+    await get_active_auction_owner(auction_id)
+    file_format = detect_catalog_format(format, file.filename, file.content_type)
+    rows = read_catalog_rows(file, file_format)
+    
+    imported = 0
+    skipped = 0
+    failed = 0
+    errors = []
+    
+    def record_error(row_number, message, count=1):
+        nonlocal failed
+        failed += count
+        if len(errors) < 100:
+            errors.append({"row": row_number, "error": message})
+    
+    try:
+        while True:
+            try:
+                chunk = await asyncio.to_thread(lambda: list(itertools.islice(rows, IMPORT_CHUNK_SIZE)))
+            except (UnicodeDecodeError, csv.Error) as e:
+                raise HTTPException(400, f"Could not parse file after {imported} imported rows: {str(e)}")
+            if not chunk:
+                break
+            
+            item_rows = []
+            image_urls = []
+            for row_number, row, error in chunk:
+                if error is None and isinstance(row, dict) and row.get("type") not in (None, "item"):
+                    skipped += 1
+                    continue
+                if error is None:
+                    try:
+                        item_row, urls = catalog_row_to_item(auction_id, row)
+                        item_rows.append(item_row)
+                        image_urls.append(urls)
+                        continue
+                    except ValueError as e:
+                        error = str(e)
+                record_error(row_number, error)
+            
+            if not item_rows:
+                continue
+            try:
+                await insert_items_with_images(item_rows, image_urls)
+                imported += len(item_rows)
+            except Exception as e:
+                detail = e.detail if isinstance(e, HTTPException) else str(e)
+                record_error(f"{chunk[0][0]}-{chunk[-1][0]}", f"Failed to insert chunk: {detail}", count=len(item_rows))
+    finally:
+        if imported:
+            invalidate_auction_caches(auction_id=auction_id)
+    
+    return {
+        "message": f"Imported {imported} items",
+        "imported": imported,
+        "failed": failed,
+        "skipped": skipped,
+        "errors": errors
+    }
+
+
+async def iter_pages(table: str, column: str, value, columns: str = "*", order: list = None):
+    """Yield every row matching column = value one DB_PAGE_SIZE page at a time"""
+    offset = 0
+    while True:
+        query = supabase.table(table).select(columns).eq(column, value)
+        for col, desc in order or []:
+            query = query.order(col, desc=desc)
+        page = await query.range(offset, offset + DB_PAGE_SIZE - 1).execute()
+        rows = page.data or []
+        if rows:
+            yield rows
+        if len(rows) < DB_PAGE_SIZE:
+            break
+        offset += DB_PAGE_SIZE
+
+
+async def iter_export_pages(auction_id: str, tables: tuple):
+    """
+    Yield (table, rows) pages for an auction export. Items are paged from the DB
+    and each page's images/comps/bids are fetched in one batch, so memory holds
+    one page at a time. Item rows carry their image URLs as image_urls.
+    """
+    if {"items", "comps", "bids"} & set(tables):
+        async for items in iter_pages("items", "auction_id", auction_id, order=[("created_at", False), ("item_id", False)]):
+            item_ids = [item["item_id"] for item in items]
+            if "items" in tables:
+                images = await select_in("item_images", "item_id", item_ids, columns="item_id, url, position", order=[("position", False)])
+                urls_by_item = {}
+                for image in images:
+                    urls_by_item.setdefault(image["item_id"], []).append(image["url"])
+                yield "items", [{**item, "image_urls": urls_by_item.get(item["item_id"], [])} for item in items]
+            for table in ("comps", "bids"):
+                if table in tables:
+                    rows = await select_in(table, "item_id", item_ids, order=[("created_at", False)])
+                    if rows:
+                        yield table, rows
+    if "orders" in tables:
+        async for orders in iter_pages("orders", "auction_id", auction_id, order=[("created_at", False)]):
+            yield "orders", orders
+
+
+async def export_auction_ndjson(auction: dict):
+    """NDJSON export: one {"type", "data"} record per line, auction first"""
+    yield json.dumps({"type": "auction", "data": auction}, default=str) + "\n"
+    async for table, rows in iter_export_pages(auction["auction_id"], tuple(EXPORT_RECORD_TYPES)):
+        record_type = EXPORT_RECORD_TYPES[table]
+        yield "".join(json.dumps({"type": record_type, "data": row}, default=str) + "\n" for row in rows)
+
+
+async def export_auction_csv(auction_id: str, table: str):
+    """CSV export of one table; item rows get image_url_1..5 columns so the file can be re-imported"""
+    fieldnames = None
+    async for _, rows in iter_export_pages(auction_id, (table,)):
+        if table == "items":
+            for row in rows:
+                urls = row.pop("image_urls")
+                for n in range(1, 6):
+                    row[f"image_url_{n}"] = urls[n - 1] if n <= len(urls) else ""
+        buffer = io.StringIO()
+        if fieldnames is None:
+            fieldnames = list(rows[0].keys())
+            csv.DictWriter(buffer, fieldnames).writeheader()
+        writer = csv.DictWriter(buffer, fieldnames, extrasaction="ignore")
+        writer.writerows(rows)
+        yield buffer.getvalue()
+
+
+# GET export an auction as NDJSON (everything) or CSV (one table)
+@app.get("/auctions/{auction_id}/export")
+async def export_auction(auction_id: str, format: str = "ndjson", table: str = "items"):
+    """
+    Stream an auction's catalog out without loading it all into memory.
+    format=ndjson (default): auction, items (with image_urls), comps, bids and
+    orders as {"type", "data"} lines. format=csv: one table per file, picked
+    with table=items|comps|bids|orders. Both formats can be fed back into
+    POST /auctions/{auction_id}/import.
+    """
+    auction = await supabase.table("auctions").select("*").eq("auction_id", auction_id).execute()
+    if not auction.data:
+        raise HTTPException(404, "Auction not found")
+    
+    file_format = detect_catalog_format(format, None)
+    if file_format == "ndjson":
+        return StreamingResponse(
+            export_auction_ndjson(auction.data[0]),
+            media_type="application/x-ndjson",
+            headers={"Content-Disposition": f'attachment; filename="auction-{auction_id}.ndjson"'}
+        )
+    
+    if table not in EXPORT_RECORD_TYPES:
+        raise HTTPException(400, f"table must be one of: {', '.join(EXPORT_RECORD_TYPES)}")
+    return StreamingResponse(
+        export_auction_csv(auction_id, table),
+        media_type="text/csv",
+        headers={"Content-Disposition": f'attachment; filename="auction-{auction_id}-{table}.csv"'}
+    )
+
+
+# ============================================
+# VISION / AI DESCRIPTION ENDPOINT
+# ============================================
+
+# bump when the prompt or model parameters change so cached descriptions are regenerated
+DESCRIPTION_PROMPT_VERSION = 1
+
+
+def build_description_messages(base64_image: str, mime_type: str, title: str, model: str = None,
+                               year: str = None, notes: str = None) -> list:
+    """Chat messages for the vision description prompt"""
+    # Construct the item details string
+    item_details = f"Title: {title}"
+    if model:
+        item_details += f"\nModel: {model}"
+    if year:
+        item_details += f"\nYear: {year}"
+    if notes:
+        item_details += f"\nCondition Notes: {notes}"
+    
+    # Create the prompt for vision API
+    prompt = f"""You are an expert auction copywriter creating compelling product descriptions for online sales. Analyze this image and write a confident, definitive 3-sentence marketing description.
+
+Item Details:
+{item_details}
+
+Requirements:
 - Write exactly 3 sentences in a confident, definitive tone
 - Sentence 1: State what the item is (brand, model, year if provided) - be direct and factual
 - Sentence 2: Describe the visual appearance - color, finish, aesthetic details you observe in the image - use confident language (avoid "appears", "seems", "looks like")
@@ -735,55 +1777,703 @@ Requirements:
 
 Generate the 3-sentence description now:"""
 
+    return [
+        {
+            "role": "user",
+            "content": [
+                {"type": "text", "text": prompt},
+                {
+                    "type": "image_url",
+                    "image_url": {
+                        "url": f"data:{mime_type};base64,{base64_image}",
+                        "detail": VISION_IMAGE_DETAIL
+                    }
+                }
+            ]
+        }
+    ]
+
+
+vision_image_cache = TTLCache(VISION_IMAGE_CACHE_MAX_ENTRIES, VISION_IMAGE_CACHE_TTL_SECONDS, namespace="vision_images")
+description_cache = TTLCache(DESCRIPTION_CACHE_MAX_ENTRIES, DESCRIPTION_CACHE_TTL_SECONDS, persist_path=DESCRIPTION_CACHE_PATH, namespace="descriptions")
+
+VISION_OUTPUT_FORMATS = {
+    "jpeg": ("JPEG", "image/jpeg"),
+    "webp": ("WEBP", "image/webp"),
+}
+
+
+async def read_upload(upload: UploadFile, max_bytes: int, chunk_size: int = 1024 * 1024) -> tuple:
+    """Read an upload in chunks, enforcing a size cap; returns (bytes, sha256 hex digest)"""
+    digest = hashlib.sha256()
+    buffer = bytearray()
+    while True:
+        chunk = await upload.read(chunk_size)
+        if not chunk:
+            break
+        buffer.extend(chunk)
+        if len(buffer) > max_bytes:
+            raise HTTPException(413, f"Image exceeds {max_bytes // (1024 * 1024)} MB upload limit")
+        digest.update(chunk)
+    if not buffer:
+        raise HTTPException(400, "Image upload is empty")
+    return bytes(buffer), digest.hexdigest()
+
+
+def preprocess_image(image_data: bytes) -> tuple:
+    """
+    Downscale an image to VISION_MAX_EDGE and re-encode it as VISION_IMAGE_FORMAT.
+    Orientation is baked in from EXIF and metadata is dropped. Any format Pillow
+    can decode (including AVIF, which the vision API rejects) is accepted.
+    Returns (encoded bytes, mime type).
+    """
+    pil_format, mime_type = VISION_OUTPUT_FORMATS.get(VISION_IMAGE_FORMAT, VISION_OUTPUT_FORMATS["jpeg"])
+    with Image.open(io.BytesIO(image_data)) as img:
+        # JPEG can decode straight to a reduced scale, much cheaper than a full decode + resize
+        img.draft("RGB", (VISION_MAX_EDGE, VISION_MAX_EDGE))
+        img = ImageOps.exif_transpose(img)
+        img.thumbnail((VISION_MAX_EDGE, VISION_MAX_EDGE), Image.Resampling.LANCZOS)
+
+        has_alpha = img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info)
+        if has_alpha and pil_format == "WEBP":
+            img = img.convert("RGBA")
+        elif has_alpha:
+            # JPEG has no alpha channel - flatten onto white
+            rgba = img.convert("RGBA")
+            img = Image.new("RGB", rgba.size, (255, 255, 255))
+            img.paste(rgba, mask=rgba.getchannel("A"))
+        elif img.mode != "RGB":
+            img = img.convert("RGB")
+
+        out = io.BytesIO()
+        # no exif/icc passed to save, so the re-encoded image carries no metadata
+        img.save(out, pil_format, quality=VISION_IMAGE_QUALITY, optimize=pil_format == "JPEG")
+        return out.getvalue(), mime_type
+
+
+async def encode_vision_image(image_data: bytes, digest: str) -> dict:
+    """
+    Downscale and base64-encode image bytes for the vision API.
+    Results are cached by content hash so retries of the same photo skip the work.
+    Returns {"sha256", "mime_type", "base64"}.
+    """
+    cached = vision_image_cache.get(digest)
+    if cached is not None:
+        return cached
+
+    try:
+        processed, mime_type = await asyncio.to_thread(preprocess_image, image_data)
+    except (Image.UnidentifiedImageError, Image.DecompressionBombError) as e:
+        raise HTTPException(400, f"Unsupported or invalid image: {str(e)}")
+
+    prepared = {
+        "sha256": digest,
+        "mime_type": mime_type,
+        "base64": base64.b64encode(processed).decode("utf-8")
+    }
+    vision_image_cache.set(digest, prepared)
+    return prepared
+
+
+def description_request(messages: list) -> dict:
+    """Chat completion parameters shared by live, streamed and Batch API description calls"""
+    return {
+        "model": "gpt-4o",  # GPT-4 with vision
+        "messages": messages,
+        "max_tokens": 300,
+        "temperature": 0.7
+    }
+
+
+async def describe_image(prepared: dict, title: str, model: str = None, year: str = None, notes: str = None) -> str:
+    """Run one vision description call for a prepared image"""
+    messages = build_description_messages(prepared["base64"], prepared["mime_type"], title, model, year, notes)
+    start = time.perf_counter()
+    response = await openai_description_client.chat.completions.create(**description_request(messages))
+    usage = getattr(response, "usage", None)
+    record_openai_call(
+        "description", time.perf_counter() - start,
+        getattr(usage, "prompt_tokens", None), getattr(usage, "completion_tokens", None)
+    )
+    return response.choices[0].message.content.strip()
+
+
+def description_cache_key(digest: str, title: str, model: str, year: str, notes: str) -> str:
+    """Cache key for a description: prompt version, image content hash and normalized item details"""
+    details = "|".join(normalize_text(v) for v in (title, model, year, notes))
+    return f"v{DESCRIPTION_PROMPT_VERSION}:{digest}:{hashlib.sha256(details.encode()).hexdigest()[:32]}"
+
+
+async def describe_upload(image_data: bytes, digest: str, title: str, model: str = None, year: str = None,
+                          notes: str = None, force_regenerate: bool = False) -> tuple:
+    """Description for raw upload bytes, served from description_cache when possible; returns (description, cached)"""
+    cache_key = description_cache_key(digest, title, model, year, notes)
+    if not force_regenerate:
+        cached_description = await description_cache.aget(cache_key)
+        if cached_description is not None:
+            return cached_description, True
+    
+    prepared = await encode_vision_image(image_data, digest)
+    description = await describe_image(prepared, title, model, year, notes)
+    description_cache.set(cache_key, description)
+    return description, False
+
+
+@app.post("/items/generate-description")
+async def generate_item_description(
+    image: UploadFile = File(...),
+    title: str = Form(...),
+    model: str = Form(None),
+    year: str = Form(None),
+    notes: str = Form(None),
+    stream: bool = Form(False),
+    force_regenerate: bool = Form(False)
+):
+    """
+    Generate a concise 3-sentence description for an auction item
+    using OpenAI's vision API to analyze the uploaded image and condition notes.
+    With stream=true the description is sent as Server-Sent Events:
+    'delta' events carry text as it's generated, then one 'done' event.
+    The same image + details return the cached description unless force_regenerate=true.
+    """
+    item_details = {
+        "title": title,
+        "model": model,
+        "year": year
+    }
+    
+    try:
+        image_data, digest = await read_upload(image, VISION_MAX_UPLOAD_BYTES)
+        
         # Validate API key
         if not openai_description_client:
             raise HTTPException(500, "OpenAI Description API key not configured")
         
-        # Call OpenAI vision API
-        response = openai_description_client.chat.completions.create(
-            model="gpt-4o",  # GPT-4 with vision
-            messages=[
-                {
-                    "role": "user",
-                    "content": [
-                        {"type": "text", "text": prompt},
-                        {
-                            "type": "image_url",
-                            "image_url": {
-                                "url": f"data:{mime_type};base64,{base64_image}",
-                                "detail": "high"
-                            }
-                        }
-                    ]
-                }
-            ],
-            max_tokens=300,
-            temperature=0.7
-        )
+        if stream:
+            cache_key = description_cache_key(digest, title, model, year, notes)
+            cached_description = None if force_regenerate else await description_cache.aget(cache_key)
+            if cached_description is not None:
+                return StreamingResponse(
+                    replay_description(cached_description, item_details),
+                    media_type="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+                )
+            
+            # Downscale/re-encode the upload before it goes to the vision API
+            prepared = await encode_vision_image(image_data, digest)
+            messages = build_description_messages(prepared["base64"], prepared["mime_type"], title, model, year, notes)
+            start = time.perf_counter()
+            completion_stream = await openai_description_client.chat.completions.create(
+                **description_request(messages),
+                stream=True
+            )
+            # streamed: time to first byte, no usage block
+            record_openai_call("description_stream", time.perf_counter() - start)
+            return StreamingResponse(
+                stream_description(completion_stream, item_details, cache_key),
+                media_type="text/event-stream",
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+            )
         
-        # Extract the generated description
-        description = response.choices[0].message.content.strip()
+        # Call OpenAI vision API (or reuse the cached description)
+        description, cached = await describe_upload(image_data, digest, title, model, year, notes, force_regenerate)
         
         return {
             "success": True,
             "description": description,
-            "item_details": {
-                "title": title,
-                "model": model,
-                "year": year
-            }
+            "item_details": item_details,
+            "cached": cached
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
-        import traceback
-        error_detail = traceback.format_exc()
         raise HTTPException(500, f"Failed to generate description: {str(e)}")
 
 
+async def stream_description(completion_stream, item_details: dict, cache_key: str):
+    """Relay a streamed chat completion as SSE 'delta' events, then a final 'done'"""
+    parts = []
+    try:
+        async for chunk in completion_stream:
+            if not chunk.choices:
+                continue
+            text = chunk.choices[0].delta.content
+            if text:
+                parts.append(text)
+                yield format_sse("delta", {"text": text})
+        description = "".join(parts).strip()
+        description_cache.set(cache_key, description)
+        yield format_sse("done", {
+            "success": True,
+            "description": description,
+            "item_details": item_details,
+            "cached": False
+        })
+    except Exception as e:
+        yield format_sse("error", {"detail": f"Failed to generate description: {str(e)}"})
+    finally:
+        await completion_stream.close()
+
+
+async def replay_description(description: str, item_details: dict):
+    """SSE events for a cached description - one 'delta' with the full text, then 'done'"""
+    yield format_sse("delta", {"text": description})
+    yield format_sse("done", {
+        "success": True,
+        "description": description,
+        "item_details": item_details,
+        "cached": True
+    })
+
+
+# ============================================
+# BATCH AI DESCRIPTIONS
+# ============================================
+
+class DescriptionBatchEntry(BaseModel):
+    title: str
+    model: Optional[str] = None
+    year: Optional[str] = None
+    notes: Optional[str] = None
+
+
+# POST generate descriptions for many items in one request
+@app.post("/items/generate-descriptions/batch")
+async def generate_item_descriptions_batch(
+    images: List[UploadFile] = File(...),
+    items: str = Form(...),
+    offline: bool = Form(False),
+    force_regenerate: bool = Form(False)
+):
+    """
+    Generate descriptions for several items at once.
+    'images' holds one file per item and 'items' is a JSON array of
+    {"title", "model", "year", "notes"} in the same order.
+    
+    By default results stream back as NDJSON, one line per item as it finishes:
+    {"index": 0, "success": true, "description": "...", "item_details": {...}, "cached": false}
+    followed by a final {"done": true, "total", "succeeded", "failed"} line.
+    
+    With offline=true the items are submitted to the OpenAI Batch API instead
+    (50% cheaper, finishes within 24h); poll
+    GET /items/generate-descriptions/batch/{batch_id} for the results.
+    """
+    try:
+        entries = [DescriptionBatchEntry(**entry) for entry in json.loads(items)]
+    except (ValueError, TypeError) as e:
+        raise HTTPException(400, f"Invalid items JSON: {str(e)}")
+    
+    if not entries:
+        raise HTTPException(400, "Items list cannot be empty")
+    if len(entries) > 100:
+        raise HTTPException(400, "Batch size cannot exceed 100 items")
+    if len(entries) != len(images):
+        raise HTTPException(400, f"Got {len(images)} images for {len(entries)} items")
+    if not openai_description_client:
+        raise HTTPException(500, "OpenAI Description API key not configured")
+    
+    # buffer the uploads now - the form's files are closed once this handler returns -
+    # within a total cap, so one request can't pin 100 full-size images in memory
+    batch_limit = HTTPException(413, f"Images exceed {VISION_BATCH_MAX_UPLOAD_BYTES // (1024 * 1024)} MB in total for one batch")
+    if sum(image.size or 0 for image in images) > VISION_BATCH_MAX_UPLOAD_BYTES:
+        raise batch_limit
+    uploads, buffered = [], 0
+    for image in images:
+        image_data, digest = await read_upload(image, VISION_MAX_UPLOAD_BYTES)
+        buffered += len(image_data)
+        if buffered > VISION_BATCH_MAX_UPLOAD_BYTES:
+            raise batch_limit
+        uploads.append((image_data, digest))
+    
+    if offline:
+        try:
+            return await submit_description_batch(uploads, entries)
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(500, f"Failed to submit description batch: {str(e)}")
+    
+    return StreamingResponse(
+        stream_description_batch(uploads, entries, force_regenerate),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+async def stream_description_batch(uploads: list, entries: list, force_regenerate: bool = False):
+    """Describe every item with bounded concurrency, yielding NDJSON lines in completion order"""
+    semaphore = asyncio.Semaphore(DESCRIPTION_BATCH_CONCURRENCY)
+    
+    async def describe(index: int) -> dict:
+        entry = entries[index]
+        item_details = {"title": entry.title, "model": entry.model, "year": entry.year}
+        async with semaphore:
+            try:
+                image_data, digest = uploads[index]
+                description, cached = await describe_upload(
+                    image_data, digest, entry.title, entry.model, entry.year, entry.notes, force_regenerate
+                )
+                return {"index": index, "success": True, "description": description, "item_details": item_details, "cached": cached}
+            except HTTPException as e:
+                return {"index": index, "success": False, "error": e.detail, "item_details": item_details}
+            except Exception as e:
+                return {"index": index, "success": False, "error": f"Failed to generate description: {str(e)}", "item_details": item_details}
+    
+    tasks = [asyncio.create_task(describe(index)) for index in range(len(entries))]
+    succeeded = 0
+    try:
+        for finished in asyncio.as_completed(tasks):
+            result = await finished
+            succeeded += result["success"]
+            yield json.dumps(result) + "\n"
+        yield json.dumps({"done": True, "total": len(tasks), "succeeded": succeeded, "failed": len(tasks) - succeeded}) + "\n"
+    finally:
+        # client went away - stop paying for calls nobody will read
+        for task in tasks:
+            task.cancel()
+
+
+async def submit_description_batch(uploads: list, entries: list) -> dict:
+    """Upload a JSONL request file and start an OpenAI Batch API job for the descriptions"""
+    prepared = await asyncio.gather(*(encode_vision_image(image_data, digest) for image_data, digest in uploads))
+    
+    lines = []
+    for index, (image, entry) in enumerate(zip(prepared, entries)):
+        messages = build_description_messages(image["base64"], image["mime_type"], entry.title, entry.model, entry.year, entry.notes)
+        lines.append(json.dumps({
+            "custom_id": str(index),
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": description_request(messages)
+        }))
+    
+    input_file = await openai_description_client.files.create(
+        file=("item_descriptions.jsonl", "\n".join(lines).encode("utf-8")),
+        purpose="batch"
+    )
+    batch = await openai_description_client.batches.create(
+        input_file_id=input_file.id,
+        endpoint="/v1/chat/completions",
+        completion_window="24h",
+        metadata={"kind": "item_descriptions"}
+    )
+    
+    return {
+        "success": True,
+        "batch_id": batch.id,
+        "status": batch.status,
+        "total_items": len(entries),
+        "message": f"Batch submitted. Poll /items/generate-descriptions/batch/{batch.id} for results."
+    }
+
+
+def parse_description_batch_line(line: str) -> dict:
+    """One Batch API output/error line -> {"index", "success", "description" | "error"}"""
+    row = json.loads(line)
+    result = {"index": int(row["custom_id"])}
+    response = row.get("response") or {}
+    body = response.get("body") or {}
+    if response.get("status_code") == 200 and body.get("choices"):
+        result["success"] = True
+        result["description"] = body["choices"][0]["message"]["content"].strip()
+    else:
+        error = row.get("error") or body.get("error") or {}
+        result["success"] = False
+        result["error"] = error.get("message", "Request failed")
+    return result
+
+
+# GET status and results of an offline description batch
+@app.get("/items/generate-descriptions/batch/{batch_id}")
+async def get_description_batch(batch_id: str):
+    """
+    Status of an offline description batch. Once status is 'completed' the
+    response includes results (by item index, in submission order).
+    """
+    if not openai_description_client:
+        raise HTTPException(500, "OpenAI Description API key not configured")
+    
+    try:
+        batch = await openai_description_client.batches.retrieve(batch_id)
+    except NotFoundError:
+        raise HTTPException(404, "Batch not found")
+    if (batch.metadata or {}).get("kind") != "item_descriptions":
+        raise HTTPException(404, "Batch not found")
+    
+    counts = batch.request_counts
+    response = {
+        "batch_id": batch.id,
+        "status": batch.status,
+        "total_items": counts.total if counts else 0,
+        "completed_items": counts.completed if counts else 0,
+        "failed_items": counts.failed if counts else 0,
+        "results": []
+    }
+    if batch.status != "completed":
+        return response
+    
+    try:
+        results = []
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if not file_id:
+                continue
+            content = await openai_description_client.files.content(file_id)
+            results.extend(parse_description_batch_line(line) for line in content.text.splitlines() if line.strip())
+    except Exception as e:
+        raise HTTPException(500, f"Failed to fetch batch results: {str(e)}")
+    
+    response["results"] = sorted(results, key=lambda result: result["index"])
+    return response
+
+
 # ============================================
 # COMPS AGENT INTEGRATION
 # ============================================
 
+# scheduler priorities - lower runs first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 1
+
+
+class TokenBucket:
+    """Budget refilled continuously up to `per_minute`; can go negative when actual usage exceeds the estimate"""
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.tokens = per_minute
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` can be taken (amounts above capacity only need a full bucket)"""
+        self._refill()
+        needed = min(amount, self.capacity)
+        if self.tokens >= needed:
+            return 0.0
+        return (needed - self.tokens) / self.rate
+
+    def take(self, amount: float):
+        self._refill()
+        self.tokens -= amount
+
+
+class AgentRunScheduler:
+    """
+    Gates every comps agent run so throughput sits at the OpenAI limits
+    instead of tipping into 429s:
+    - at most max_in_flight runs at once
+    - request and token budgets per minute (tokens charged with an estimate,
+      then corrected from the run's actual usage)
+    - interactive (/comps) runs are started before batch runs
+    - a 429 pauses all dispatch with exponential backoff and the run is retried
+    """
+
+    def __init__(self, max_in_flight: int, requests_per_minute: float, tokens_per_minute: float,
+                 est_tokens_per_run: int, max_retries: int):
+        self._max_in_flight = max_in_flight
+        self._requests = TokenBucket(requests_per_minute)
+        self._tokens = TokenBucket(tokens_per_minute)
+        self._est_tokens = est_tokens_per_run
+        self._max_retries = max_retries
+        self._in_flight = 0
+        self._waiters = []  # heap of (priority, seq, future)
+        self._seq = itertools.count()
+        self._paused_until = 0.0
+        self._backoff = 0.0
+        self._timer = None
+
+    async def run(self, priority: int, fn, *args, **kwargs):
+        """Run fn(*args, **kwargs) (an agent run) once a slot and budget are free"""
+        for attempt in range(self._max_retries + 1):
+            await self._acquire(priority)
+            start = time.perf_counter()
+            try:
+                result = await fn(*args, **kwargs)
+            except RateLimitError as e:
+                self._on_rate_limited(e)
+                if attempt == self._max_retries:
+                    raise
+                continue
+            finally:
+                self._release()
+            usage = getattr(getattr(result, "context_wrapper", None), "usage", None)
+            record_openai_call(
+                "comps_agent", time.perf_counter() - start,
+                getattr(usage, "input_tokens", None), getattr(usage, "output_tokens", None)
+            )
+            self._on_success(result)
+            return result
+
+    async def _acquire(self, priority: int):
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), future))
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            # granted a slot just as we were cancelled - hand it back
+            if future.done() and not future.cancelled():
+                self._release()
+            raise
+
+    def _release(self):
+        self._in_flight -= 1
+        self._dispatch()
+
+    def _dispatch(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._waiters:
+            _, _, future = self._waiters[0]
+            if future.cancelled():
+                heapq.heappop(self._waiters)
+                continue
+            if self._in_flight >= self._max_in_flight:
+                return
+            wait = max(
+                self._paused_until - time.monotonic(),
+                self._requests.wait_time(1),
+                self._tokens.wait_time(self._est_tokens)
+            )
+            if wait > 0:
+                self._timer = asyncio.get_running_loop().call_later(wait, self._dispatch)
+                return
+            heapq.heappop(self._waiters)
+            self._in_flight += 1
+            self._requests.take(1)
+            self._tokens.take(self._est_tokens)
+            future.set_result(None)
+
+    def _on_success(self, result):
+        self._backoff = 0.0
+        # correct the up-front estimate with what the run actually used
+        usage = getattr(getattr(result, "context_wrapper", None), "usage", None)
+        if usage is not None:
+            self._requests.take(max(usage.requests - 1, 0))
+            self._tokens.take(usage.total_tokens - self._est_tokens)
+
+    def _on_rate_limited(self, error: RateLimitError):
+        self._backoff = min(max(self._backoff * 2, 2.0), 60.0)
+        delay = self._backoff
+        retry_after = error.response.headers.get("retry-after") if error.response is not None else None
+        if retry_after:
+            try:
+                delay = max(delay, float(retry_after))
+            except ValueError:
+                pass
+        self._paused_until = max(self._paused_until, time.monotonic() + delay)
+
+
+comps_scheduler = AgentRunScheduler(
+    max_in_flight=COMPS_MAX_IN_FLIGHT,
+    requests_per_minute=COMPS_REQUESTS_PER_MINUTE,
+    tokens_per_minute=COMPS_TOKENS_PER_MINUTE,
+    est_tokens_per_run=COMPS_EST_TOKENS_PER_RUN,
+    max_retries=COMPS_RATE_LIMIT_RETRIES
+)
+
+
+# Structured output for the comps agent (field names are part of the prompt contract)
+class Comp1Schema(BaseModel):
+    source_1: str
+    url_1: str
+    sale_date_1: str
+    price_1: str
+    notes_1: str
+
+class Comp2Schema(BaseModel):
+    source_2: str
+    url_2: str
+    sale_date_2: str
+    price_2: str
+    notes_2: str
+
+class Comp3Schema(BaseModel):
+    source_3: str
+    url_3: str
+    sale_date_3: str
+    price_3: str
+    notes_3: str
+
+class CompsOutput(BaseModel):
+    comp_1: Comp1Schema
+    comp_2: Comp2Schema
+    comp_3: Comp3Schema
+
+
+COMPS_AGENT_INSTRUCTIONS = """You are a Comps Agent. Your job is to find SOLD comparables ("comps") for any item.
+
+The item to price (Brand, Model, Year, Notes) is given in the user message.
+
+**CURRENT DATE: December 1, 2025**
+
+Use the web search tool to find REAL, RECENT sold listings with VALID, WORKING URLs from 2025 ONLY.
+
+### CRITICAL REQUIREMENTS
+1. **2025 SALES ONLY**: Every comp MUST be from 2025. Sales from 2024 or earlier are NOT acceptable.
+2. **URLs MUST BE VALID**: Every URL must be a real, working link to an actual sold listing page. Do not fabricate or guess URLs.
+3. **THREE DIFFERENT SOURCES**: Each comp must be from a different website (e.g., eBay, 1stDibs, Sotheby's, Grailed, StockX, Heritage Auctions, Poshmark, The RealReal, etc.).
+4. **SOLD LISTINGS ONLY**: Must be completed sales, not active listings or "Buy It Now" prices.
+
+### SEARCH STRATEGY
+- Search for: "<brand> <model> <year> sold 2025"
+- Try multiple search queries if needed: "sold items", "auction results 2025", "recently sold"
+- Check MULTIPLE pages of results to find 2025 sales
+- Verify the sale date is from 2025 before including
+- Keep searching until you find 3 valid comps from 2025
+
+### OUTPUT FORMAT (STRICT)
+You must output exactly THREE comps from 2025, filling every field:
+
+- `source_X`: The website name (e.g., "eBay", "Heritage Auctions", "1stDibs")
+- `url_X`: The COMPLETE, VALID URL to the sold listing page
+- `sale_date_X`: Format "YYYY-MM-DD" - MUST be EXACT date with valid day (e.g., "2025-08-27", "2025-10-20"). NO wildcards like "2025-09-**". If exact day unknown, use "01" for the day (e.g., "2025-09-01").
+- `price_X`: String with numbers only, e.g., "425.00" (no currency symbols)
+- `notes_X`: Include item condition, differences from target item, and any relevant details
+
+### VALIDATION RULES
+1. All three comps must be from three different websites, the comps should not be from the same source
+2. All three comps must have sale dates in **2025 ONLY** (January 1 - November 16, 2025)
+3. URLs must be **complete and valid** (start with https://)
+4. If the first search doesn't return 2025 results, try different search terms and keep searching
+5. Do NOT fabricate URLs or dates - only use real data from web search
+6. If after extensive searching you cannot find 3 comps from 2025, only then set "source_X": "none"
+
+**IMPORTANT**: Do not give up easily. Try multiple searches with different keywords until you find 3 valid 2025 sales."""
+
+# Built once and shared by every request - item details go in the run input
+comps_agent = Agent(
+    name="Comps Agent",
+    instructions=COMPS_AGENT_INSTRUCTIONS,
+    tools=[
+        WebSearchTool(
+            search_context_size="medium",
+            user_location={
+                "type": "approximate",
+                "city": None,
+                "country": "US",
+                "region": None,
+                "timezone": None
+            }
+        )
+    ],
+    output_type=CompsOutput,
+)
+
+# The comps key travels with each run through its own client instead of the process environment
+openai_comps_client = AsyncOpenAI(api_key=OPENAI_COMPS_KEY, http_client=openai_http_client) if OPENAI_COMPS_KEY else None
+comps_run_config = RunConfig(model_provider=OpenAIProvider(openai_client=openai_comps_client)) if openai_comps_client else None
+if OPENAI_COMPS_KEY:
+    set_tracing_export_api_key(OPENAI_COMPS_KEY)
+
+
 # Pydantic models for the comps agent
 class CompSchema(BaseModel):
     source: str
@@ -804,16 +2494,218 @@ class CompsResponse(BaseModel):
     comp_2: dict
     comp_3: dict
 
-@app.post("/comps")
-async def generate_comps_simple(request: CompsRequest):
+comps_cache = TTLCache(COMPS_CACHE_MAX_ENTRIES, COMPS_CACHE_TTL_SECONDS, persist_path=COMPS_CACHE_PATH, namespace="comps")
+
+
+def normalize_text(value) -> str:
+    """Lowercase, drop punctuation and collapse whitespace ("Fender  Strat." -> "fender strat")"""
+    return " ".join(re.sub(r"[^\w\s]", " ", str(value or "").lower()).split())
+
+
+def comps_cache_key(brand: str, model: str, year: str, notes: str) -> str:
+    """Cache key for a comps search: normalized brand/model/year plus a hash of the notes"""
+    fields = [normalize_text(v) for v in (brand, model, year)]
+    fields = ["" if f == "unknown" else f for f in fields]
+    notes_hash = hashlib.sha256(normalize_text(notes).encode()).hexdigest()[:16]
+    return "|".join(fields + [notes_hash])
+
+
+# ============================================
+# SUGGESTED STARTING PRICE
+# ============================================
+
+# name -> fn(comps) returning an estimated market price (or None); register more with @pricing_strategy
+PRICING_STRATEGIES = {}
+
+
+def pricing_strategy(name: str):
+    def register(fn):
+        PRICING_STRATEGIES[name] = fn
+        return fn
+    return register
+
+
+def comp_prices(comps: list) -> list:
+    return [float(c["sold_price"]) for c in comps if c.get("sold_price")]
+
+
+@pricing_strategy("mean")
+def mean_price(comps: list):
+    prices = comp_prices(comps)
+    return statistics.fmean(prices) if prices else None
+
+
+@pricing_strategy("median")
+def median_price(comps: list):
+    prices = comp_prices(comps)
+    return statistics.median(prices) if prices else None
+
+
+@pricing_strategy("recency_weighted")
+def recency_weighted_price(comps: list):
+    """Mean weighted by sale age, halving every PRICING_RECENCY_HALF_LIFE_DAYS; undated comps count as one half-life old"""
+    today = datetime.now(timezone.utc).date()
+    weighted = []
+    for comp in comps:
+        if not comp.get("sold_price"):
+            continue
+        age_days = PRICING_RECENCY_HALF_LIFE_DAYS
+        if comp.get("sold_at"):
+            try:
+                age_days = max((today - datetime.fromisoformat(str(comp["sold_at"])[:10]).date()).days, 0)
+            except ValueError:
+                pass
+        weighted.append((float(comp["sold_price"]), 0.5 ** (age_days / PRICING_RECENCY_HALF_LIFE_DAYS)))
+    total_weight = sum(w for _, w in weighted)
+    return sum(p * w for p, w in weighted) / total_weight if total_weight else None
+
+
+@pricing_strategy("trimmed_mean")
+def trimmed_mean_price(comps: list):
+    """Mean after dropping outliers - 1.5x IQR fences with 4+ comps, otherwise anything over 2x off the median"""
+    prices = comp_prices(comps)
+    if not prices:
+        return None
+    if len(prices) >= 4:
+        q1, _, q3 = statistics.quantiles(prices, n=4, method="inclusive")
+        low, high = q1 - 1.5 * (q3 - q1), q3 + 1.5 * (q3 - q1)
+    else:
+        median = statistics.median(prices)
+        low, high = median / 2, median * 2
+    kept = [p for p in prices if low <= p <= high]
+    return statistics.fmean(kept or prices)
+
+
+def suggest_starting_price(comps: list, strategy: str = None) -> Optional[int]:
+    """Suggested opening bid: strategy estimate * PRICING_START_RATIO, rounded down to the nearest 5"""
+    estimate = PRICING_STRATEGIES[strategy or PRICING_STRATEGY](comps)
+    if estimate is None:
+        return None
+    return int(estimate * PRICING_START_RATIO // 5) * 5  # Round down to nearest 5
+
+
+async def refresh_suggested_prices(item_ids: list, strategy: str = None) -> dict:
+    """Recompute items.suggested_starting_price from their comps; returns {item_id: price}"""
+    grouped_comps = {item_id: [] for item_id in item_ids}
+    for comp in await select_in("comps", "item_id", item_ids, columns="item_id, sold_price, sold_at"):
+        grouped_comps[comp["item_id"]].append(comp)
+    
+    prices = {item_id: suggest_starting_price(comps, strategy) for item_id, comps in grouped_comps.items()}
+    if prices:
+        try:
+            # one statement for every item (see sql/suggested_starting_price.sql)
+            await supabase.rpc("set_suggested_starting_prices", {"p_prices": prices}).execute()
+        except Exception as e:
+            if not is_missing_function(e):
+                raise
+            # prices are rounded to 5s, so one update per distinct price covers most items
+            items_by_price = {}
+            for item_id, price in prices.items():
+                items_by_price.setdefault(price, []).append(item_id)
+            for price, priced_ids in items_by_price.items():
+                for start in range(0, len(priced_ids), DB_IN_CHUNK_SIZE):
+                    await supabase.table("items").update({"suggested_starting_price": price}).in_("item_id", priced_ids[start:start + DB_IN_CHUNK_SIZE]).execute()
+    invalidate_auction_caches(item_ids=item_ids)
+    return prices
+
+
+# POST recompute suggested starting prices for every item in an auction
+@app.post("/auctions/{auction_id}/suggested-prices")
+async def recompute_suggested_prices(auction_id: str, strategy: str = None):
     """
-    Generate comparable sales data using OpenAI Agents SDK.
-    Requires: brand, model, year, notes
-    Returns: 3 comps from different sources
+    Recompute and store suggested_starting_price for an auction's items,
+    e.g. after switching strategy. strategy defaults to PRICING_STRATEGY.
+    """
+    if strategy and strategy not in PRICING_STRATEGIES:
+        raise HTTPException(400, f"Unknown strategy. Use one of: {', '.join(PRICING_STRATEGIES)}")
+    
+    auction = await supabase.table("auctions").select("auction_id").eq("auction_id", auction_id).execute()
+    if not auction.data:
+        raise HTTPException(404, "Auction not found")
+    
+    items = await select_in("items", "auction_id", [auction_id], columns="item_id")
+    try:
+        prices = await refresh_suggested_prices([i["item_id"] for i in items], strategy)
+    except Exception as e:
+        raise HTTPException(500, f"Failed to update suggested prices: {str(e)}")
+    
+    invalidate_auction_caches(auction_id=auction_id)
+    return {
+        "auction_id": auction_id,
+        "strategy": strategy or PRICING_STRATEGY,
+        "suggested_starting_prices": prices
+    }
+
+
+async def save_comps(item_id: str, comps: dict):
+    """Write an agent (or cached) comps result to the item's comps rows in one insert"""
+    rows = []
+    for comp_key in ["comp_1", "comp_2", "comp_3"]:
+        comp_data = comps.get(comp_key)
+        if not comp_data or comp_data.get("source", "").lower() == "none":
+            continue
+        try:
+            # Parse price (remove any currency symbols)
+            price_str = str(comp_data.get("price", "0")).replace("$", "").replace(",", "").strip()
+            price_numeric = float(price_str) if price_str else 0.0
+        except ValueError:
+            continue
+        
+        # parse date (handle various formats and validate)
+        sale_date = None
+        raw_date = comp_data.get("sale_date", "")
+        if raw_date and raw_date.lower() not in ["null", "unknown", "none"]:
+            if re.match(r'^\d{4}-\d{2}-\d{2}$', raw_date):
+                sale_date = raw_date
+            else:
+                year_month_match = re.match(r'^(\d{4}-\d{2})', raw_date)
+                if year_month_match:
+                    sale_date = year_month_match.group(1) + "-01"
+        
+        rows.append({
+            "item_id": item_id,
+            "source": comp_data.get("source", "Unknown"),
+            "url_comp": comp_data.get("url", ""),
+            "sold_price": price_numeric,
+            "currency": "USD",
+            "sold_at": sale_date,
+            "notes": comp_data.get("notes", "")
+        })
+    
+    if not rows:
+        return
+    
+    # insert into comps table with retry logic
+    max_db_retries = 3
+    for retry in range(max_db_retries):
+        try:
+            await supabase.table("comps").insert(rows).execute()
+            break
+        except httpx.ReadError:
+            if retry < max_db_retries - 1:
+                await asyncio.sleep(1)
+        except Exception:
+            # comps are still returned to the caller even if saving fails
+            return
+    else:
+        return
+    
+    analytics_cache.invalidate(item_ids=[item_id])
+    try:
+        await refresh_suggested_prices([item_id])
+    except Exception:
+        # the suggestion is a convenience - a failed refresh must not fail the comps request
+        pass
+
+
+async def find_comps(request: CompsRequest, priority: int = PRIORITY_INTERACTIVE):
+    """
+    Find 3 comps for an item with the comps agent and save them.
+    Agent runs go through comps_scheduler at the given priority.
     """
     try:
         # verify item exists
-        item = supabase.table("items").select("*").eq("item_id", request.item_id).execute()
+        item = await supabase.table("items").select("*").eq("item_id", request.item_id).execute()
         if not item.data:
             raise HTTPException(404, "Item not found")
         
@@ -825,111 +2717,38 @@ async def generate_comps_simple(request: CompsRequest):
         year = request.year or (str(item_data.get("year")) if item_data.get("year") else "Unknown")
         notes = request.notes or ""
         
+        # same brand/model/year/notes priced recently - reuse it instead of a new agent run
+        cache_key = comps_cache_key(brand, model, year, notes)
+        cached_comps = await comps_cache.aget(cache_key)
+        if cached_comps is not None:
+            await save_comps(request.item_id, cached_comps)
+            return {
+                "success": True,
+                "item_id": request.item_id,
+                "comps": cached_comps,
+                "cached": True
+            }
+        
         # validate comps api key
         if not OPENAI_COMPS_KEY:
             raise HTTPException(500, "OpenAI Comps API key not configured")
         
-        # set openai api key for agents
-        os.environ["OPENAI_API_KEY"] = OPENAI_COMPS_KEY
-        
-        # Define the comps schema with proper field names
-        class Comp1Schema(BaseModel):
-            source_1: str
-            url_1: str
-            sale_date_1: str
-            price_1: str
-            notes_1: str
-        
-        class Comp2Schema(BaseModel):
-            source_2: str
-            url_2: str
-            sale_date_2: str
-            price_2: str
-            notes_2: str
-        
-        class Comp3Schema(BaseModel):
-            source_3: str
-            url_3: str
-            sale_date_3: str
-            price_3: str
-            notes_3: str
-        
-        class CompsOutput(BaseModel):
-            comp_1: Comp1Schema
-            comp_2: Comp2Schema
-            comp_3: Comp3Schema
-        
-        # Create agent with WebSearchTool
-        comps_agent = Agent(
-            name="Comps Agent",
-            instructions=f"""You are a Comps Agent. Your job is to find SOLD comparables ("comps") for any item.
-
-Here are the inputs:
-- Brand: {brand}
-- Model: {model}
-- Year: {year}
-- Notes: {notes}
-
-**CURRENT DATE: December 1, 2025**
-
-Use the web search tool to find REAL, RECENT sold listings with VALID, WORKING URLs from 2025 ONLY.
-
-### CRITICAL REQUIREMENTS
-1. **2025 SALES ONLY**: Every comp MUST be from 2025. Sales from 2024 or earlier are NOT acceptable.
-2. **URLs MUST BE VALID**: Every URL must be a real, working link to an actual sold listing page. Do not fabricate or guess URLs.
-3. **THREE DIFFERENT SOURCES**: Each comp must be from a different website (e.g., eBay, 1stDibs, Sotheby's, Grailed, StockX, Heritage Auctions, Poshmark, The RealReal, etc.).
-4. **SOLD LISTINGS ONLY**: Must be completed sales, not active listings or "Buy It Now" prices.
-
-### SEARCH STRATEGY
-- Search for: "{brand} {model} {year} sold 2025"
-- Try multiple search queries if needed: "sold items", "auction results 2025", "recently sold"
-- Check MULTIPLE pages of results to find 2025 sales
-- Verify the sale date is from 2025 before including
-- Keep searching until you find 3 valid comps from 2025
-
-### OUTPUT FORMAT (STRICT)
-You must output exactly THREE comps from 2025, filling every field:
-
-- `source_X`: The website name (e.g., "eBay", "Heritage Auctions", "1stDibs")
-- `url_X`: The COMPLETE, VALID URL to the sold listing page
-- `sale_date_X`: Format "YYYY-MM-DD" - MUST be EXACT date with valid day (e.g., "2025-08-27", "2025-10-20"). NO wildcards like "2025-09-**". If exact day unknown, use "01" for the day (e.g., "2025-09-01").
-- `price_X`: String with numbers only, e.g., "425.00" (no currency symbols)
-- `notes_X`: Include item condition, differences from target item, and any relevant details
-
-### VALIDATION RULES
-1. All three comps must be from three different websites, the comps should not be from the same source
-2. All three comps must have sale dates in **2025 ONLY** (January 1 - November 16, 2025)
-3. URLs must be **complete and valid** (start with https://)
-4. If the first search doesn't return 2025 results, try different search terms and keep searching
-5. Do NOT fabricate URLs or dates - only use real data from web search
-6. If after extensive searching you cannot find 3 comps from 2025, only then set "source_X": "none"
-
-**IMPORTANT**: Do not give up easily. Try multiple searches with different keywords until you find 3 valid 2025 sales.""",
-            tools=[
-                WebSearchTool(
-                    search_context_size="medium",
-                    user_location={
-                        "type": "approximate",
-                        "city": None,
-                        "country": "US",
-                        "region": None,
-                        "timezone": None
-                    }
-                )
-            ],
-            output_type=CompsOutput,
-        )
-        
         # run agent with retry logic
         max_attempts = 3
         valid_comps = None
         
         for attempt in range(max_attempts):
-            search_input = f"Find sold comparable items for {brand} {model} {year} from 2025"
+            search_input = f"""Find sold comparable items from 2025 for:
+- Brand: {brand}
+- Model: {model}
+- Year: {year}
+- Notes: {notes}"""
             if attempt > 0:
-                search_input += f" (Attempt {attempt + 1}: Focus on recent 2025 sales only)"
+                search_input += f"\n(Attempt {attempt + 1}: Focus on recent 2025 sales only)"
             
-            result = await Runner.run(comps_agent, input=search_input)
+            result = await comps_scheduler.run(
+                priority, Runner.run, comps_agent, input=search_input, run_config=comps_run_config
+            )
             
             # transform to expected format
             raw_output = result.final_output.model_dump()
@@ -975,54 +2794,17 @@ You must output exactly THREE comps from 2025, filling every field:
         if valid_comps is None:
             valid_comps = comps_data
         
-        # Save comps to database
-        for comp_key in ["comp_1", "comp_2", "comp_3"]:
-            if comp_key in valid_comps:
-                comp_data = valid_comps[comp_key]
-                if comp_data.get("source", "").lower() != "none":
-                    try:
-                        # Parse price (remove any currency symbols)
-                        price_str = str(comp_data.get("price", "0")).replace("$", "").replace(",", "").strip()
-                        price_numeric = float(price_str) if price_str else 0.0
-                        
-                        # parse date (handle various formats and validate)
-                        sale_date = None
-                        raw_date = comp_data.get("sale_date", "")
-                        if raw_date and raw_date.lower() not in ["null", "unknown", "none"]:
-                            import re
-                            if re.match(r'^\d{4}-\d{2}-\d{2}$', raw_date):
-                                sale_date = raw_date
-                            else:
-                                year_month_match = re.match(r'^(\d{4}-\d{2})', raw_date)
-                                if year_month_match:
-                                    sale_date = year_month_match.group(1) + "-01"
-                        
-                        # insert into comps table with retry logic
-                        max_db_retries = 3
-                        for retry in range(max_db_retries):
-                            try:
-                                supabase.table("comps").insert({
-                                    "item_id": request.item_id,
-                                    "source": comp_data.get("source", "Unknown"),
-                                    "url_comp": comp_data.get("url", ""),
-                                    "sold_price": price_numeric,
-                                    "currency": "USD",
-                                    "sold_at": sale_date,
-                                    "notes": comp_data.get("notes", "")
-                                }).execute()
-                                break
-                            except httpx.ReadError as db_error:
-                                if retry < max_db_retries - 1:
-                                    await asyncio.sleep(1)
-                                else:
-                                    raise db_error
-                    except Exception as e:
-                        pass
+        # only cache runs that found something, so a bad search gets retried next time
+        if any(comp.get("source", "").lower() != "none" for comp in valid_comps.values()):
+            comps_cache.set(cache_key, valid_comps)
+        
+        await save_comps(request.item_id, valid_comps)
         
         return {
             "success": True,
             "item_id": request.item_id,
-            "comps": valid_comps
+            "comps": valid_comps,
+            "cached": False
         }
         
     except HTTPException:
@@ -1033,8 +2815,19 @@ You must output exactly THREE comps from 2025, filling every field:
         raise HTTPException(500, f"Failed to generate comps: {str(e)}")
 
 
+@app.post("/comps")
+async def generate_comps_simple(request: CompsRequest):
+    """
+    Generate comparable sales data using OpenAI Agents SDK.
+    Requires: brand, model, year, notes
+    Returns: 3 comps from different sources
+    """
+    # single-item requests jump ahead of queued batch work
+    return await find_comps(request, priority=PRIORITY_INTERACTIVE)
+
+
 @app.get("/comps/{item_id}")
-def get_comps_for_item(item_id: str):
+async def get_comps_for_item(item_id: str):
     """
     Get all saved comps for a specific item
     """
@@ -1042,12 +2835,12 @@ def get_comps_for_item(item_id: str):
     for attempt in range(max_retries):
         try:
             # Verify item exists
-            item = supabase.table("items").select("item_id").eq("item_id", item_id).execute()
+            item = await supabase.table("items").select("item_id").eq("item_id", item_id).execute()
             if not item.data:
                 raise HTTPException(404, "Item not found")
             
             # Get all comps for this item
-            comps = supabase.table("comps").select("*").eq("item_id", item_id).order("created_at", desc=True).execute()
+            comps = await supabase.table("comps").select("*").eq("item_id", item_id).order("created_at", desc=True).execute()
             
             return {
                 "item_id": item_id,
@@ -1056,8 +2849,7 @@ def get_comps_for_item(item_id: str):
         
         except httpx.ReadError as e:
             if attempt < max_retries - 1:
-                import time
-                time.sleep(0.5)
+                await asyncio.sleep(0.5)
             else:
                 raise HTTPException(503, "Database connection timeout. Please try again.")
         except HTTPException:
@@ -1067,145 +2859,1153 @@ def get_comps_for_item(item_id: str):
 
 
 # ============================================
-# BATCH COMPS GENERATION ENDPOINTS
+# BATCH COMPS GENERATION ENDPOINTS
+# ============================================
+
+class BatchCompsRequest(BaseModel):
+    """Request model for batch comps generation"""
+    items: List[dict]  # List of items with item_id, brand, model, year, notes
+
+class BatchCompsResponse(BaseModel):
+    """Response model for batch comps creation"""
+    batch_id: str
+    status: str
+    total_items: int
+    message: str
+
+# ============================================
+# BIDDING SYSTEM MODELS
+# ============================================
+
+class AuctionSettingsUpdate(BaseModel):
+    """Request model for updating auction settings"""
+    start_time: Optional[str] = None
+    end_time: Optional[str] = None
+    status: Optional[str] = None  # 'draft', 'published', 'closed'
+    pickup_location: Optional[str] = None
+    shipping_allowed: Optional[bool] = None
+
+class ItemAuctionSettings(BaseModel):
+    """Request model for item auction settings"""
+    starting_bid: Optional[float] = None
+    min_increment: Optional[float] = None
+    buy_now_price: Optional[float] = None
+    lot: Optional[int] = None
+    is_listed: Optional[bool] = None
+
+class BatchItemAuctionSettings(BaseModel):
+    """Request model for batch updating item auction settings"""
+    item_ids: List[str]
+    starting_bid: Optional[float] = None
+    min_increment: Optional[float] = None
+    buy_now_price: Optional[float] = None
+    is_listed: Optional[bool] = None
+
+class BidRequest(BaseModel):
+    """Request model for placing a bid"""
+    bidder_email: str
+    bidder_name: str
+    bid_amount: float
+
+class BuyNowRequest(BaseModel):
+    """Request model for buy now purchase"""
+    buyer_email: str
+    buyer_name: str
+
+# ============================================
+# COMPS BATCH JOBS
+# ============================================
+
+# terminal states for a batch item
+FINISHED_ITEM_STATUSES = ("succeeded", "failed", "cancelled")
+
+
+class CompsJobStore:
+    """
+    SQLite-backed job and result state for /comps/batch.
+    One row per batch plus one row per item, so progress and results
+    survive restarts and unfinished items can be picked up again.
+    Every query runs on one dedicated thread (the methods are awaitable),
+    so disk stalls never block the event loop.
+    """
+
+    def __init__(self, path: str):
+        self._db_thread = ThreadPoolExecutor(max_workers=1, thread_name_prefix="comps-jobs")
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS comps_batches (
+                batch_id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                total_items INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS comps_batch_items (
+                batch_id TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                item_id TEXT,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL,
+                result TEXT,
+                error TEXT,
+                PRIMARY KEY (batch_id, position)
+            );
+        """)
+
+    @on_db_thread
+    def create_batch(self, items: list) -> str:
+        batch_id = uuid.uuid4().hex
+        now = time.time()
+        with self._conn:
+            self._conn.execute("BEGIN")
+            self._conn.execute(
+                "INSERT INTO comps_batches VALUES (?, 'queued', ?, ?, ?)",
+                (batch_id, len(items), now, now)
+            )
+            self._conn.executemany(
+                "INSERT INTO comps_batch_items (batch_id, position, item_id, payload, status) VALUES (?, ?, ?, ?, 'queued')",
+                [(batch_id, i, item.get("item_id"), json.dumps(item)) for i, item in enumerate(items)]
+            )
+        return batch_id
+
+    @on_db_thread
+    def get_batch(self, batch_id: str) -> Optional[dict]:
+        row = self._conn.execute("SELECT * FROM comps_batches WHERE batch_id = ?", (batch_id,)).fetchone()
+        if row is None:
+            return None
+        counts = dict(self._conn.execute(
+            "SELECT status, COUNT(*) FROM comps_batch_items WHERE batch_id = ? GROUP BY status", (batch_id,)
+        ).fetchall())
+        return {**dict(row), "counts": counts}
+
+    @on_db_thread
+    def claim_item(self, batch_id: str, position: int) -> Optional[dict]:
+        """Mark an item running and return its payload, or None if it's cancelled or done"""
+        with self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            claimed = self._conn.execute(
+                "UPDATE comps_batch_items SET status = 'running' "
+                "WHERE batch_id = ? AND position = ? AND status IN ('queued', 'running')",
+                (batch_id, position)
+            ).rowcount
+            if not claimed:
+                return None
+            self._conn.execute(
+                "UPDATE comps_batches SET status = 'running', updated_at = ? WHERE batch_id = ? AND status = 'queued'",
+                (time.time(), batch_id)
+            )
+        row = self._conn.execute(
+            "SELECT payload FROM comps_batch_items WHERE batch_id = ? AND position = ?", (batch_id, position)
+        ).fetchone()
+        return json.loads(row["payload"])
+
+    @on_db_thread
+    def finish_item(self, batch_id: str, position: int, status: str, result: dict = None, error: str = None):
+        with self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.execute(
+                "UPDATE comps_batch_items SET status = ?, result = ?, error = ? "
+                "WHERE batch_id = ? AND position = ? AND status = 'running'",
+                (status, json.dumps(result) if result is not None else None, error, batch_id, position)
+            )
+            # close the batch once every item has reached a final state
+            self._conn.execute(
+                "UPDATE comps_batches SET status = 'completed', updated_at = ? "
+                "WHERE batch_id = ? AND status = 'running' AND NOT EXISTS ("
+                "  SELECT 1 FROM comps_batch_items WHERE batch_id = ? AND status IN ('queued', 'running'))",
+                (time.time(), batch_id, batch_id)
+            )
+
+    @on_db_thread
+    def cancel_batch(self, batch_id: str) -> bool:
+        """Cancel a batch's unfinished items; False if the batch was already finished"""
+        with self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            updated = self._conn.execute(
+                "UPDATE comps_batches SET status = 'cancelled', updated_at = ? "
+                "WHERE batch_id = ? AND status IN ('queued', 'running')",
+                (time.time(), batch_id)
+            ).rowcount
+            if updated:
+                self._conn.execute(
+                    "UPDATE comps_batch_items SET status = 'cancelled' "
+                    "WHERE batch_id = ? AND status IN ('queued', 'running')",
+                    (batch_id,)
+                )
+        return bool(updated)
+
+    @on_db_thread
+    def results(self, batch_id: str) -> list:
+        rows = self._conn.execute(
+            "SELECT item_id, status, result, error FROM comps_batch_items WHERE batch_id = ? ORDER BY position",
+            (batch_id,)
+        ).fetchall()
+        results = []
+        for row in rows:
+            entry = {"item_id": row["item_id"], "status": row["status"], "success": row["status"] == "succeeded"}
+            if row["result"] is not None:
+                entry.update(json.loads(row["result"]))
+            if row["error"] is not None:
+                entry["error"] = row["error"]
+            results.append(entry)
+        return results
+
+    @on_db_thread
+    def unfinished_items(self) -> list:
+        """(batch_id, position) of every item a previous process didn't finish"""
+        return [tuple(row) for row in self._conn.execute(
+            "SELECT batch_id, position FROM comps_batch_items "
+            "WHERE status IN ('queued', 'running') ORDER BY rowid"
+        ).fetchall()]
+
+
+class CompsBatchRunner:
+    """Works queued comps batch items with at most `concurrency` agent runs in flight"""
+
+    def __init__(self, store: CompsJobStore, concurrency: int):
+        self.store = store
+        self._concurrency = concurrency
+        self._queue = None
+        self._workers = []
+        self._running = {}  # (batch_id, position) -> task
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+        for key in await self.store.unfinished_items():
+            self._queue.put_nowait(key)
+        self._workers = [asyncio.create_task(self._work()) for _ in range(self._concurrency)]
+
+    async def stop(self):
+        # items still running stay 'running' in the store and are resumed on next start
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def submit(self, items: list) -> str:
+        batch_id = await self.store.create_batch(items)
+        for position in range(len(items)):
+            self._queue.put_nowait((batch_id, position))
+        return batch_id
+
+    async def cancel(self, batch_id: str) -> bool:
+        cancelled = await self.store.cancel_batch(batch_id)
+        for (running_batch, _), task in list(self._running.items()):
+            if running_batch == batch_id:
+                task.cancel()
+        return cancelled
+
+    async def _work(self):
+        while True:
+            batch_id, position = await self._queue.get()
+            try:
+                await self._run_item(batch_id, position)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # never let one bad item take a worker down
+                pass
+            finally:
+                self._queue.task_done()
+
+    async def _run_item(self, batch_id: str, position: int):
+        item_data = await self.store.claim_item(batch_id, position)
+        if item_data is None:
+            return
+
+        try:
+            comps_request = CompsRequest(
+                item_id=item_data.get("item_id"),
+                brand=item_data.get("brand", "Unknown"),
+                model=item_data.get("model", "Unknown"),
+                year=item_data.get("year", "Unknown"),
+                notes=item_data.get("notes", "")
+            )
+        except ValidationError as e:
+            # a malformed payload must not leave the item 'running' forever
+            await self.store.finish_item(batch_id, position, "failed", error=str(e))
+            return
+        task = asyncio.create_task(find_comps(comps_request, priority=PRIORITY_BATCH))
+        self._running[(batch_id, position)] = task
+        try:
+            result = await task
+            await self.store.finish_item(batch_id, position, "succeeded", result={"comps": result["comps"]})
+        except asyncio.CancelledError:
+            if not task.cancelled() or (await self.store.get_batch(batch_id))["status"] != "cancelled":
+                raise
+            # cancelled through DELETE /comps/batch/{batch_id}; the store already marked the item
+        except HTTPException as e:
+            await self.store.finish_item(batch_id, position, "failed", error=str(e.detail))
+        except Exception as e:
+            await self.store.finish_item(batch_id, position, "failed", error=str(e))
+        finally:
+            self._running.pop((batch_id, position), None)
+
+
+comps_batch_runner = CompsBatchRunner(CompsJobStore(COMPS_JOBS_DB_PATH), COMPS_BATCH_CONCURRENCY)
+
+
+def batch_progress(batch: dict) -> dict:
+    counts = batch["counts"]
+    finished = sum(counts.get(status, 0) for status in FINISHED_ITEM_STATUSES)
+    return {
+        "batch_id": batch["batch_id"],
+        "status": batch["status"],
+        "total_items": batch["total_items"],
+        "completed_items": finished,
+        "successful": counts.get("succeeded", 0),
+        "failed": counts.get("failed", 0),
+        "cancelled": counts.get("cancelled", 0),
+        "running": counts.get("running", 0),
+        "queued": counts.get("queued", 0),
+        "progress": finished / batch["total_items"] if batch["total_items"] else 1.0
+    }
+
+
+@app.post("/comps/batch")
+async def create_comps_batch(request: BatchCompsRequest):
+    """
+    Queue comps generation for multiple items as a background job.
+    Returns immediately with a batch_id; poll GET /comps/batch/{batch_id}
+    for progress and GET /comps/batch/{batch_id}/results for the comps.
+    
+    Request body:
+    {
+        "items": [
+            {"item_id": "abc", "brand": "Rolex", "model": "Submariner", "year": "2020", "notes": ""},
+            {"item_id": "def", "brand": "Omega", "model": "Speedmaster", "year": "2019", "notes": ""}
+        ]
+    }
+    """
+    if not request.items or len(request.items) == 0:
+        raise HTTPException(400, "Items list cannot be empty")
+    
+    if len(request.items) > 100:
+        raise HTTPException(400, "Batch size cannot exceed 100 items")
+    
+    # validate openai key
+    if not OPENAI_COMPS_KEY:
+        raise HTTPException(500, "OpenAI Comps API key not configured")
+    
+    batch_id = await comps_batch_runner.submit(request.items)
+    
+    return {
+        "batch_id": batch_id,
+        "status": "queued",
+        "total_items": len(request.items),
+        "message": f"Batch queued. {len(request.items)} items will be processed in the background."
+    }
+
+
+# GET batch status and progress
+@app.get("/comps/batch/{batch_id}")
+async def get_comps_batch_status(batch_id: str):
+    """Get status and progress counts for a comps batch"""
+    batch = await comps_batch_runner.store.get_batch(batch_id)
+    if batch is None:
+        raise HTTPException(404, "Batch not found")
+    return batch_progress(batch)
+
+
+# GET batch results
+@app.get("/comps/batch/{batch_id}/results")
+async def get_comps_batch_results(batch_id: str, save_to_db: bool = True):
+    """
+    Get per-item results for a comps batch (available as items finish).
+    save_to_db is accepted for compatibility - comps are already saved to
+    each item as soon as its agent run finishes.
+    """
+    batch = await comps_batch_runner.store.get_batch(batch_id)
+    if batch is None:
+        raise HTTPException(404, "Batch not found")
+    return {
+        **batch_progress(batch),
+        "results": await comps_batch_runner.store.results(batch_id)
+    }
+
+
+# CANCEL a batch
+@app.delete("/comps/batch/{batch_id}")
+async def cancel_comps_batch(batch_id: str):
+    """Cancel a comps batch - queued items are skipped and running agent runs are stopped"""
+    batch = await comps_batch_runner.store.get_batch(batch_id)
+    if batch is None:
+        raise HTTPException(404, "Batch not found")
+    
+    if not await comps_batch_runner.cancel(batch_id):
+        raise HTTPException(400, f"Batch is already {batch['status']}")
+    
+    return {"message": "Batch cancelled", **batch_progress(await comps_batch_runner.store.get_batch(batch_id))}
+
+
+# ============================================
+# LIVE BID STREAM (in-process pub/sub)
+# ============================================
+
+class BidBroker:
+    """Fans bid events out to every open stream for an auction"""
+
+    def __init__(self, max_queue_size: int = 1000):
+        self._max_queue_size = max_queue_size
+        self._subscribers = {}  # auction_id -> set of queues
+
+    def subscribe(self, auction_id: str) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self._max_queue_size)
+        self._subscribers.setdefault(auction_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, auction_id: str, queue: asyncio.Queue):
+        subs = self._subscribers.get(auction_id)
+        if subs is None:
+            return
+        subs.discard(queue)
+        if not subs:
+            del self._subscribers[auction_id]
+
+    def publish(self, auction_id: str, event: dict):
+        for queue in list(self._subscribers.get(auction_id, ())):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # slow consumer - end its stream so the client reconnects and resyncs from a fresh snapshot
+                self.unsubscribe(auction_id, queue)
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(None)
+
+
+bid_broker = BidBroker(max_queue_size=BID_STREAM_QUEUE_SIZE)
+
+
+def format_sse(event: str, data: dict) -> str:
+    """Format one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+# ============================================
+# BID LEDGER (per-item highest bid)
+# ============================================
+
+class BidLedger:
+    """
+    In-process view of each item's bid floor, keyed by item_id.
+    The place_bid_atomic DB function stays authoritative; the ledger just
+    serializes bids for an item inside this process and rejects bids that
+    are already too low without a round trip.
+    """
+
+    def __init__(self):
+        self._state = {}  # item_id -> {"current_highest", "starting_bid", "min_increment", "auction_id"}
+        self._locks = {}  # item_id -> [lock, holders + waiters]; dropped when that reaches 0
+
+    @asynccontextmanager
+    async def lock(self, item_id: str):
+        """Serialize bids on one item; the lock lives only while someone holds or waits for it"""
+        entry = self._locks.get(item_id)
+        if entry is None:
+            entry = self._locks[item_id] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._locks[item_id]
+
+    def min_required(self, item_id: str) -> Optional[float]:
+        """Lowest acceptable bid, or None if this item hasn't been seen yet"""
+        state = self._state.get(item_id)
+        if state is None:
+            return None
+        if state["current_highest"] is None:
+            return state["starting_bid"]
+        return state["current_highest"] + state["min_increment"]
+
+    def record(self, item_id: str, outcome: dict):
+        """Update an item's floor from a place_bid_atomic result"""
+        if outcome.get("min_increment") is None:
+            return
+        self._state[item_id] = {
+            "current_highest": outcome.get("current_highest"),
+            "starting_bid": outcome.get("starting_bid") or 0,
+            "min_increment": outcome.get("min_increment"),
+            "auction_id": outcome.get("auction_id"),
+        }
+
+    def invalidate(self, item_ids=None, auction_id: str = None):
+        """Forget cached floors after item settings change or items are deleted"""
+        for item_id in item_ids or []:
+            self._state.pop(item_id, None)
+        if auction_id:
+            for item_id, state in list(self._state.items()):
+                if state["auction_id"] == auction_id:
+                    self._state.pop(item_id, None)
+
+
+bid_ledger = BidLedger()
+
+# place_bid_atomic error codes -> API errors
+BID_REJECTIONS = {
+    "not_found": (404, "Item not found"),
+    "not_active": (400, "Auction is not active"),
+    "ended": (400, "Auction has ended"),
+    "sold": (400, "Item has already been sold"),
+}
+
+# buy_now_atomic error codes -> API errors
+BUY_NOW_REJECTIONS = {
+    **BID_REJECTIONS,
+    "unavailable": (400, "Buy now not available for this item"),
+}
+
+# buyer_id for guest purchases (orders.buyer_id is required)
+GUEST_BUYER_ID = "00000000-0000-0000-0000-000000000000"
+
+
+# ============================================
+# IDEMPOTENCY KEYS (bid / buy-now retries)
+# ============================================
+
+class IdempotencyStore:
+    """
+    Remembers the response to each POST that carried an Idempotency-Key, so a
+    client retrying after a dropped connection gets the original result instead
+    of a second bid or order. Identical requests that arrive while the first is
+    still running wait for it rather than executing again. 5xx results aren't
+    stored - those retries run for real.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float, persist_path: str = None):
+        self._responses = TTLCache(max_entries, ttl_seconds, persist_path=persist_path, namespace="idempotency")
+        self._in_flight = {}  # key -> (fingerprint, future of the stored response, None if it failed)
+
+    async def run(self, key: str, fingerprint: str, handler):
+        """Returns ({"fingerprint", "status_code", "body"}, replayed)"""
+        while True:
+            stored = await self._responses.aget(key)
+            if stored is None and key in self._in_flight:
+                pending_fingerprint, future = self._in_flight[key]
+                self._check(fingerprint, pending_fingerprint)
+                stored = await asyncio.shield(future)
+                if stored is None:
+                    # the first attempt crashed - let this one try
+                    continue
+            if stored is not None:
+                self._check(fingerprint, stored["fingerprint"])
+                return stored, True
+            break
+        
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = (fingerprint, future)
+        stored = None
+        try:
+            try:
+                body = await handler()
+                stored = {"fingerprint": fingerprint, "status_code": 200, "body": jsonable_encoder(body)}
+            except HTTPException as e:
+                stored = {"fingerprint": fingerprint, "status_code": e.status_code, "body": {"detail": e.detail}}
+            if stored["status_code"] < 500:
+                self._responses.set(key, stored)
+            return stored, False
+        finally:
+            del self._in_flight[key]
+            future.set_result(stored)
+
+    @staticmethod
+    def _check(fingerprint: str, stored_fingerprint: str):
+        if fingerprint != stored_fingerprint:
+            raise HTTPException(422, "Idempotency-Key was already used with a different request")
+
+
+idempotency_store = IdempotencyStore(IDEMPOTENCY_MAX_ENTRIES, IDEMPOTENCY_TTL_SECONDS, persist_path=IDEMPOTENCY_CACHE_PATH)
+
+
+async def idempotent_response(scope: str, idempotency_key: str, payload: dict, handler) -> JSONResponse:
+    """Run handler once per (scope, Idempotency-Key); repeats get the stored response with Idempotent-Replayed: true"""
+    if len(idempotency_key) > 255:
+        raise HTTPException(400, "Idempotency-Key must be at most 255 characters")
+    fingerprint = hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+    stored, replayed = await idempotency_store.run(f"{scope}:{idempotency_key}", fingerprint, handler)
+    headers = {"Idempotent-Replayed": "true"} if replayed else None
+    return JSONResponse(stored["body"], status_code=stored["status_code"], headers=headers)
+
+
+# ============================================
+# AUCTION CLOSE SCHEDULER
+# ============================================
+
+def parse_timestamp(value) -> datetime:
+    """Parse a timestamptz string from the API or DB (naive values are taken as UTC)"""
+    parsed = value if isinstance(value, datetime) else datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+class AuctionCloser:
+    """
+    Closes published auctions at their end_time.
+    Deadlines sit in a min-heap and one task sleeps until the earliest of them,
+    waking early when an earlier deadline is scheduled. Every worker process
+    runs its own closer; settle_auction's conditional status update makes sure
+    only one of them settles a given auction.
+    """
+
+    def __init__(self, retry_seconds: float):
+        self._retry_seconds = retry_seconds
+        self._heap = []  # (deadline, auction_id); entries not matching _deadlines are stale
+        self._deadlines = {}  # auction_id -> epoch seconds
+        self._reopen = {}  # auction_id -> status to restore before its next settle attempt
+        self._wakeup = None
+        self._task = None
+
+    def start(self):
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def schedule(self, auction_id: str, end_time):
+        """(Re)schedule an auction to close at end_time"""
+        self._push(auction_id, parse_timestamp(end_time).timestamp())
+
+    def unschedule(self, auction_id: str):
+        self._deadlines.pop(auction_id, None)
+
+    def reopen_later(self, auction_id: str, status: str):
+        """Retry restoring an auction left closed by a failed settle, then settle it as usual"""
+        self._reopen[auction_id] = status
+        self._push(auction_id, time.time() + self._retry_seconds)
+
+    def deadline(self, auction_id: str) -> Optional[float]:
+        """Scheduled close time (epoch seconds), or None if not tracked"""
+        return self._deadlines.get(auction_id)
+
+    def _push(self, auction_id: str, deadline: float):
+        self._deadlines[auction_id] = deadline
+        heapq.heappush(self._heap, (deadline, auction_id))
+        if self._wakeup:
+            self._wakeup.set()
+
+    async def _load(self):
+        async for page in iter_pages("auctions", "status", "published", columns="auction_id, end_time", order=[("auction_id", False)]):
+            for auction in page:
+                if auction.get("end_time"):
+                    self.schedule(auction["auction_id"], auction["end_time"])
+
+    async def _run(self):
+        # keep trying until the DB is reachable - bids still get rejected in SQL after end_time meanwhile
+        while True:
+            try:
+                await self._load()
+                break
+            except Exception:
+                await asyncio.sleep(self._retry_seconds)
+
+        while True:
+            self._wakeup.clear()
+            now = time.time()
+            due = []
+            while self._heap and self._heap[0][0] <= now:
+                deadline, auction_id = heapq.heappop(self._heap)
+                if self._deadlines.get(auction_id) == deadline:
+                    del self._deadlines[auction_id]
+                    due.append(auction_id)
+            if due:
+                await asyncio.gather(*(self._close(auction_id) for auction_id in due))
+
+            timeout = self._heap[0][0] - time.time() if self._heap else None
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _close(self, auction_id: str):
+        try:
+            status = self._reopen.pop(auction_id, None)
+            if status is not None:
+                await reopen_auction(auction_id, status)
+                if auction_id in self._reopen:
+                    return
+            if await settle_auction(auction_id, due_only=True) is not None:
+                return
+            # another worker closed it, or its end_time moved (soft close) - follow the DB
+            res = await supabase.table("auctions").select("status, end_time").eq("auction_id", auction_id).execute()
+            if res.data and res.data[0]["status"] == "published" and res.data[0].get("end_time"):
+                self.schedule(auction_id, res.data[0]["end_time"])
+        except Exception:
+            if auction_id not in self._deadlines:
+                self._push(auction_id, time.time() + self._retry_seconds)
+
+
+auction_closer = AuctionCloser(retry_seconds=AUCTION_CLOSE_RETRY_SECONDS)
+
+
+async def settle_auction(auction_id: str, due_only: bool = False) -> Optional[dict]:
+    """
+    Close an auction and turn each unsold item's highest bid into an order.
+    The status update is conditional, so when workers (or a manual close) race
+    exactly one caller settles. Returns {"auction", "orders"}, or None if the
+    auction was already closed (or, with due_only, isn't due yet).
+    """
+    now = datetime.now(timezone.utc).isoformat()
+    current = await supabase.table("auctions").select("status").eq("auction_id", auction_id).execute()
+    if not current.data or current.data[0]["status"] == "closed":
+        return None
+    prior_status = current.data[0]["status"]
+    if due_only and prior_status != "published":
+        return None
+    # conditional on the status just read: racing closers can't both win, and a failure can restore it
+    query = supabase.table("auctions").update({"status": "closed"}).eq("auction_id", auction_id).eq("status", prior_status)
+    if due_only:
+        query = query.lte("end_time", now)
+    res = await query.execute()
+    if not res.data:
+        return None
+    
+    orders = []
+    try:
+        items = await select_in(
+            "items", "auction_id", [auction_id],
+            columns="item_id",
+            filters=lambda q: q.eq("is_listed", True).eq("is_sold", False)
+        )
+        item_ids = [item["item_id"] for item in items]
+        
+        # bids arrive highest (then earliest) first, so the first bid seen per item wins
+        winners = {}
+        bids = await select_in(
+            "bids", "item_id", item_ids,
+            columns="item_id, bidder_id, bidder_email, bidder_name, amount",
+            order=[("amount", True), ("created_at", False)]
+        )
+        for bid in bids:
+            winners.setdefault(bid["item_id"], bid)
+        
+        order_rows = [
+            {
+                "item_id": item_id,
+                "auction_id": auction_id,
+                "buyer_id": bid["bidder_id"],
+                "buyer_email": bid["bidder_email"],
+                "buyer_name": bid["bidder_name"],
+                "amount": bid["amount"],
+                "order_type": "auction_win"
+            }
+            for item_id, bid in winners.items()
+        ]
+        try:
+            # upsert on (auction_id, item_id): a retry after a failure past this point
+            # updates the orders it already wrote instead of duplicating them
+            orders = await insert_rows("orders", order_rows, on_conflict="auction_id,item_id")
+        except Exception as e:
+            if not is_missing_conflict_target(e):
+                raise
+            # sql/orders_auction_item_unique.sql not applied - keep existing orders, insert the rest
+            existing = await select_in("orders", "item_id", list(winners), filters=lambda q: q.eq("auction_id", auction_id))
+            ordered_ids = {order["item_id"] for order in existing}
+            orders = existing + await insert_rows("orders", [row for row in order_rows if row["item_id"] not in ordered_ids], key="order_id")
+        
+        sold_ids = list(winners)
+        for start in range(0, len(sold_ids), DB_IN_CHUNK_SIZE):
+            await supabase.table("items").update({"is_sold": True, "sold_at": now}).in_("item_id", sold_ids[start:start + DB_IN_CHUNK_SIZE]).execute()
+    except Exception:
+        # reopen to the status it had, so the next attempt settles again (and a draft
+        # stays a draft); the auction stays scheduled, so a failed manual close is
+        # still closed by the scheduler at end_time
+        await reopen_auction(auction_id, prior_status)
+        if orders:
+            # the reopened auction hasn't been won yet - drop what this attempt wrote
+            try:
+                await delete_in("orders", "order_id", [order["order_id"] for order in orders])
+            except Exception:
+                logger.exception("Could not remove orders of failed settle for auction %s", auction_id)
+        raise
+    finally:
+        invalidate_auction_caches(auction_id=auction_id)
+        bid_ledger.invalidate(auction_id=auction_id)
+    
+    auction_closer.unschedule(auction_id)
+    bid_broker.publish(auction_id, {"type": "status", "auction_id": auction_id, "status": "closed", "orders": orders})
+    return {"auction": res.data[0], "orders": orders}
+
+
+async def reopen_auction(auction_id: str, status: str):
+    """Undo a failed settle's close. If that fails too, the closer retries it - settle_auction skips closed auctions."""
+    try:
+        await supabase.table("auctions").update({"status": status}).eq("auction_id", auction_id).eq("status", "closed").execute()
+    except Exception:
+        logger.exception("Could not reopen auction %s after a failed settle; retrying", auction_id)
+        auction_closer.reopen_later(auction_id, status)
+
+
+async def extend_auction_end(auction_id: str):
+    """Soft close: push end_time out when a bid lands in the final AUCTION_SOFT_CLOSE_SECONDS"""
+    deadline = auction_closer.deadline(auction_id)
+    now = time.time()
+    if deadline is None or deadline - now > AUCTION_SOFT_CLOSE_SECONDS:
+        return
+    
+    new_end = datetime.fromtimestamp(now + AUCTION_SOFT_CLOSE_EXTENSION_SECONDS, timezone.utc).isoformat()
+    res = await supabase.table("auctions").update({"end_time": new_end}).eq("auction_id", auction_id).eq("status", "published").lt("end_time", new_end).execute()
+    if not res.data:
+        return
+    
+    auction_closer.schedule(auction_id, new_end)
+    public_auction_cache.invalidate(auction_id=auction_id)
+    bid_broker.publish(auction_id, {"type": "extended", "auction_id": auction_id, "end_time": new_end})
+
+
+# ============================================
+# PUBLIC AUCTION CACHE
 # ============================================
 
-class BatchCompsRequest(BaseModel):
-    """Request model for batch comps generation"""
-    items: List[dict]  # List of items with item_id, brand, model, year, notes
+class PublicAuctionCache:
+    """
+    Layered read-through cache for GET /auctions/{auction_id}/public.
+    The catalog layer (auction, listed items, images) rarely changes during a
+    sale and lives for PUBLIC_CATALOG_TTL_SECONDS. The bid overlay
+    (current_bid, bid_count, is_sold per item) is updated in place by
+    place_bid/buy_now and re-read from the DB after PUBLIC_BIDS_TTL_SECONDS
+    to pick up bids taken by other workers.
+    Every change bumps the auction's version, which is what the ETag carries.
+    Concurrent misses share one load (see coalesce), so a cold or expired
+    entry costs one set of queries however many readers arrive at once.
+    """
+
+    def __init__(self, catalog_ttl: float, bids_ttl: float):
+        self._catalog_ttl = catalog_ttl
+        self._bids_ttl = bids_ttl
+        self._entries = {}  # auction_id -> entry dict
+        self._loading = {}  # (auction_id, layer) -> task filling that layer
+        self._item_auctions = {}  # item_id -> auction_id, for item-level invalidation
+        self._versions = itertools.count(1)
+        # a new token per process, so ETags from before a restart never match
+        self._boot_id = uuid.uuid4().hex[:8]
+
+    def catalog(self, auction_id: str) -> Optional[dict]:
+        entry = self._entries.get(auction_id)
+        if entry is None or time.monotonic() - entry["catalog_at"] > self._catalog_ttl:
+            return None
+        return entry
+
+    def bids_fresh(self, entry: dict) -> bool:
+        return time.monotonic() - entry["bids_at"] <= self._bids_ttl
+
+    def store_catalog(self, auction_id: str, auction: dict, items: list):
+        now = time.monotonic()
+        self._entries[auction_id] = {
+            "auction": auction,
+            "items": items,
+            "overlay": {},
+            "catalog_at": now,
+            "bids_at": float("-inf"),
+            "version": next(self._versions),
+        }
+        for item in items:
+            self._item_auctions[item["item_id"]] = auction_id
+
+    async def coalesce(self, key: tuple, loader):
+        """Run loader() once for concurrent misses on key; the other callers await the same result"""
+        task = self._loading.get(key)
+        if task is None:
+            task = asyncio.ensure_future(loader())
+            self._loading[key] = task
+            task.add_done_callback(lambda done: self._loading.pop(key, None) if self._loading.get(key) is done else None)
+        return await asyncio.shield(task)
+
+    def store_bids(self, entry: dict, overlay: dict):
+        # merge, so flags set in place (is_sold from record_sale) survive the refresh
+        changed = False
+        for item_id, hot in overlay.items():
+            cached = entry["overlay"].setdefault(item_id, {})
+            if any(cached.get(key) != value for key, value in hot.items()):
+                cached.update(hot)
+                changed = True
+        entry["bids_at"] = time.monotonic()
+        # a refresh that found nothing new keeps the version, so clients keep getting 304s
+        if changed:
+            entry["version"] = next(self._versions)
+
+    def record_bid(self, auction_id: str, item_id: str, amount: float):
+        entry = self._entries.get(auction_id)
+        if entry is None:
+            return
+        hot = entry["overlay"].setdefault(item_id, {})
+        hot["current_bid"] = max(hot.get("current_bid", amount), amount)
+        hot["bid_count"] = hot.get("bid_count", 0) + 1
+        entry["version"] = next(self._versions)
+
+    def record_sale(self, auction_id: str, item_id: str):
+        entry = self._entries.get(auction_id)
+        if entry is None:
+            return
+        entry["overlay"].setdefault(item_id, {})["is_sold"] = True
+        # the catalog copy too, so the sale outlives any overlay refresh
+        for item in entry["items"]:
+            if item["item_id"] == item_id:
+                item["is_sold"] = True
+        entry["version"] = next(self._versions)
+
+    def invalidate(self, auction_id: str = None, item_ids=None):
+        """Drop the catalog layer after auction, item or image edits"""
+        if auction_id:
+            self._entries.pop(auction_id, None)
+        for item_id in item_ids or []:
+            cached_auction = self._item_auctions.pop(item_id, None)
+            if cached_auction:
+                self._entries.pop(cached_auction, None)
+
+    def etag(self, entry: dict) -> str:
+        return f'W/"{self._boot_id}-{entry["version"]}"'
+
+    @staticmethod
+    def render(entry: dict) -> dict:
+        """Merge the bid overlay onto copies of the cached items"""
+        items = []
+        for item in entry["items"]:
+            hot = entry["overlay"].get(item["item_id"], {})
+            merged = {
+                **item,
+                "current_bid": hot.get("current_bid", item.get("starting_bid", 0) or 0),
+                "bid_count": hot.get("bid_count", 0),
+            }
+            if hot.get("is_sold"):
+                merged["is_sold"] = True
+            items.append(merged)
+        return {"auction": entry["auction"], "items": items}
+
+    def body(self, entry: dict) -> str:
+        """render() serialized once per version - readers between changes share the same JSON"""
+        cached = entry.get("body")
+        if cached is None or cached[0] != entry["version"]:
+            cached = (entry["version"], json.dumps(self.render(entry)))
+            entry["body"] = cached
+        return cached[1]
+
+
+public_auction_cache = PublicAuctionCache(PUBLIC_CATALOG_TTL_SECONDS, PUBLIC_BIDS_TTL_SECONDS)
 
-class BatchCompsResponse(BaseModel):
-    """Response model for batch comps creation"""
-    batch_id: str
-    status: str
-    total_items: int
-    message: str
 
 # ============================================
-# BIDDING SYSTEM MODELS
+# AUCTION ANALYTICS
 # ============================================
 
-class AuctionSettingsUpdate(BaseModel):
-    """Request model for updating auction settings"""
-    start_time: Optional[str] = None
-    end_time: Optional[str] = None
-    status: Optional[str] = None  # 'draft', 'published', 'closed'
-    pickup_location: Optional[str] = None
-    shipping_allowed: Optional[bool] = None
+class AuctionAnalyticsCache:
+    """
+    Rendered analytics JSON per auction, dropped whenever one of its items gets
+    a bid, sale or comp write. Bodies are cached pre-serialized - encoding a
+    2,000-item response costs more than computing it.
+    """
 
-class ItemAuctionSettings(BaseModel):
-    """Request model for item auction settings"""
-    starting_bid: Optional[float] = None
-    min_increment: Optional[float] = None
-    buy_now_price: Optional[float] = None
-    lot: Optional[int] = None
-    is_listed: Optional[bool] = None
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self._entries = TTLCache(max_entries, ttl_seconds, namespace="analytics")
+        self._item_auctions = {}  # item_id -> auction_id, for item-level invalidation
 
-class BatchItemAuctionSettings(BaseModel):
-    """Request model for batch updating item auction settings"""
-    item_ids: List[str]
-    starting_bid: Optional[float] = None
-    min_increment: Optional[float] = None
-    buy_now_price: Optional[float] = None
-    is_listed: Optional[bool] = None
+    def get(self, auction_id: str) -> Optional[str]:
+        return self._entries.get(auction_id)
 
-class BidRequest(BaseModel):
-    """Request model for placing a bid"""
-    bidder_email: str
-    bidder_name: str
-    bid_amount: float
+    def store(self, auction_id: str, body: str, item_ids: list):
+        self._entries.set(auction_id, body)
+        for item_id in item_ids:
+            self._item_auctions[item_id] = auction_id
 
-class BuyNowRequest(BaseModel):
-    """Request model for buy now purchase"""
-    buyer_email: str
-    buyer_name: str
+    def invalidate(self, auction_id: str = None, item_ids=None):
+        if auction_id:
+            self._entries.delete(auction_id)
+        for item_id in item_ids or []:
+            cached_auction = self._item_auctions.pop(item_id, None)
+            if cached_auction:
+                self._entries.delete(cached_auction)
 
-@app.post("/comps/batch")
-async def create_comps_batch(request: BatchCompsRequest):
+
+analytics_cache = AuctionAnalyticsCache(ANALYTICS_CACHE_MAX_ENTRIES, ANALYTICS_CACHE_TTL_SECONDS)
+
+
+def invalidate_auction_caches(auction_id: str = None, item_ids=None):
+    """Drop cached public pages and analytics after auction, item, image or comp edits"""
+    public_auction_cache.invalidate(auction_id=auction_id, item_ids=item_ids)
+    analytics_cache.invalidate(auction_id=auction_id, item_ids=item_ids)
+
+
+def column(rows: list, key: str) -> np.ndarray:
+    """Float column from a list of dicts (missing/null -> NaN)"""
+    return np.array([np.nan if row.get(key) is None else row[key] for row in rows], dtype=float)
+
+
+def group_quantile(sorted_values: np.ndarray, starts: np.ndarray, counts: np.ndarray, q: float) -> np.ndarray:
+    """Per-group q-quantile (linear interpolation) of values sorted by (group, value); NaN for empty groups"""
+    if sorted_values.size == 0:
+        return np.full(counts.shape, np.nan)
+    pos = starts + q * np.maximum(counts - 1, 0)
+    lo = np.minimum(np.floor(pos).astype(np.intp), sorted_values.size - 1)
+    hi = np.minimum(np.ceil(pos).astype(np.intp), sorted_values.size - 1)
+    result = sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (pos - np.floor(pos))
+    return np.where(counts > 0, result, np.nan)
+
+
+def group_mean(groups: np.ndarray, values: np.ndarray, weights: np.ndarray, size: int) -> np.ndarray:
+    """Weighted mean of values per group; NaN where a group has no weight"""
+    totals = np.bincount(groups, weights=values * weights, minlength=size)
+    weight_sums = np.bincount(groups, weights=weights, minlength=size)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(weight_sums > 0, totals / weight_sums, np.nan)
+
+
+def to_json_values(array: np.ndarray, decimals: int = 2) -> list:
+    """Rounded floats with NaN -> None"""
+    values = np.round(array, decimals).astype(object)
+    values[np.isnan(array)] = None
+    return values.tolist()
+
+
+def compute_auction_analytics(items: list, comps: list, bids: list, orders: list, now: datetime) -> dict:
+    """
+    Per-item and auction-level pricing stats. Rows are loaded into columnar
+    arrays once and every statistic is computed per item with grouped
+    NumPy operations (bincount / ufunc.at over item indexes), not Python loops.
     """
-    Process comps for multiple items in parallel using agents with WebSearchTool.
-    Returns immediately with all results (not a background job).
+    n = len(items)
+    index = {item["item_id"]: i for i, item in enumerate(items)}
+    today = np.datetime64(now.date(), "D")
+    now_s = np.datetime64(now.replace(tzinfo=None), "s")
     
-    Request body:
-    {
-        "items": [
-            {"item_id": "abc", "brand": "Rolex", "model": "Submariner", "year": "2020", "notes": ""},
-            {"item_id": "def", "brand": "Omega", "model": "Speedmaster", "year": "2019", "notes": ""}
-        ]
+    # comps: median, IQR-trimmed mean and recency-weighted price per item
+    comps = [c for c in comps if c.get("sold_price") and c["item_id"] in index]
+    comp_item = np.array([index[c["item_id"]] for c in comps], dtype=np.intp)
+    comp_price = column(comps, "sold_price")
+    comp_date = np.array([str(c.get("sold_at") or "NaT")[:10] for c in comps], dtype="datetime64[D]")
+    
+    comp_count = np.bincount(comp_item, minlength=n)
+    order = np.lexsort((comp_price, comp_item))
+    sorted_item, sorted_price = comp_item[order], comp_price[order]
+    starts = np.concatenate(([0], np.cumsum(comp_count)[:-1]))
+    comp_median = group_quantile(sorted_price, starts, comp_count, 0.5)
+    q1 = group_quantile(sorted_price, starts, comp_count, 0.25)
+    q3 = group_quantile(sorted_price, starts, comp_count, 0.75)
+    fence = 1.5 * (q3 - q1)
+    inside = (sorted_price >= (q1 - fence)[sorted_item]) & (sorted_price <= (q3 + fence)[sorted_item])
+    comp_trimmed = group_mean(sorted_item, sorted_price, inside.astype(float), n)
+    
+    age_days = np.where(np.isnat(comp_date), PRICING_RECENCY_HALF_LIFE_DAYS, (today - comp_date) / np.timedelta64(1, "D"))
+    recency_weight = 0.5 ** (np.maximum(age_days, 0) / PRICING_RECENCY_HALF_LIFE_DAYS)
+    comp_recency = group_mean(comp_item, comp_price, recency_weight, n)
+    
+    # bids: count, high bid and velocity per item
+    bids = [b for b in bids if b["item_id"] in index]
+    bid_item = np.array([index[b["item_id"]] for b in bids], dtype=np.intp)
+    bid_amount = column(bids, "amount")
+    # timestamptz comes back in UTC; the seconds-resolution prefix parses without the offset
+    bid_time = np.array([str(b.get("created_at") or "NaT")[:19] for b in bids], dtype="datetime64[s]")
+    
+    bid_count = np.bincount(bid_item, minlength=n)
+    high_bid = np.full(n, np.nan)
+    np.fmax.at(high_bid, bid_item, bid_amount)
+    first_bid = np.full(n, now_s)
+    np.minimum.at(first_bid, bid_item, bid_time)
+    hours_open = np.maximum((now_s - first_bid) / np.timedelta64(1, "h"), 1 / 60)
+    bid_velocity = np.where(bid_count > 0, bid_count / hours_open, 0.0)
+    
+    # sales and pricing
+    sale_price = np.full(n, np.nan)
+    orders = [o for o in orders if o["item_id"] in index]
+    sale_price[np.array([index[o["item_id"]] for o in orders], dtype=np.intp)] = column(orders, "amount")
+    is_sold = np.array([bool(item.get("is_sold")) for item in items], dtype=bool) | ~np.isnan(sale_price)
+    is_listed = np.array([bool(item.get("is_listed")) for item in items], dtype=bool)
+    
+    current_price = np.fmax(high_bid, sale_price)
+    start_price = np.fmax(column(items, "starting_bid"), 0)
+    start_price = np.where(np.isnan(start_price) | (start_price == 0), column(items, "suggested_starting_price"), start_price)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        spread = current_price - start_price
+        spread_pct = np.where(start_price > 0, spread / start_price * 100, np.nan)
+    estimated_hammer = np.where(is_sold, current_price, np.fmax(current_price, comp_median))
+    
+    # sell-through over listed items (or every item while nothing is listed yet)
+    pool = is_listed if is_listed.any() else np.ones(n, dtype=bool)
+    pool_size = int(pool.sum())
+    sold_count = int((is_sold & pool).sum())
+    active_count = int((~is_sold & (bid_count > 0) & pool).sum())
+    
+    first_any = first_bid[bid_count > 0].min() if bid_count.any() else now_s
+    total_hours = max(float((now_s - first_any) / np.timedelta64(1, "h")), 1 / 60)
+    
+    per_item = {
+        "comp_count": comp_count.tolist(),
+        "comp_median": to_json_values(comp_median),
+        "comp_trimmed_mean": to_json_values(comp_trimmed),
+        "comp_recency_weighted": to_json_values(comp_recency),
+        "bid_count": bid_count.tolist(),
+        "current_price": to_json_values(current_price),
+        "bid_velocity_per_hour": to_json_values(bid_velocity, 3),
+        "start_price": to_json_values(start_price),
+        "spread": to_json_values(spread),
+        "spread_pct": to_json_values(spread_pct, 1),
+        "estimated_hammer": to_json_values(estimated_hammer),
+        "is_sold": is_sold.tolist(),
+    }
+    item_rows = [
+        {"item_id": item["item_id"], "title": item.get("title"), **{key: values[i] for key, values in per_item.items()}}
+        for i, item in enumerate(items)
+    ]
+    
+    return {
+        "summary": {
+            "item_count": n,
+            "items_with_comps": int((comp_count > 0).sum()),
+            "items_with_bids": int((bid_count > 0).sum()),
+            "total_bids": int(bid_count.sum()),
+            "estimated_total_hammer": round(float(np.nansum(estimated_hammer)), 2),
+            "current_total": round(float(np.nansum(current_price)), 2),
+            "median_spread_pct": to_json_values(np.array([np.nanmedian(spread_pct) if (~np.isnan(spread_pct)).any() else np.nan]), 1)[0],
+            "bid_velocity_per_hour": round(int(bid_count.sum()) / total_hours, 3),
+            "sell_through_pct": round(sold_count / pool_size * 100, 1) if pool_size else None,
+            "projected_sell_through_pct": round((sold_count + active_count) / pool_size * 100, 1) if pool_size else None,
+        },
+        "items": item_rows
     }
+
+
+# GET pricing analytics for an auction
+@app.get("/auctions/{auction_id}/analytics")
+async def get_auction_analytics(auction_id: str):
+    """
+    Auction-level pricing insight: per-item comp median, IQR-trimmed mean,
+    recency-weighted price, bid velocity, spread between starting price and
+    current bid, estimated hammer value, plus totals and sell-through.
+    Cached until the next bid, sale or comp write for the auction.
     """
+    cached = analytics_cache.get(auction_id)
+    if cached is not None:
+        return Response(content=cached, media_type="application/json")
+    
+    auction = await supabase.table("auctions").select("auction_id").eq("auction_id", auction_id).execute()
+    if not auction.data:
+        raise HTTPException(404, "Auction not found")
+    
     try:
-        if not request.items or len(request.items) == 0:
-            raise HTTPException(400, "Items list cannot be empty")
-        
-        if len(request.items) > 100:
-            raise HTTPException(400, "Batch size cannot exceed 100 items for parallel processing")
-        
-        # validate openai key
-        if not OPENAI_COMPS_KEY:
-            raise HTTPException(500, "OpenAI Comps API key not configured")
-        
-        # set openai api key for agents
-        os.environ["OPENAI_API_KEY"] = OPENAI_COMPS_KEY
-        
-        # create function to process single item
-        async def process_single_item(item_data):
-            item_id = item_data.get("item_id")
-            brand = item_data.get("brand", "Unknown")
-            model = item_data.get("model", "Unknown")
-            year = item_data.get("year", "Unknown")
-            notes = item_data.get("notes", "")
-            
-            try:
-                # use same agent logic as single comps endpoint
-                comps_request = CompsRequest(
-                    item_id=item_id,
-                    brand=brand,
-                    model=model,
-                    year=year,
-                    notes=notes
-                )
-                
-                # call single comps generation function
-                result = await generate_comps_simple(comps_request)
-                
-                return {
-                    "item_id": item_id,
-                    "success": True,
-                    "comps": result["comps"]
-                }
-                
-            except Exception as e:
-                return {
-                    "item_id": item_id,
-                    "success": False,
-                    "error": str(e)
-                }
-        
-        # process all items in parallel
-        tasks = [process_single_item(item) for item in request.items]
-        results = await asyncio.gather(*tasks, return_exceptions=True)
-        
-        # count successes and failures
-        successful = sum(1 for r in results if isinstance(r, dict) and r.get("success"))
-        failed = len(results) - successful
-        
-        return {
-            "batch_id": f"sync-{int(time.time())}",  # Generate a simple ID for tracking
-            "status": "completed",
-            "total_items": len(results),
-            "successful": successful,
-            "failed": failed,
-            "results": results,
-            "message": f"Batch processing complete. {successful}/{len(results)} items processed successfully."
-        }
-        
-    except HTTPException:
-        raise
+        items = await select_in("items", "auction_id", [auction_id], order=[("created_at", False)])
+        item_ids = [item["item_id"] for item in items]
+        comps, bids, orders = await asyncio.gather(
+            select_in("comps", "item_id", item_ids, columns="item_id, sold_price, sold_at"),
+            select_in("bids", "item_id", item_ids, columns="item_id, amount, created_at"),
+            select_in("orders", "auction_id", [auction_id], columns="item_id, amount"),
+        )
     except Exception as e:
-        import traceback
-        error_detail = traceback.format_exc()
-        raise HTTPException(500, f"Failed to process batch: {str(e)}")
+        raise HTTPException(500, f"Failed to load analytics data: {str(e)}")
+    
+    analytics = {
+        "auction_id": auction_id,
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        **compute_auction_analytics(items, comps, bids, orders, datetime.now(timezone.utc)),
+    }
+    analytics_cache.store(auction_id, json.dumps({**analytics, "cached": True}), item_ids)
+    return Response(content=json.dumps({**analytics, "cached": False}), media_type="application/json")
 
 
 # ============================================
@@ -1214,10 +4014,10 @@ async def create_comps_batch(request: BatchCompsRequest):
 
 # UPDATE auction settings (start/end time, location, shipping)
 @app.put("/auctions/{auction_id}/settings")
-def update_auction_settings(auction_id: str, settings: AuctionSettingsUpdate):
+async def update_auction_settings(auction_id: str, settings: AuctionSettingsUpdate):
     """Update auction settings including start/end time and pickup/shipping options"""
     # Check auction exists
-    auction = supabase.table("auctions").select("*").eq("auction_id", auction_id).execute()
+    auction = await supabase.table("auctions").select("*").eq("auction_id", auction_id).execute()
     if not auction.data:
         raise HTTPException(404, "Auction not found")
     
@@ -1239,18 +4039,25 @@ def update_auction_settings(auction_id: str, settings: AuctionSettingsUpdate):
     if not updates:
         raise HTTPException(400, "No settings to update")
     
-    res = supabase.table("auctions").update(updates).eq("auction_id", auction_id).execute()
+    res = await supabase.table("auctions").update(updates).eq("auction_id", auction_id).execute()
     if not res.data:
         raise HTTPException(500, "Failed to update auction settings")
+    invalidate_auction_caches(auction_id=auction_id)
     
-    return res.data[0]
+    updated = res.data[0]
+    if updated.get("status") == "published" and updated.get("end_time"):
+        auction_closer.schedule(auction_id, updated["end_time"])
+    else:
+        auction_closer.unschedule(auction_id)
+    
+    return updated
 
 
 # PUBLISH auction (set status to published)
 @app.post("/auctions/{auction_id}/publish")
-def publish_auction(auction_id: str):
+async def publish_auction(auction_id: str):
     """Publish an auction - makes it visible to public"""
-    auction = supabase.table("auctions").select("*").eq("auction_id", auction_id).execute()
+    auction = await supabase.table("auctions").select("*").eq("auction_id", auction_id).execute()
     if not auction.data:
         raise HTTPException(404, "Auction not found")
     
@@ -1259,33 +4066,38 @@ def publish_auction(auction_id: str):
     if not auction_data.get("start_time") or not auction_data.get("end_time"):
         raise HTTPException(400, "Auction must have start and end times before publishing")
     
-    res = supabase.table("auctions").update({"status": "published"}).eq("auction_id", auction_id).execute()
+    res = await supabase.table("auctions").update({"status": "published"}).eq("auction_id", auction_id).execute()
     if not res.data:
         raise HTTPException(500, "Failed to publish auction")
+    invalidate_auction_caches(auction_id=auction_id)
+    auction_closer.schedule(auction_id, res.data[0]["end_time"])
     
     return {"message": "Auction published successfully", "auction": res.data[0]}
 
 
 # CLOSE auction (set status to closed)
 @app.post("/auctions/{auction_id}/close")
-def close_auction(auction_id: str):
-    """Close an auction - no more bids accepted"""
-    auction = supabase.table("auctions").select("*").eq("auction_id", auction_id).execute()
+async def close_auction(auction_id: str):
+    """
+    Close an auction now - no more bids accepted.
+    Settles it the same way as the scheduled close at end_time:
+    each unsold item's highest bid becomes an order.
+    """
+    auction = await supabase.table("auctions").select("*").eq("auction_id", auction_id).execute()
     if not auction.data:
         raise HTTPException(404, "Auction not found")
     
-    res = supabase.table("auctions").update({"status": "closed"}).eq("auction_id", auction_id).execute()
-    if not res.data:
-        raise HTTPException(500, "Failed to close auction")
+    outcome = await settle_auction(auction_id)
+    if outcome is None:
+        # already closed (possibly by the scheduler a moment ago)
+        return {"message": "Auction closed successfully", "auction": auction.data[0], "orders": []}
     
-    return {"message": "Auction closed successfully", "auction": res.data[0]}
+    return {"message": "Auction closed successfully", **outcome}
 
 
-# GET public auction details (for public viewing)
-@app.get("/auctions/{auction_id}/public")
-def get_public_auction(auction_id: str):
-    """Get auction details for public viewing - includes items with bids"""
-    auction = supabase.table("auctions").select("*").eq("auction_id", auction_id).execute()
+async def load_public_catalog(auction_id: str) -> dict:
+    """Read the auction, its visible items and their images into the cache"""
+    auction = await supabase.table("auctions").select("*").eq("auction_id", auction_id).execute()
     if not auction.data:
         raise HTTPException(404, "Auction not found")
     
@@ -1295,70 +4107,80 @@ def get_public_auction(auction_id: str):
     # For draft auctions, show all items (for preview) but mark as preview
     # For published/closed auctions, only show is_listed=true items
     if auction_data.get("status") in ["published", "closed"]:
-        items = supabase.table("items").select("*").eq("auction_id", auction_id).eq("is_listed", True).order("created_at", desc=False).execute()
+        items = await supabase.table("items").select("*").eq("auction_id", auction_id).eq("is_listed", True).order("created_at", desc=False).execute()
     else:
         # For draft/preview, show all items so seller can preview
-        items = supabase.table("items").select("*").eq("auction_id", auction_id).order("created_at", desc=False).execute()
+        items = await supabase.table("items").select("*").eq("auction_id", auction_id).order("created_at", desc=False).execute()
     
     items_data = items.data if items.data else []
     
     # Get images for all items
     if items_data:
         item_ids = [item["item_id"] for item in items_data]
-        images = supabase.table("item_images").select("*").in_("item_id", item_ids).execute()
-        images_data = images.data if images.data else []
+        images_data = await select_in("item_images", "item_id", item_ids)
         
         # Group images by item_id
         images_by_item = {}
         for img in images_data:
-            iid = img["item_id"]
-            if iid not in images_by_item:
-                images_by_item[iid] = []
-            images_by_item[iid].append(img)
-        
-        # Batch fetch all bids for all items (instead of N+1 queries)
-        all_bids = supabase.table("bids").select("*").in_("item_id", item_ids).order("amount", desc=True).execute()
-        all_bids_data = all_bids.data if all_bids.data else []
-        
-        # Group bids by item_id and calculate highest bid + count
-        bids_by_item = {}
-        bid_counts = {}
-        for bid in all_bids_data:
-            iid = bid["item_id"]
-            if iid not in bids_by_item:
-                bids_by_item[iid] = bid  # First bid is highest (ordered desc)
-                bid_counts[iid] = 0
-            bid_counts[iid] += 1
+            images_by_item.setdefault(img["item_id"], []).append(img)
         
-        # Assign images and bid info to each item
         for item in items_data:
             item["images"] = images_by_item.get(item["item_id"], [])
-            
-            highest_bid = bids_by_item.get(item["item_id"])
-            if highest_bid:
-                item["current_bid"] = highest_bid["amount"]
-                item["bid_count"] = bid_counts.get(item["item_id"], 0)
-            else:
-                item["current_bid"] = item.get("starting_bid", 0) or 0
-                item["bid_count"] = 0
     
-    return {
-        "auction": auction_data,
-        "items": items_data
-    }
+    public_auction_cache.store_catalog(auction_id, auction_data, items_data)
+    return public_auction_cache.catalog(auction_id)
+
+
+async def load_public_bids(entry: dict):
+    """Refresh the bid overlay (highest bid + count per item) from the DB"""
+    item_ids = [item["item_id"] for item in entry["items"]]
+    overlay = {}
+    if item_ids:
+        # Batch fetch all bids for all items (instead of N+1 queries)
+        all_bids = await select_in("bids", "item_id", item_ids, columns="item_id, amount")
+        for bid in all_bids:
+            hot = overlay.setdefault(bid["item_id"], {"current_bid": bid["amount"], "bid_count": 0})
+            hot["current_bid"] = max(hot["current_bid"], bid["amount"])
+            hot["bid_count"] += 1
+    public_auction_cache.store_bids(entry, overlay)
+
+
+# GET public auction details (for public viewing)
+@app.get("/auctions/{auction_id}/public")
+async def get_public_auction(auction_id: str, request: Request):
+    """
+    Get auction details for public viewing - includes items with bids.
+    Served from PublicAuctionCache; send If-None-Match with the last ETag
+    to get a 304 when nothing changed.
+    """
+    entry = public_auction_cache.catalog(auction_id)
+    record_cache_lookup("public_catalog", entry is not None)
+    if entry is None:
+        entry = await public_auction_cache.coalesce((auction_id, "catalog"), lambda: load_public_catalog(auction_id))
+    bids_fresh = public_auction_cache.bids_fresh(entry)
+    record_cache_lookup("public_bids", bids_fresh)
+    if not bids_fresh:
+        await public_auction_cache.coalesce((auction_id, "bids"), lambda: load_public_bids(entry))
+    
+    etag = public_auction_cache.etag(entry)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    
+    return Response(content=public_auction_cache.body(entry), media_type="application/json", headers=headers)
 
 
 # GET all public auctions (published only)
 @app.get("/auctions/public")
-def list_public_auctions():
+async def list_public_auctions():
     """List all published auctions for public browsing"""
-    auctions = supabase.table("auctions").select("*").eq("status", "published").order("created_at", desc=True).execute()
+    auctions = await supabase.table("auctions").select("*").eq("status", "published").order("created_at", desc=True).execute()
     return {"auctions": auctions.data if auctions.data else []}
 
 
 # BATCH update item auction settings (must be before /items/{item_id}/auction-settings to avoid route conflict)
 @app.put("/items/batch/auction-settings")
-def batch_update_item_auction_settings(settings: BatchItemAuctionSettings):
+async def batch_update_item_auction_settings(settings: BatchItemAuctionSettings):
     """Batch update auction settings for multiple items"""
     if not settings.item_ids:
         raise HTTPException(400, "No items specified")
@@ -1377,8 +4199,13 @@ def batch_update_item_auction_settings(settings: BatchItemAuctionSettings):
         raise HTTPException(400, "No settings to update")
     
     # Update all items in a single query using .in_() filter
-    res = supabase.table("items").update(updates).in_("item_id", settings.item_ids).execute()
+    res = await supabase.table("items").update(updates).in_("item_id", settings.item_ids).execute()
     updated_items = res.data if res.data else []
+    bid_ledger.invalidate(item_ids=settings.item_ids)
+    # listing changes can add items the cached catalog never saw, so drop whole auctions
+    for auction_id in {it.get("auction_id") for it in updated_items}:
+        invalidate_auction_caches(auction_id=auction_id)
+    invalidate_auction_caches(item_ids=settings.item_ids)
     
     return {
         "message": f"Updated {len(updated_items)} items",
@@ -1388,9 +4215,9 @@ def batch_update_item_auction_settings(settings: BatchItemAuctionSettings):
 
 # UPDATE item auction settings
 @app.put("/items/{item_id}/auction-settings")
-def update_item_auction_settings(item_id: str, settings: ItemAuctionSettings):
+async def update_item_auction_settings(item_id: str, settings: ItemAuctionSettings):
     """Update auction-specific settings for an item"""
-    item = supabase.table("items").select("item_id").eq("item_id", item_id).execute()
+    item = await supabase.table("items").select("item_id").eq("item_id", item_id).execute()
     if not item.data:
         raise HTTPException(404, "Item not found")
     
@@ -1409,152 +4236,273 @@ def update_item_auction_settings(item_id: str, settings: ItemAuctionSettings):
     if not updates:
         raise HTTPException(400, "No settings to update")
     
-    res = supabase.table("items").update(updates).eq("item_id", item_id).execute()
+    res = await supabase.table("items").update(updates).eq("item_id", item_id).execute()
     if not res.data:
         raise HTTPException(500, "Failed to update item auction settings")
+    bid_ledger.invalidate(item_ids=[item_id])
+    invalidate_auction_caches(auction_id=res.data[0].get("auction_id"), item_ids=[item_id])
     
     return res.data[0]
 
 
 # PLACE a bid on an item
 @app.post("/items/{item_id}/bid")
-def place_bid(item_id: str, bid: BidRequest):
-    """Place a bid on an item"""
-    # Get item and verify it exists
-    item = supabase.table("items").select("*, auctions(*)").eq("item_id", item_id).execute()
-    if not item.data:
-        raise HTTPException(404, "Item not found")
-    
-    item_data = item.data[0]
-    auction_data = item_data.get("auctions", {})
-    
-    # Check auction is published
-    if auction_data.get("status") != "published":
-        raise HTTPException(400, "Auction is not active")
-    
-    # Check auction hasn't ended
-    from datetime import datetime
-    end_time = auction_data.get("end_time")
-    if end_time:
-        try:
-            end_dt = datetime.fromisoformat(end_time.replace('Z', '+00:00'))
-            if datetime.now(end_dt.tzinfo) > end_dt:
-                raise HTTPException(400, "Auction has ended")
-        except ValueError:
-            pass
-    
-    # Check item isn't sold
-    if item_data.get("is_sold"):
-        raise HTTPException(400, "Item has already been sold")
-    
-    # Get current highest bid
-    current_bids = supabase.table("bids").select("*").eq("item_id", item_id).order("amount", desc=True).limit(1).execute()
-    
-    starting_bid = item_data.get("starting_bid", 0) or 0
-    min_increment = item_data.get("min_increment", 1) or 1
-    
-    # If there are existing bids, new bid must be higher than current + increment
-    # If no bids yet, allow bidding at exactly the starting bid
-    if current_bids.data:
-        current_highest = current_bids.data[0]["amount"]
-        min_required = current_highest + min_increment
-    else:
-        # No bids yet - allow the starting bid amount
-        min_required = starting_bid
-    
-    if bid.bid_amount < min_required:
-        raise HTTPException(400, f"Bid must be at least ${min_required:.2f}")
-    
+async def place_bid(item_id: str, bid: BidRequest, idempotency_key: Optional[str] = Header(None)):
+    """
+    Place a bid on an item.
+    Validation and insert happen in one place_bid_atomic call (see sql/place_bid_atomic.sql),
+    so concurrent bids can't both pass the minimum check.
+    Send an Idempotency-Key header to make retries safe.
+    """
+    if idempotency_key:
+        return await idempotent_response(f"bid:{item_id}", idempotency_key, bid.model_dump(), lambda: submit_bid(item_id, bid))
+    return await submit_bid(item_id, bid)
+
+
+async def submit_bid(item_id: str, bid: BidRequest) -> dict:
+    """
+    Validate and record one bid (place_bid without the idempotency layer).
+    One place_bid_atomic call; without the function installed, a conditional
+    current_bid update does the check-and-raise instead.
+    """
     # Generate a UUID for guest bidders based on their email (consistent per email)
-    import hashlib
     # Create a deterministic UUID from email so same bidder gets same ID
     email_hash = hashlib.md5(bid.bidder_email.lower().encode()).hexdigest()
     guest_bidder_id = f"{email_hash[:8]}-{email_hash[8:12]}-{email_hash[12:16]}-{email_hash[16:20]}-{email_hash[20:32]}"
     
-    # Insert bid
-    bid_result = supabase.table("bids").insert({
-        "item_id": item_id,
-        "bidder_id": guest_bidder_id,
-        "bidder_email": bid.bidder_email,
-        "bidder_name": bid.bidder_name,
-        "amount": bid.bid_amount
-    }).execute()
+    # One bid per item at a time in this process
+    async with bid_ledger.lock(item_id):
+        # Reject bids below the known floor without a round trip
+        min_required = bid_ledger.min_required(item_id)
+        if min_required is not None and bid.bid_amount < min_required:
+            raise HTTPException(400, f"Bid must be at least ${min_required:.2f}")
+        
+        params = {
+            "p_item_id": item_id,
+            "p_bidder_id": guest_bidder_id,
+            "p_bidder_email": bid.bidder_email,
+            "p_bidder_name": bid.bidder_name,
+            "p_amount": bid.bid_amount
+        }
+        try:
+            result = await supabase.rpc("place_bid_atomic", params).execute()
+            outcome = result.data
+        except Exception as e:
+            if not is_missing_function(e):
+                raise
+            outcome = await place_bid_conditional(params)
+        
+        if not outcome:
+            raise HTTPException(500, "Failed to place bid")
+        
+        bid_ledger.record(item_id, outcome)
+    
+    if not outcome.get("accepted"):
+        error = outcome.get("error")
+        if error == "too_low":
+            raise HTTPException(400, f"Bid must be at least ${outcome['min_required']:.2f}")
+        status, message = BID_REJECTIONS.get(error, (500, "Failed to place bid"))
+        raise HTTPException(status, message)
     
-    if not bid_result.data:
-        raise HTTPException(500, "Failed to place bid")
+    public_auction_cache.record_bid(outcome["auction_id"], item_id, bid.bid_amount)
+    analytics_cache.invalidate(auction_id=outcome["auction_id"])
     
-    # Update item's current_bid
-    supabase.table("items").update({"current_bid": bid.bid_amount}).eq("item_id", item_id).execute()
+    # Push the new bid to live bid streams
+    bid_broker.publish(outcome["auction_id"], {"type": "bid", "item_id": item_id, "bid": outcome["bid"]})
+    
+    if AUCTION_SOFT_CLOSE_SECONDS > 0:
+        await extend_auction_end(outcome["auction_id"])
     
     return {
         "message": "Bid placed successfully",
-        "bid": bid_result.data[0],
+        "bid": outcome["bid"],
         "current_highest": bid.bid_amount
     }
 
 
-# BUY NOW - purchase item immediately
-@app.post("/items/{item_id}/buy-now")
-def buy_now(item_id: str, purchase: BuyNowRequest):
-    """Purchase an item at buy now price"""
-    from datetime import datetime, timezone
-    
-    # Get item
-    item = supabase.table("items").select("*, auctions(*)").eq("item_id", item_id).execute()
+async def place_bid_conditional(params: dict) -> dict:
+    """
+    place_bid_atomic without the DB function: raise items.current_bid with an
+    update that only matches while the bid still clears the floor, then record
+    the bid. Same result shape as the function.
+    """
+    item_id = params["p_item_id"]
+    amount = params["p_amount"]
+    item = await supabase.table("items").select("auction_id, starting_bid, min_increment, current_bid, is_sold, auctions(status, end_time)").eq("item_id", item_id).execute()
     if not item.data:
-        raise HTTPException(404, "Item not found")
+        return {"accepted": False, "error": "not_found"}
     
     item_data = item.data[0]
-    auction_data = item_data.get("auctions", {})
-    
-    # Check auction is published
+    auction_data = item_data.get("auctions") or {}
     if auction_data.get("status") != "published":
-        raise HTTPException(400, "Auction is not active")
-    
-    # Check item isn't already sold
+        return {"accepted": False, "error": "not_active"}
+    if auction_data.get("end_time") and parse_timestamp(auction_data["end_time"]) <= datetime.now(timezone.utc):
+        return {"accepted": False, "error": "ended"}
     if item_data.get("is_sold"):
-        raise HTTPException(400, "Item has already been sold")
+        return {"accepted": False, "error": "sold"}
     
-    # Check buy now price exists
-    buy_now_price = item_data.get("buy_now_price")
-    if not buy_now_price:
-        raise HTTPException(400, "Buy now not available for this item")
+    # same rules as the function: first bid may equal starting_bid, later bids need highest + increment
+    highest = await supabase.table("bids").select("amount").eq("item_id", item_id).order("amount", desc=True).limit(1).execute()
+    current_highest = highest.data[0]["amount"] if highest.data else None
+    floor = {
+        "auction_id": item_data["auction_id"],
+        "current_highest": current_highest,
+        "starting_bid": item_data.get("starting_bid") or 0,
+        "min_increment": item_data.get("min_increment") or 1,
+    }
+    min_required = floor["starting_bid"] if current_highest is None else current_highest + floor["min_increment"]
+    if amount < min_required:
+        return {"accepted": False, "error": "too_low", "min_required": min_required, **floor}
     
-    # Create order (note: buyer_id is required, we'll generate a placeholder UUID)
-    order_result = supabase.table("orders").insert({
-        "item_id": item_id,
-        "auction_id": item_data.get("auction_id"),
-        "buyer_id": "00000000-0000-0000-0000-000000000000",  # Placeholder for guest buyers
-        "buyer_email": purchase.buyer_email,
-        "buyer_name": purchase.buyer_name,
-        "amount": buy_now_price,
-        "order_type": "buy_now"
-    }).execute()
+    # claim: only matches while no other worker has raised current_bid past this bid's floor
+    ceiling = round(amount - floor["min_increment"], 6)
+    claimed = await supabase.table("items").update({"current_bid": amount}).eq("item_id", item_id).or_(f"current_bid.is.null,current_bid.lte.{ceiling}").execute()
+    if not claimed.data:
+        latest = await supabase.table("items").select("current_bid").eq("item_id", item_id).execute()
+        current_highest = latest.data[0]["current_bid"] if latest.data else None
+        return {"accepted": False, "error": "too_low", "min_required": (current_highest or 0) + floor["min_increment"], **floor, "current_highest": current_highest}
+    
+    try:
+        bid_row = await supabase.table("bids").insert({
+            "item_id": item_id,
+            "bidder_id": params["p_bidder_id"],
+            "bidder_email": params["p_bidder_email"],
+            "bidder_name": params["p_bidder_name"],
+            "amount": amount
+        }).execute()
+        if not bid_row.data:
+            raise HTTPException(500, "Failed to place bid")
+    except Exception:
+        # put current_bid back unless a later bid has already moved it
+        await supabase.table("items").update({"current_bid": item_data.get("current_bid")}).eq("item_id", item_id).eq("current_bid", amount).execute()
+        raise
+    
+    return {"accepted": True, "bid": bid_row.data[0], **floor, "current_highest": amount}
+
+
+# BUY NOW - purchase item immediately
+@app.post("/items/{item_id}/buy-now")
+async def buy_now(item_id: str, purchase: BuyNowRequest, idempotency_key: Optional[str] = Header(None)):
+    """Purchase an item at buy now price. Send an Idempotency-Key header to make retries safe."""
+    if idempotency_key:
+        return await idempotent_response(f"buy-now:{item_id}", idempotency_key, purchase.model_dump(), lambda: submit_buy_now(item_id, purchase))
+    return await submit_buy_now(item_id, purchase)
+
+
+async def submit_buy_now(item_id: str, purchase: BuyNowRequest) -> dict:
+    """
+    Sell an item at its buy now price (buy_now without the idempotency layer).
+    The sale is one buy_now_atomic call (see sql/buy_now_atomic.sql), so concurrent
+    buyers can't both get an order; without the function installed, a conditional
+    is_sold update claims the item instead. A retry by the buyer who already got
+    the item returns their existing order rather than 'sold'.
+    """
+    params = {
+        "p_item_id": item_id,
+        "p_buyer_id": GUEST_BUYER_ID,
+        "p_buyer_email": purchase.buyer_email,
+        "p_buyer_name": purchase.buyer_name
+    }
+    try:
+        result = await supabase.rpc("buy_now_atomic", params).execute()
+        outcome = result.data
+    except Exception as e:
+        if not is_missing_function(e):
+            raise
+        outcome = await buy_now_conditional(params)
     
-    if not order_result.data:
+    if not outcome:
         raise HTTPException(500, "Failed to create order")
+    if not outcome.get("accepted"):
+        status, message = BUY_NOW_REJECTIONS.get(outcome.get("error"), (500, "Failed to create order"))
+        raise HTTPException(status, message)
     
-    # Mark item as sold
-    supabase.table("items").update({
-        "is_sold": True,
-        "sold_at": datetime.now(timezone.utc).isoformat()
-    }).eq("item_id", item_id).execute()
+    auction_id = outcome["auction_id"]
+    order = outcome["order"]
+    if outcome.get("replayed"):
+        # the sale was already recorded and announced by the first attempt
+        return {"message": "Purchase successful", "order": order}
+    
+    # sold items take no more bids - drop the cached floor so a stale one can't accept any
+    bid_ledger.invalidate(item_ids=[item_id])
+    public_auction_cache.record_sale(auction_id, item_id)
+    analytics_cache.invalidate(auction_id=auction_id)
+    
+    # Push the sale to live bid streams
+    bid_broker.publish(auction_id, {"type": "sold", "item_id": item_id, "order": order})
     
     return {
         "message": "Purchase successful",
-        "order": order_result.data[0]
+        "order": order
     }
 
 
+async def buy_now_conditional(params: dict) -> dict:
+    """buy_now_atomic without the DB function: claim the item with an update that only matches while unsold"""
+    item_id = params["p_item_id"]
+    item = await supabase.table("items").select("auction_id, buy_now_price, is_sold, auctions(status, end_time)").eq("item_id", item_id).execute()
+    if not item.data:
+        return {"accepted": False, "error": "not_found"}
+    
+    item_data = item.data[0]
+    if item_data.get("is_sold"):
+        replay = await buy_now_replay(params, item_data["auction_id"])
+        if replay:
+            return replay
+    auction_data = item_data.get("auctions") or {}
+    if auction_data.get("status") != "published":
+        return {"accepted": False, "error": "not_active"}
+    if auction_data.get("end_time") and parse_timestamp(auction_data["end_time"]) <= datetime.now(timezone.utc):
+        return {"accepted": False, "error": "ended"}
+    if item_data.get("is_sold"):
+        return {"accepted": False, "error": "sold"}
+    if not item_data.get("buy_now_price"):
+        return {"accepted": False, "error": "unavailable"}
+    
+    claimed = await supabase.table("items").update({
+        "is_sold": True,
+        "sold_at": datetime.now(timezone.utc).isoformat()
+    }).eq("item_id", item_id).or_("is_sold.is.null,is_sold.eq.false").execute()
+    if not claimed.data:
+        return await buy_now_replay(params, item_data["auction_id"]) or {"accepted": False, "error": "sold"}
+    
+    try:
+        order = await supabase.table("orders").insert({
+            "item_id": item_id,
+            "auction_id": item_data["auction_id"],
+            "buyer_id": params["p_buyer_id"],
+            "buyer_email": params["p_buyer_email"],
+            "buyer_name": params["p_buyer_name"],
+            "amount": item_data["buy_now_price"],
+            "order_type": "buy_now"
+        }).execute()
+        if not order.data:
+            raise HTTPException(500, "Failed to create order")
+    except Exception:
+        # release the claim so the item can still be bought
+        await supabase.table("items").update({"is_sold": False, "sold_at": None}).eq("item_id", item_id).execute()
+        raise
+    
+    return {"accepted": True, "order": order.data[0], "auction_id": item_data["auction_id"], "replayed": False}
+
+
+async def buy_now_replay(params: dict, auction_id: str) -> Optional[dict]:
+    """The buy now order this buyer already holds for the item, as an accepted outcome, or None"""
+    order = await supabase.table("orders").select("*").eq("item_id", params["p_item_id"]).eq("order_type", "buy_now").eq("buyer_email", params["p_buyer_email"]).limit(1).execute()
+    if not order.data:
+        return None
+    return {"accepted": True, "order": order.data[0], "auction_id": auction_id, "replayed": True}
+
+
 # GET bids for an item
 @app.get("/items/{item_id}/bids")
-def get_item_bids(item_id: str):
+async def get_item_bids(item_id: str):
     """Get all bids for an item"""
-    item = supabase.table("items").select("item_id").eq("item_id", item_id).execute()
+    item = await supabase.table("items").select("item_id").eq("item_id", item_id).execute()
     if not item.data:
         raise HTTPException(404, "Item not found")
     
-    bids = supabase.table("bids").select("*").eq("item_id", item_id).order("amount", desc=True).execute()
+    bids = await supabase.table("bids").select("*").eq("item_id", item_id).order("amount", desc=True).execute()
     
     return {
         "item_id": item_id,
@@ -1564,42 +4512,117 @@ def get_item_bids(item_id: str):
 
 # GET all bids for an auction (for seller bid tracking)
 @app.get("/auctions/{auction_id}/all-bids")
-def get_auction_bids(auction_id: str):
-    """Get all bids for all items in an auction - for seller to track bidding"""
+async def get_auction_bids(auction_id: str, limit_per_item: Optional[int] = None, since: Optional[str] = None):
+    """
+    Get all bids for all items in an auction - for seller to track bidding.
+    limit_per_item: only return the top N bids per item (bid_count/highest_bid still cover every bid)
+    since: only return bids created after this timestamp; pass back latest_bid_at to poll incrementally
+    (bid_count/highest_bid stay totals, so a delta can replace them as-is)
+    """
+    if limit_per_item is not None and limit_per_item < 1:
+        raise HTTPException(400, "limit_per_item must be at least 1")
+
     # Verify auction exists
-    auction = supabase.table("auctions").select("auction_id, auction_name, status").eq("auction_id", auction_id).execute()
+    auction = await supabase.table("auctions").select("auction_id, auction_name, status").eq("auction_id", auction_id).execute()
     if not auction.data:
         raise HTTPException(404, "Auction not found")
     
     # Get all items for this auction (use 'title' not 'name')
-    items = supabase.table("items").select("item_id, title, starting_bid, min_increment, is_sold, buy_now_price, is_listed").eq("auction_id", auction_id).execute()
+    items = await supabase.table("items").select("item_id, title, starting_bid, min_increment, is_sold, buy_now_price, is_listed").eq("auction_id", auction_id).execute()
     
     if not items.data:
-        return {"auction": auction.data[0], "items_with_bids": []}
+        return {"auction": auction.data[0], "items_with_bids": [], "latest_bid_at": since}
+    
+    # Fetch bids for every item in one batched query instead of one query per item
+    item_ids = [item["item_id"] for item in items.data]
+    all_bids = await select_in(
+        "bids", "item_id", item_ids,
+        order=[("amount", True), ("created_at", True)],
+        filters=(lambda q: q.gt("created_at", since)) if since else None
+    )
+    
+    # Group in a single pass - rows arrive highest first per item
+    bids_by_item = {}
+    latest_bid_at = since
+    for bid in all_bids:
+        bids_by_item.setdefault(bid["item_id"], []).append(bid)
+        created_at = bid.get("created_at")
+        if created_at and (latest_bid_at is None or created_at > latest_bid_at):
+            latest_bid_at = created_at
+    
+    # bid_count / highest_bid cover every bid, not just the ones after since
+    totals = {}
+    counted_bids = all_bids
+    if since:
+        counted_bids = await select_in("bids", "item_id", item_ids, columns="item_id, amount")
+    for bid in counted_bids:
+        count, highest = totals.get(bid["item_id"], (0, None))
+        totals[bid["item_id"]] = (count + 1, bid["amount"] if highest is None else max(highest, bid["amount"]))
     
     items_with_bids = []
     for item in items.data:
-        # Get bids for this item
-        bids = supabase.table("bids").select("*").eq("item_id", item["item_id"]).order("amount", desc=True).execute()
+        item_bids = bids_by_item.get(item["item_id"], [])
+        bid_count, highest_bid = totals.get(item["item_id"], (0, None))
         items_with_bids.append({
             **item,
             "name": item.get("title", "Untitled"),  # Map title to name for frontend
-            "bids": bids.data if bids.data else [],
-            "bid_count": len(bids.data) if bids.data else 0,
-            "highest_bid": bids.data[0]["amount"] if bids.data else None
+            "bids": item_bids[:limit_per_item] if limit_per_item else item_bids,
+            "bid_count": bid_count,
+            "highest_bid": highest_bid
         })
     
     return {
         "auction": auction.data[0],
-        "items_with_bids": items_with_bids
+        "items_with_bids": items_with_bids,
+        "latest_bid_at": latest_bid_at
     }
 
 
+# STREAM bids for an auction (replaces polling /all-bids)
+@app.get("/auctions/{auction_id}/bids/stream")
+async def stream_auction_bids(auction_id: str, request: Request):
+    """
+    Server-Sent Events stream of bids for an auction.
+    Sends one 'snapshot' event (same shape as /all-bids), then only deltas:
+    'bid' (new bid on an item), 'sold' (buy now) and 'status' (auction closed).
+    """
+    # Subscribe before taking the snapshot so no bid slips in between;
+    # clients dedupe deltas already in the snapshot by bid_id
+    queue = bid_broker.subscribe(auction_id)
+    try:
+        snapshot = await get_auction_bids(auction_id)
+    except Exception:
+        bid_broker.unsubscribe(auction_id, queue)
+        raise
+
+    async def event_stream():
+        try:
+            yield format_sse("snapshot", snapshot)
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=BID_STREAM_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    # comment line keeps proxies from closing an idle stream
+                    yield ": keep-alive\n\n"
+                    continue
+                if event is None:
+                    break
+                yield format_sse(event["type"], event)
+        finally:
+            bid_broker.unsubscribe(auction_id, queue)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 # GET single order
 @app.get("/orders/{order_id}")
-def get_order(order_id: str):
+async def get_order(order_id: str):
     """Get order details"""
-    order = supabase.table("orders").select("*, items(*)").eq("order_id", order_id).execute()
+    order = await supabase.table("orders").select("*, items(*)").eq("order_id", order_id).execute()
     if not order.data:
         raise HTTPException(404, "Order not found")
     
@@ -1608,7 +4631,7 @@ def get_order(order_id: str):
 
 # GET orders for a user (by email)
 @app.get("/orders")
-def list_orders(buyer_email: str = None, auction_id: str = None):
+async def list_orders(buyer_email: str = None, auction_id: str = None):
     """List orders by buyer email or auction"""
     query = supabase.table("orders").select("*, items(*)")
     
@@ -1617,7 +4640,7 @@ def list_orders(buyer_email: str = None, auction_id: str = None):
     if auction_id:
         query = query.eq("auction_id", auction_id)
     
-    orders = query.order("created_at", desc=True).execute()
+    orders = await query.order("created_at", desc=True).execute()
     
     return {"orders": orders.data if orders.data else []}
 
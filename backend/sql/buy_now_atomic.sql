@@ -0,0 +1,71 @@
+-- buy_now_atomic: sell an item at its buy now price in one statement.
+-- The item row is locked FOR UPDATE (the same lock place_bid_atomic takes), so
+-- of any number of concurrent buyers exactly one gets an order; the rest see
+-- 'sold'. Marking the item sold in the same transaction closes out competing
+-- bids: place_bid_atomic rejects further bids and the auction close skips the
+-- item when picking winners. A retry by the buyer who already got the item
+-- (same buyer_email) returns their existing order with "replayed": true.
+--
+-- Returns jsonb:
+--   {"accepted": true, "order": {...}, "auction_id", "replayed"}
+--   {"accepted": false, "error": "not_found" | "not_active" | "ended" | "sold" | "unavailable"}
+create or replace function buy_now_atomic(
+    p_item_id uuid,
+    p_buyer_id uuid,
+    p_buyer_email text,
+    p_buyer_name text
+) returns jsonb
+language plpgsql
+as $$
+declare
+    v_item items%rowtype;
+    v_auction auctions%rowtype;
+    v_order orders%rowtype;
+begin
+    select * into v_item from items where item_id = p_item_id for update;
+    if not found then
+        return jsonb_build_object('accepted', false, 'error', 'not_found');
+    end if;
+
+    if coalesce(v_item.is_sold, false) then
+        select * into v_order from orders
+        where item_id = p_item_id and order_type = 'buy_now' and buyer_email = p_buyer_email
+        limit 1;
+        if found then
+            return jsonb_build_object(
+                'accepted', true,
+                'order', to_jsonb(v_order),
+                'auction_id', v_item.auction_id,
+                'replayed', true
+            );
+        end if;
+    end if;
+
+    select * into v_auction from auctions where auction_id = v_item.auction_id;
+    if v_auction.status is distinct from 'published' then
+        return jsonb_build_object('accepted', false, 'error', 'not_active');
+    end if;
+    if v_auction.end_time is not null and now() > v_auction.end_time then
+        return jsonb_build_object('accepted', false, 'error', 'ended');
+    end if;
+    if coalesce(v_item.is_sold, false) then
+        return jsonb_build_object('accepted', false, 'error', 'sold');
+    end if;
+    if coalesce(v_item.buy_now_price, 0) <= 0 then
+        return jsonb_build_object('accepted', false, 'error', 'unavailable');
+    end if;
+
+    insert into orders (item_id, auction_id, buyer_id, buyer_email, buyer_name, amount, order_type)
+    values (p_item_id, v_item.auction_id, p_buyer_id, p_buyer_email, p_buyer_name, v_item.buy_now_price, 'buy_now')
+    returning * into v_order;
+
+    update items set is_sold = true, sold_at = now() where item_id = p_item_id;
+
+    return jsonb_build_object(
+        'accepted', true,
+        'order', to_jsonb(v_order),
+        'auction_id', v_item.auction_id,
+        'replayed', false
+    );
+end;
+$$;
@@ -0,0 +1,59 @@
+-- delete_auctions_cascade: delete auctions and everything under them in one transaction.
+-- Removes comps, item_images, bids and orders for the auctions' items, then the
+-- items and the auctions themselves. Either everything goes or nothing does.
+--
+-- Returns jsonb:
+--   {"auction_ids": [...deleted ids], "deleted": {"comps": n, "item_images": n, "bids": n,
+--    "orders": n, "items": n, "auctions": n}}
+create or replace function delete_auctions_cascade(
+    p_auction_ids uuid[]
+) returns jsonb
+language plpgsql
+as $$
+declare
+    v_item_ids uuid[];
+    v_deleted_ids jsonb;
+    v_comps integer;
+    v_images integer;
+    v_bids integer;
+    v_orders integer;
+    v_items integer;
+    v_auctions integer;
+begin
+    select coalesce(array_agg(item_id), '{}') into v_item_ids
+    from items where auction_id = any(p_auction_ids);
+
+    delete from comps where item_id = any(v_item_ids);
+    get diagnostics v_comps = row_count;
+
+    delete from item_images where item_id = any(v_item_ids);
+    get diagnostics v_images = row_count;
+
+    delete from bids where item_id = any(v_item_ids);
+    get diagnostics v_bids = row_count;
+
+    delete from orders where auction_id = any(p_auction_ids) or item_id = any(v_item_ids);
+    get diagnostics v_orders = row_count;
+
+    delete from items where item_id = any(v_item_ids);
+    get diagnostics v_items = row_count;
+
+    with deleted as (
+        delete from auctions where auction_id = any(p_auction_ids) returning auction_id
+    )
+    select coalesce(jsonb_agg(auction_id), '[]'::jsonb), count(*) into v_deleted_ids, v_auctions
+    from deleted;
+
+    return jsonb_build_object(
+        'auction_ids', v_deleted_ids,
+        'deleted', jsonb_build_object(
+            'comps', v_comps,
+            'item_images', v_images,
+            'bids', v_bids,
+            'orders', v_orders,
+            'items', v_items,
+            'auctions', v_auctions
+        )
+    );
+end;
+$$;
@@ -0,0 +1,11 @@
+-- orders_auction_item_unique: at most one order per item of an auction.
+-- The auction close upserts its orders on (auction_id, item_id), so a close
+-- retried after a partial failure rewrites the orders it already created
+-- instead of adding duplicates. Buy now orders (one per item, guarded by
+-- is_sold) satisfy the same constraint. Without the index the close still
+-- works: it inserts orders only for items that don't have one yet.
+--
+-- If the index fails to build, list the existing duplicates with
+--   select auction_id, item_id, count(*) from orders group by 1, 2 having count(*) > 1;
+-- and delete the extra rows first.
+create unique index if not exists orders_auction_item_key on orders (auction_id, item_id);
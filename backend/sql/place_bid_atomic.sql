@@ -0,0 +1,76 @@
+-- place_bid_atomic: validate and record a bid in one statement.
+-- The item row is locked FOR UPDATE, so concurrent bids on the same item
+-- serialize in the database and items.current_bid can't be overwritten by
+-- a lower bid that passed a stale check.
+--
+-- Returns jsonb:
+--   {"accepted": true, "bid": {...}, "auction_id", "current_highest", "starting_bid", "min_increment"}
+--   {"accepted": false, "error": "not_found" | "not_active" | "ended" | "sold" | "too_low", ...}
+create or replace function place_bid_atomic(
+    p_item_id uuid,
+    p_bidder_id uuid,
+    p_bidder_email text,
+    p_bidder_name text,
+    p_amount numeric
+) returns jsonb
+language plpgsql
+as $$
+declare
+    v_item items%rowtype;
+    v_auction auctions%rowtype;
+    v_highest numeric;
+    v_starting_bid numeric;
+    v_min_increment numeric;
+    v_min_required numeric;
+    v_bid bids%rowtype;
+begin
+    select * into v_item from items where item_id = p_item_id for update;
+    if not found then
+        return jsonb_build_object('accepted', false, 'error', 'not_found');
+    end if;
+
+    select * into v_auction from auctions where auction_id = v_item.auction_id;
+    if v_auction.status is distinct from 'published' then
+        return jsonb_build_object('accepted', false, 'error', 'not_active');
+    end if;
+    if v_auction.end_time is not null and now() > v_auction.end_time then
+        return jsonb_build_object('accepted', false, 'error', 'ended');
+    end if;
+    if coalesce(v_item.is_sold, false) then
+        return jsonb_build_object('accepted', false, 'error', 'sold');
+    end if;
+
+    -- same rules as the API: first bid may equal starting_bid, later bids need highest + increment
+    v_starting_bid := coalesce(v_item.starting_bid, 0);
+    v_min_increment := coalesce(nullif(v_item.min_increment, 0), 1);
+    select max(amount) into v_highest from bids where item_id = p_item_id;
+    v_min_required := case when v_highest is null then v_starting_bid else v_highest + v_min_increment end;
+
+    if p_amount < v_min_required then
+        return jsonb_build_object(
+            'accepted', false,
+            'error', 'too_low',
+            'auction_id', v_item.auction_id,
+            'current_highest', v_highest,
+            'starting_bid', v_starting_bid,
+            'min_increment', v_min_increment,
+            'min_required', v_min_required
+        );
+    end if;
+
+    insert into bids (item_id, bidder_id, bidder_email, bidder_name, amount)
+    values (p_item_id, p_bidder_id, p_bidder_email, p_bidder_name, p_amount)
+    returning * into v_bid;
+
+    update items set current_bid = p_amount where item_id = p_item_id;
+
+    return jsonb_build_object(
+        'accepted', true,
+        'bid', to_jsonb(v_bid),
+        'auction_id', v_item.auction_id,
+        'current_highest', p_amount,
+        'starting_bid', v_starting_bid,
+        'min_increment', v_min_increment
+    );
+end;
+$$;
@@ -0,0 +1,33 @@
+-- reorder_item_images: set image positions for any number of items in one call.
+-- p_orders is [{"item_id": uuid, "image_ids": [image_id, ...]}, ...]; each list's
+-- order becomes positions 1..n. Both updates run in the function's transaction,
+-- so readers never see a half-shifted order.
+--
+-- Positions are written in two phases - first negated, then flipped back - so a
+-- unique (item_id, position) constraint, deferrable or not, never sees two images
+-- on the same position mid-swap. Negative positions are reserved for this.
+--
+-- Returns the updated item_images rows.
+create or replace function reorder_item_images(
+    p_orders jsonb
+) returns setof item_images
+language sql
+as $$
+    update item_images i
+    set position = -o.position
+    from (
+        select (entry->>'item_id')::uuid as item_id,
+               image.value::bigint as image_id,
+               image.ordinality::integer as position
+        from jsonb_array_elements(p_orders) entry,
+             jsonb_array_elements_text(entry->'image_ids') with ordinality as image(value, ordinality)
+    ) o
+    where i.image_id = o.image_id
+      and i.item_id = o.item_id;
+
+    update item_images i
+    set position = -i.position
+    where i.position < 0
+      and i.item_id in (select (entry->>'item_id')::uuid from jsonb_array_elements(p_orders) entry)
+    returning i.*;
+$$;
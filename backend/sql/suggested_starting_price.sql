@@ -0,0 +1,34 @@
+-- suggested_starting_price: materialize the suggested opening bid on items.
+-- The backend keeps it current whenever comps are saved; this migration adds
+-- the column and backfills it from existing comps with the default "mean"
+-- strategy (average sold price * 0.8, rounded down to the nearest 5). Comps
+-- without a positive sold_price are skipped, as the backend's strategies do.
+alter table items add column if not exists suggested_starting_price numeric;
+
+update items i
+set suggested_starting_price = floor(c.avg_price * 0.8 / 5) * 5
+from (
+    select item_id, avg(sold_price) as avg_price
+    from comps
+    where sold_price > 0
+    group by item_id
+) c
+where c.item_id = i.item_id;
+
+-- set_suggested_starting_prices: store recomputed prices for many items in one
+-- statement. p_prices is {"<item_id>": price-or-null, ...}.
+-- Returns the number of items updated.
+create or replace function set_suggested_starting_prices(
+    p_prices jsonb
+) returns integer
+language sql
+as $$
+    with updated as (
+        update items i
+        set suggested_starting_price = (p.value #>> '{}')::numeric
+        from jsonb_each(p_prices) p
+        where i.item_id = p.key::uuid
+        returning 1
+    )
+    select count(*)::integer from updated;
+$$;
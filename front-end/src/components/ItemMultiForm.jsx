@@ -7,7 +7,7 @@ import { Label } from './ui/label';
 import { Textarea } from './ui/textarea';
 import { ImageUploadZone } from './ImageUploadZone';
 import { ActionTypes, useAuction } from '../context/AuctionContext';
-import { createItem, generateComps, generateItemDescription, updateItemImage, addItemImages, createCompsBatch, getBatchStatus, getBatchResults } from '../services/api';
+import { createItem, generateComps, generateItemDescription, generateItemDescriptionsBatch, updateItemImage, addItemImages, createCompsBatch, waitForCompsBatch } from '../services/api';
 import { uploadItemImage } from '../services/storage';
 
 export function ItemMultiForm({ auctionId }) {
@@ -84,17 +84,50 @@ export function ItemMultiForm({ auctionId }) {
 
       const createdItems = [];
 
-      // Create each item via API
-      for (const item of validItems) {
-        // Construct title as "Brand Model Year"
+      // Construct title as "Brand Model Year"
+      const buildTitle = (item) => {
         const titleParts = [item.brand, item.model];
         if (item.year) {
           titleParts.push(item.year);
         }
-        const title = titleParts.join(' ');
+        return titleParts.join(' ');
+      };
+
+      // Describe all items that need it in one batch request (first image of each)
+      const batchDescriptions = {};
+      const needsDescription = validItems.filter(item => item.imageFiles.length > 0 && item.imageFiles[0] && !item.aiDescription);
+      if (needsDescription.length >= 2) {
+        try {
+          await generateItemDescriptionsBatch(
+            needsDescription.map(item => ({
+              imageFile: item.imageFiles[0],
+              title: buildTitle(item),
+              model: item.model,
+              year: item.year,
+              notes: item.notes
+            })),
+            {
+              onResult: (result) => {
+                if (!result.success) return;
+                const item = needsDescription[result.index];
+                batchDescriptions[item.tempId] = result.description;
+                // Show each description as soon as it's ready
+                handleItemChange(item.tempId, 'aiDescription', result.description);
+              }
+            }
+          );
+        } catch (aiError) {
+          console.error(`Failed to generate AI descriptions:`, aiError);
+          // Fall back to per-item requests below
+        }
+      }
+
+      // Create each item via API
+      for (const item of validItems) {
+        const title = buildTitle(item);
 
         // Generate AI description if first image is provided
-        let aiDescription = item.aiDescription || '';
+        let aiDescription = item.aiDescription || batchDescriptions[item.tempId] || '';
         
         if (item.imageFiles.length > 0 && item.imageFiles[0] && !aiDescription) {
           try {
@@ -217,10 +250,10 @@ export function ItemMultiForm({ auctionId }) {
             notes: ''
           }));
           
-          // Process all items in parallel (returns immediately with all results)
-          const batchResponse = await createCompsBatch(batchItems);
+          // Queue the batch job, then poll until every item has finished
+          const batchJob = await createCompsBatch(batchItems);
+          const batchResponse = await waitForCompsBatch(batchJob.batch_id);
           
-          // Process results immediately (no polling needed)
           if (batchResponse.results && Array.isArray(batchResponse.results)) {
             batchResponse.results.forEach(result => {
               if (result.success && result.comps) {
@@ -1,13 +1,25 @@
 // Custom hook for fetching all bids for an auction
 import { useState, useEffect, useCallback } from 'react';
-import { getAuctionBids } from '../services/api';
+import { getAuctionBids, openAuctionBidStream } from '../services/api';
+
+// Transform items_with_bids into a map of itemId -> bids
+const toBidsMap = (data) => {
+  const bidsMap = {};
+  if (data?.items_with_bids) {
+    data.items_with_bids.forEach(item => {
+      bidsMap[item.item_id] = item.bids || [];
+    });
+  }
+  return bidsMap;
+};
 
 /**
- * Hook to fetch and manage all bids for an auction with auto-refresh
+ * Hook to fetch and manage all bids for an auction with live updates.
+ * Uses the server-sent bid stream when available and falls back to polling.
  * @param {string} auctionId - The auction ID
  * @param {Object} options - Configuration options
- * @param {boolean} options.autoRefresh - Whether to auto-refresh (default: true)
- * @param {number} options.refreshInterval - Refresh interval in ms (default: 5000)
+ * @param {boolean} options.autoRefresh - Whether to keep bids live (default: true)
+ * @param {number} options.refreshInterval - Polling interval in ms when streaming is unavailable (default: 5000)
  * @param {boolean} options.enabled - Whether fetching is enabled (default: true)
  * @returns {Object} { allBids, loading, error, refetch }
  */
@@ -27,14 +39,7 @@ export function useAuctionBids(auctionId, options = {}) {
     
     try {
       const data = await getAuctionBids(auctionId);
-      // Transform items_with_bids into a map of itemId -> bids
-      const bidsMap = {};
-      if (data?.items_with_bids) {
-        data.items_with_bids.forEach(item => {
-          bidsMap[item.item_id] = item.bids || [];
-        });
-      }
-      setAllBids(bidsMap);
+      setAllBids(toBidsMap(data));
       setError(null);
     } catch (err) {
       console.error('Failed to fetch bids:', err);
@@ -44,15 +49,58 @@ export function useAuctionBids(auctionId, options = {}) {
     }
   }, [auctionId, enabled]);
 
-  // Initial fetch and auto-refresh
+  // Live updates: stream if possible, otherwise initial fetch + polling
   useEffect(() => {
-    fetchAllBids();
-    
-    if (autoRefresh && enabled) {
-      const interval = setInterval(fetchAllBids, refreshInterval);
+    if (!auctionId || !enabled) return;
+
+    if (!autoRefresh) {
+      fetchAllBids();
+      return;
+    }
+
+    let interval = null;
+    const startPolling = () => {
+      if (interval) return;
+      fetchAllBids();
+      interval = setInterval(fetchAllBids, refreshInterval);
+    };
+
+    if (typeof EventSource === 'undefined') {
+      startPolling();
       return () => clearInterval(interval);
     }
-  }, [fetchAllBids, autoRefresh, refreshInterval, enabled]);
+
+    const stream = openAuctionBidStream(auctionId);
+
+    stream.addEventListener('snapshot', (e) => {
+      setAllBids(toBidsMap(JSON.parse(e.data)));
+      setError(null);
+      setLoading(false);
+    });
+
+    stream.addEventListener('bid', (e) => {
+      const { item_id: itemId, bid } = JSON.parse(e.data);
+      setAllBids(prev => {
+        const itemBids = prev[itemId] || [];
+        // Deltas can overlap the snapshot - skip bids we already have
+        if (itemBids.some(b => b.bid_id === bid.bid_id)) return prev;
+        const updated = [bid, ...itemBids].sort((a, b) => b.amount - a.amount);
+        return { ...prev, [itemId]: updated };
+      });
+    });
+
+    stream.onerror = () => {
+      // EventSource retries on its own; only fall back if the stream is gone for good
+      if (stream.readyState === EventSource.CLOSED) {
+        startPolling();
+      }
+    };
+
+    return () => {
+      stream.close();
+      clearInterval(interval);
+    };
+  }, [auctionId, enabled, autoRefresh, refreshInterval, fetchAllBids]);
 
   /**
    * Get bids for a specific item
@@ -26,8 +26,15 @@ export const getAuction = async (auctionId) => {
   return handleResponse(response);
 };
 
-export const listAuctionsByUser = async (profileId) => {
-  const response = await fetch(`${API_BASE_URL}/auctions?profile_id=${profileId}`);
+// Optional paging: { limit, cursor, fields, include } - pass the response's next_cursor to get the next page
+export const listAuctionsByUser = async (profileId, { limit = null, cursor = null, fields = null, include = null } = {}) => {
+  const params = new URLSearchParams({ profile_id: profileId });
+  if (limit) params.append('limit', limit);
+  if (cursor) params.append('cursor', cursor);
+  if (fields) params.append('fields', fields);
+  if (include !== null) params.append('include', include);
+
+  const response = await fetch(`${API_BASE_URL}/auctions?${params.toString()}`);
   return handleResponse(response);
 };
 
@@ -38,6 +45,21 @@ export const updateAuction = async (auctionId, auctionName) => {
   return handleResponse(response);
 };
 
+// Import items from a CSV or NDJSON file
+export const importAuctionItems = async (auctionId, file) => {
+  const formData = new FormData();
+  formData.append('file', file);
+  const response = await fetch(`${API_BASE_URL}/auctions/${auctionId}/import`, {
+    method: 'POST',
+    body: formData,
+  });
+  return handleResponse(response);
+};
+
+// Download link for an auction export (format: 'ndjson' | 'csv'; table applies to csv)
+export const getAuctionExportUrl = (auctionId, format = 'ndjson', table = 'items') =>
+  `${API_BASE_URL}/auctions/${auctionId}/export?format=${format}&table=${table}`;
+
 export const deleteAuction = async (auctionId) => {
   const response = await fetch(`${API_BASE_URL}/auctions/${auctionId}`, {
     method: 'DELETE',
@@ -45,6 +67,17 @@ export const deleteAuction = async (auctionId) => {
   return handleResponse(response);
 };
 
+export const bulkDeleteAuctions = async (auctionIds) => {
+  const response = await fetch(`${API_BASE_URL}/auctions/bulk-delete`, {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+    },
+    body: JSON.stringify({ auction_ids: auctionIds }),
+  });
+  return handleResponse(response);
+};
+
 // ============================================
 // ITEM API
 // ============================================
@@ -83,10 +116,34 @@ export const createItem = async ({
   return handleResponse(response);
 };
 
-export const listItems = async (auctionId = null, profileId = null) => {
+// Create many items in one request; items: [{ title, imageUrls, brand, model, year, aiDescription }]
+export const createItemsBulk = async (auctionId, items) => {
+  const response = await fetch(`${API_BASE_URL}/items/bulk?auction_id=${encodeURIComponent(auctionId)}`, {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+    },
+    body: JSON.stringify(items.map(item => ({
+      title: item.title,
+      image_urls: item.imageUrls,
+      brand: item.brand || '',
+      model: item.model || '',
+      year: item.year || null,
+      ai_description: item.aiDescription || '',
+    }))),
+  });
+  return handleResponse(response);
+};
+
+// Optional paging: { limit, cursor, fields, include } - include defaults to 'images' on the server; pass 'images,comps' to embed comps
+export const listItems = async (auctionId = null, profileId = null, { limit = null, cursor = null, fields = null, include = null } = {}) => {
   const params = new URLSearchParams();
   if (auctionId) params.append('auction_id', auctionId);
   if (profileId) params.append('profile_id', profileId);
+  if (limit) params.append('limit', limit);
+  if (cursor) params.append('cursor', cursor);
+  if (fields) params.append('fields', fields);
+  if (include !== null) params.append('include', include);
 
   const response = await fetch(`${API_BASE_URL}/items?${params.toString()}`);
   return handleResponse(response);
@@ -145,6 +202,30 @@ export const setImagePrimary = async (itemId, imageId) => {
   return handleResponse(response);
 };
 
+// Set the full image order for an item (imageIds[0] becomes primary)
+export const reorderItemImages = async (itemId, imageIds) => {
+  const response = await fetch(`${API_BASE_URL}/items/${itemId}/images/order`, {
+    method: 'PUT',
+    headers: {
+      'Content-Type': 'application/json',
+    },
+    body: JSON.stringify({ image_ids: imageIds }),
+  });
+  return handleResponse(response);
+};
+
+// Reorder images for many items in one request: [{ item_id, image_ids }, ...]
+export const reorderImagesBatch = async (items) => {
+  const response = await fetch(`${API_BASE_URL}/items/batch/images/order`, {
+    method: 'PUT',
+    headers: {
+      'Content-Type': 'application/json',
+    },
+    body: JSON.stringify({ items }),
+  });
+  return handleResponse(response);
+};
+
 // ============================================
 // COMPS API
 // ============================================
@@ -177,18 +258,127 @@ export const getSavedComps = async (itemId) => {
 // VISION / AI DESCRIPTION API
 // ============================================
 
-export const generateItemDescription = async (imageFile, title, model = '', year = '', notes = '') => {
+// Same image + details return the server's cached description unless forceRegenerate is set
+export const generateItemDescription = async (imageFile, title, model = '', year = '', notes = '', forceRegenerate = false) => {
+  const formData = new FormData();
+  formData.append('image', imageFile);
+  formData.append('title', title);
+  if (model) formData.append('model', model);
+  if (year) formData.append('year', year);
+  if (notes) formData.append('notes', notes);
+  if (forceRegenerate) formData.append('force_regenerate', 'true');
+
+  const response = await fetch(`${API_BASE_URL}/items/generate-description`, {
+    method: 'POST',
+    body: formData,
+  });
+  return handleResponse(response);
+};
+
+// Stream a description as it's generated; onDelta(text) fires per chunk, resolves with the final result
+export const streamItemDescription = async (imageFile, title, { model = '', year = '', notes = '', forceRegenerate = false, onDelta = null } = {}) => {
   const formData = new FormData();
   formData.append('image', imageFile);
   formData.append('title', title);
   if (model) formData.append('model', model);
   if (year) formData.append('year', year);
   if (notes) formData.append('notes', notes);
+  if (forceRegenerate) formData.append('force_regenerate', 'true');
+  formData.append('stream', 'true');
 
   const response = await fetch(`${API_BASE_URL}/items/generate-description`, {
     method: 'POST',
     body: formData,
   });
+  if (!response.ok) return handleResponse(response);
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  for (;;) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    // SSE events are separated by a blank line
+    let boundary;
+    while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+      const raw = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+      const event = raw.match(/^event: (.*)$/m)?.[1];
+      const data = JSON.parse(raw.match(/^data: (.*)$/m)?.[1] || '{}');
+      if (event === 'delta' && onDelta) onDelta(data.text);
+      if (event === 'done') return data;
+      if (event === 'error') throw new Error(data.detail);
+    }
+  }
+  throw new Error('Description stream ended unexpectedly');
+};
+
+// Describe many items in one request; onResult(result) fires as each item finishes.
+// entries: [{ imageFile, title, model, year, notes }] - resolves with results in entry order
+export const generateItemDescriptionsBatch = async (entries, { onResult = null } = {}) => {
+  const formData = new FormData();
+  entries.forEach(entry => formData.append('images', entry.imageFile));
+  formData.append('items', JSON.stringify(entries.map(({ title, model, year, notes }) => ({
+    title,
+    model: model || null,
+    year: year || null,
+    notes: notes || null,
+  }))));
+
+  const response = await fetch(`${API_BASE_URL}/items/generate-descriptions/batch`, {
+    method: 'POST',
+    body: formData,
+  });
+  if (!response.ok) return handleResponse(response);
+
+  const results = new Array(entries.length).fill(null);
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  for (;;) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    // NDJSON - one result per line, then a final summary line
+    let newline;
+    while ((newline = buffer.indexOf('\n')) !== -1) {
+      const line = buffer.slice(0, newline).trim();
+      buffer = buffer.slice(newline + 1);
+      if (!line) continue;
+      const result = JSON.parse(line);
+      if (result.done) return results;
+      results[result.index] = result;
+      if (onResult) onResult(result);
+    }
+  }
+  throw new Error('Description batch stream ended unexpectedly');
+};
+
+// Submit descriptions to the OpenAI Batch API (cheaper, finishes within 24h)
+export const submitOfflineDescriptionBatch = async (entries) => {
+  const formData = new FormData();
+  entries.forEach(entry => formData.append('images', entry.imageFile));
+  formData.append('items', JSON.stringify(entries.map(({ title, model, year, notes }) => ({
+    title,
+    model: model || null,
+    year: year || null,
+    notes: notes || null,
+  }))));
+  formData.append('offline', 'true');
+
+  const response = await fetch(`${API_BASE_URL}/items/generate-descriptions/batch`, {
+    method: 'POST',
+    body: formData,
+  });
+  return handleResponse(response);
+};
+
+export const getOfflineDescriptionBatch = async (batchId) => {
+  /** Status of an offline description batch; results are included once completed */
+  const response = await fetch(`${API_BASE_URL}/items/generate-descriptions/batch/${batchId}`);
   return handleResponse(response);
 };
 
@@ -221,10 +411,9 @@ export const updateUserEmail = async (profileId, email) => {
 
 export const createCompsBatch = async (items) => {
   /**
-   * Create a batch job for generating comps for multiple items
-   * Now runs synchronously and returns all results immediately
+   * Queue a background job that generates comps for multiple items
    * @param {Array} items - Array of {item_id, brand, model, year, notes}
-   * @returns {Promise} - Batch results with all comps
+   * @returns {Promise} - { batch_id, status: 'queued', total_items }
    */
   const response = await fetch(`${API_BASE_URL}/comps/batch`, {
     method: 'POST',
@@ -236,29 +425,37 @@ export const createCompsBatch = async (items) => {
   return handleResponse(response);
 };
 
-// NOTE: The following batch functions are not currently used since batch is now synchronous
-// Keeping them for potential future use with async batch processing
-
 export const getBatchStatus = async (batchId) => {
-  /** @deprecated - Batch processing is now synchronous */
+  /** Batch status and progress counts */
   const response = await fetch(`${API_BASE_URL}/comps/batch/${batchId}`);
   return handleResponse(response);
 };
 
 export const getBatchResults = async (batchId, saveToDb = true) => {
-  /** @deprecated - Batch processing is now synchronous */
+  /** Per-item results for a batch ({ results: [{ item_id, success, comps | error }] }) */
   const response = await fetch(`${API_BASE_URL}/comps/batch/${batchId}/results?save_to_db=${saveToDb}`);
   return handleResponse(response);
 };
 
 export const cancelBatch = async (batchId) => {
-  /** @deprecated - Batch processing is now synchronous */
   const response = await fetch(`${API_BASE_URL}/comps/batch/${batchId}`, {
     method: 'DELETE',
   });
   return handleResponse(response);
 };
 
+// Poll a comps batch until it finishes, then return its results
+export const waitForCompsBatch = async (batchId, { interval = 3000, onProgress = null } = {}) => {
+  for (;;) {
+    const status = await getBatchStatus(batchId);
+    if (onProgress) onProgress(status);
+    if (status.status === 'completed' || status.status === 'cancelled') {
+      return getBatchResults(batchId);
+    }
+    await new Promise(resolve => setTimeout(resolve, interval));
+  }
+};
+
 export const makePayment = async (profileId) => {
   const response = await fetch(`${API_BASE_URL}/payments?profile_id=${profileId}`, {
     method: 'POST',
@@ -341,34 +538,42 @@ export const batchUpdateItemAuctionSettings = async (itemIds, settings) => {
 };
 
 // Place a bid on an item
-export const placeBid = async (itemId, bidderEmail, bidderName, bidAmount) => {
-  const response = await fetch(`${API_BASE_URL}/items/${itemId}/bid`, {
-    method: 'POST',
-    headers: {
-      'Content-Type': 'application/json',
-    },
-    body: JSON.stringify({
-      bidder_email: bidderEmail,
-      bidder_name: bidderName,
-      bid_amount: bidAmount,
-    }),
-  });
+// POST with an Idempotency-Key, resending on network errors - the backend
+// answers a repeat with the original response, so a retry can't double-submit
+const postIdempotent = async (url, body, idempotencyKey, retries = 2) => {
+  for (let attempt = 0; ; attempt++) {
+    try {
+      return await fetch(url, {
+        method: 'POST',
+        headers: {
+          'Content-Type': 'application/json',
+          'Idempotency-Key': idempotencyKey,
+        },
+        body: JSON.stringify(body),
+      });
+    } catch (error) {
+      if (attempt >= retries) throw error;
+      await new Promise((resolve) => setTimeout(resolve, 500 * 2 ** attempt));
+    }
+  }
+};
+
+export const placeBid = async (itemId, bidderEmail, bidderName, bidAmount, idempotencyKey = crypto.randomUUID()) => {
+  const response = await postIdempotent(`${API_BASE_URL}/items/${itemId}/bid`, {
+    bidder_email: bidderEmail,
+    bidder_name: bidderName,
+    bid_amount: bidAmount,
+  }, idempotencyKey);
   return handleResponse(response);
 };
 
 // Buy now - purchase item immediately
 // NOTE: Currently not used in frontend - placeBid with buy_now_price handles this
-export const buyNow = async (itemId, buyerEmail, buyerName) => {
-  const response = await fetch(`${API_BASE_URL}/items/${itemId}/buy-now`, {
-    method: 'POST',
-    headers: {
-      'Content-Type': 'application/json',
-    },
-    body: JSON.stringify({
-      buyer_email: buyerEmail,
-      buyer_name: buyerName,
-    }),
-  });
+export const buyNow = async (itemId, buyerEmail, buyerName, idempotencyKey = crypto.randomUUID()) => {
+  const response = await postIdempotent(`${API_BASE_URL}/items/${itemId}/buy-now`, {
+    buyer_email: buyerEmail,
+    buyer_name: buyerName,
+  }, idempotencyKey);
   return handleResponse(response);
 };
 
@@ -384,6 +589,12 @@ export const getAuctionBids = async (auctionId) => {
   return handleResponse(response);
 };
 
+// Open a live bid stream for an auction (Server-Sent Events)
+// Emits 'snapshot' once (same shape as getAuctionBids), then 'bid', 'sold' and 'status' deltas
+export const openAuctionBidStream = (auctionId) => {
+  return new EventSource(`${API_BASE_URL}/auctions/${auctionId}/bids/stream`);
+};
+
 // Get order details
 // NOTE: Orders feature not fully implemented in frontend yet
 export const getOrder = async (orderId) => {
@@ -413,51 +624,25 @@ export const fetchAllUserData = async (profileId) => {
     const auctionsData = await listAuctionsByUser(profileId);
     const auctions = auctionsData.auctions || [];
     
-    // Fetch all items for this user
-    const itemsData = await listItems(null, profileId);
+    // Fetch all items for this user, with their comps in the same request
+    const itemsData = await listItems(null, profileId, { include: 'images,comps' });
     const items = itemsData.items || [];
     
-    // Extract all item IDs to fetch comps
-    const itemIds = items.map(item => item.item_id);
-    
-    // Fetch saved comps for each item in batches to avoid overwhelming the server
-    const BATCH_SIZE = 5; // Process 5 items at a time
     const allComps = [];
-    
-    for (let i = 0; i < itemIds.length; i += BATCH_SIZE) {
-      const batch = itemIds.slice(i, i + BATCH_SIZE);
-      
-      const batchPromises = batch.map(itemId => 
-        getSavedComps(itemId).catch(err => {
-          console.warn(`Failed to fetch saved comps for item ${itemId}:`, err);
-          return { comps: [] };
-        })
-      );
-      
-      const batchResponses = await Promise.all(batchPromises);
-      
-      // Add comps from this batch
-      batchResponses.forEach((response, batchIndex) => {
-        if (response.comps) {
-          response.comps.forEach(comp => {
-            allComps.push({
-              item_id: batch[batchIndex],
-              source: comp.source,
-              source_url: comp.url_comp,
-              sold_price: comp.sold_price,
-              currency: comp.currency,
-              sold_at: comp.sold_at,
-              notes: comp.notes
-            });
-          });
-        }
+    items.forEach(item => {
+      (item.comps || []).forEach(comp => {
+        allComps.push({
+          item_id: item.item_id,
+          source: comp.source,
+          source_url: comp.url_comp,
+          sold_price: comp.sold_price,
+          currency: comp.currency,
+          sold_at: comp.sold_at,
+          notes: comp.notes
+        });
       });
-      
-      // Small delay between batches to avoid rate limiting
-      if (i + BATCH_SIZE < itemIds.length) {
-        await new Promise(resolve => setTimeout(resolve, 100));
-      }
-    }
+      delete item.comps;
+    });
     
     return {
       auctions,